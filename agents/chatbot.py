@@ -1,15 +1,22 @@
+import functools
 import os
-import anthropic
+import sqlite3
+from collections.abc import Iterator
 from flask import current_app
 
+from agents.client import get_client
+from agents.history import cached_system, fit_to_budget, record_usage
+from agents.response_cache import DEFAULT_PATH as CACHE_PATH, ResponseCache, cache_key
+
+CHAT_MODEL = "claude-sonnet-4-6"
+# Only short conversations (FAQ-style openings) are worth caching
+MAX_CACHED_MESSAGES = 3
+
 _FACT_BASE_PATH = os.path.join(
     os.path.dirname(os.path.abspath(__file__)), "..", "static", "about", "prezent_energy_fact_base.txt"
 )
 
-with open(os.path.normpath(_FACT_BASE_PATH), encoding="utf-8") as _f:
-    _fact_base = _f.read()
-
-SYSTEM_PROMPT = f"""You are the Prezent.Energy AI assistant — a knowledgeable, professional guide
+_SYSTEM_PROMPT_TEMPLATE = """You are the Prezent.Energy AI assistant — a knowledgeable, professional guide
 for potential clients exploring our Charging-as-a-Service (CaaS) platform.
 
 Use the fact base below as your sole source of truth. Do not invent specifications not listed here.
@@ -17,7 +24,7 @@ If uncertain about a detail, say "our team can confirm that during your demo cal
 Always end responses with a soft CTA inviting the user to schedule a demo or fill out the form.
 
 --- FACT BASE ---
-{_fact_base}
+{fact_base}
 --- END FACT BASE ---
 
 Response style: concise, confident, and technically authoritative. When asked about pricing,
@@ -25,19 +32,98 @@ compatibility, or timelines, cite specific numbers from the fact base above.
 """
 
 
+@functools.cache
+def system_prompt() -> str:
+    """The chatbot system prompt; the fact base is read on first use, not at import."""
+    with open(os.path.normpath(_FACT_BASE_PATH), encoding="utf-8") as f:
+        return _SYSTEM_PROMPT_TEMPLATE.format(fact_base=f.read())
+
+
+def _response_cache() -> ResponseCache | None:
+    cfg = current_app.config
+    if not cfg.get("CHAT_CACHE_ENABLED", True):
+        return None
+    return ResponseCache(
+        path=cfg.get("CHAT_CACHE_PATH", CACHE_PATH),
+        ttl=cfg.get("CHAT_CACHE_TTL", 86400),
+        max_entries=cfg.get("CHAT_CACHE_MAX_ENTRIES", 5000),
+    )
+
+
+class _CachedConversation:
+    """Response-cache lookup/store for one conversation; inert when uncacheable."""
+
+    def __init__(self, messages: list[dict]):
+        self.cache = _response_cache() if len(messages) <= MAX_CACHED_MESSAGES else None
+        self.key = cache_key(CHAT_MODEL, system_prompt(), messages) if self.cache else None
+
+    def get(self) -> str | None:
+        if not self.cache:
+            return None
+        try:
+            return self.cache.get(self.key)
+        except sqlite3.Error as e:
+            current_app.logger.warning("chat cache read failed: %s", e)
+            return None
+
+    def set(self, reply: str) -> None:
+        if not self.cache:
+            return
+        try:
+            self.cache.set(self.key, reply)
+        except sqlite3.Error as e:
+            current_app.logger.warning("chat cache write failed: %s", e)
+
+
 def get_chat_response(messages: list[dict]) -> str:
     """
     Send a conversation to Claude and return the assistant reply.
     `messages` is a list of {"role": "user"/"assistant", "content": "..."} dicts.
+
+    Short conversations are answered from the shared response cache when
+    an identical (normalised) one has been seen recently.
     """
-    client = anthropic.Anthropic(
-        api_key=current_app.config["ANTHROPIC_API_KEY"],
-    )
+    cached = _CachedConversation(messages)
+    reply = cached.get()
+    if reply is not None:
+        return reply
+
+    client = get_client(current_app.config["ANTHROPIC_API_KEY"])
 
     response = client.messages.create(
-        model="claude-sonnet-4-6",
+        model=CHAT_MODEL,
         max_tokens=1024,
-        system=SYSTEM_PROMPT,
-        messages=messages,
+        system=cached_system(system_prompt()),
+        messages=fit_to_budget(messages),
     )
-    return response.content[0].text
+    record_usage("chatbot", CHAT_MODEL, response.usage)
+    reply = response.content[0].text
+    cached.set(reply)
+    return reply
+
+
+def stream_chat_response(messages: list[dict]) -> Iterator[str]:
+    """
+    Streaming variant of get_chat_response — yields reply text as it is
+    generated.  A cache hit is yielded as a single chunk.
+    """
+    cached = _CachedConversation(messages)
+    reply = cached.get()
+    if reply is not None:
+        yield reply
+        return
+
+    client = get_client(current_app.config["ANTHROPIC_API_KEY"])
+
+    parts = []
+    with client.messages.stream(
+        model=CHAT_MODEL,
+        max_tokens=1024,
+        system=cached_system(system_prompt()),
+        messages=fit_to_budget(messages),
+    ) as stream:
+        for text in stream.text_stream:
+            parts.append(text)
+            yield text
+        record_usage("chatbot", CHAT_MODEL, stream.get_final_message().usage)
+    cached.set("".join(parts))
@@ -0,0 +1,37 @@
+"""
+Shared Anthropic client.
+
+anthropic.Anthropic wraps an httpx connection pool, so building one per
+request throws away TLS sessions and keep-alive connections.  Every agent
+goes through get_client() instead, which keeps one client per API key for
+the life of the worker process.
+
+The anthropic package (with httpx and pydantic) takes well over a second
+to import, so it is only imported by the first get_client() call rather
+than when a worker boots.
+"""
+
+import os
+import threading
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import anthropic
+
+_clients: dict[tuple[int, str], "anthropic.Anthropic"] = {}
+_lock = threading.Lock()
+
+
+def get_client(api_key: str) -> "anthropic.Anthropic":
+    # Keyed on pid too: a client inherited across a fork must not be reused
+    key = (os.getpid(), api_key)
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                import anthropic
+
+                client = anthropic.Anthropic(api_key=api_key)
+                _clients[key] = client
+    return client
@@ -0,0 +1,74 @@
+"""
+Conversation history budgeting and token accounting.
+
+The chat widgets resend the whole conversation on every turn, so without
+a cap the input grows with the length of the session.  fit_to_budget()
+keeps the newest turns that fit in a token budget and drops older ones.
+
+record_usage() stores per-call input / cached / output token counts in
+the llm_usage table so prompt-caching savings can be measured.
+"""
+
+from flask import current_app
+
+CHARS_PER_TOKEN = 4          # rough estimate; good enough for budgeting
+DEFAULT_BUDGET  = 6000
+OMITTED_NOTE    = "[Earlier conversation omitted]\n\n"
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text or "") // CHARS_PER_TOKEN + 1
+
+
+def fit_to_budget(messages: list[dict], budget: int | None = None) -> list[dict]:
+    """Return the newest suffix of `messages` that fits in `budget` tokens.
+
+    The latest message is always kept.  The result always opens with a
+    user turn (an API requirement); when older turns were dropped that
+    turn is prefixed with a short note so the model knows.
+    """
+    if budget is None:
+        budget = current_app.config.get("CHAT_HISTORY_TOKEN_BUDGET", DEFAULT_BUDGET)
+
+    kept, used = [], 0
+    for msg in reversed(messages):
+        cost = estimate_tokens(msg["content"])
+        if kept and used + cost > budget:
+            break
+        kept.append(msg)
+        used += cost
+    kept.reverse()
+
+    while len(kept) > 1 and kept[0]["role"] != "user":
+        kept.pop(0)
+
+    if len(kept) < len(messages):
+        first = kept[0]
+        kept[0] = {"role": first["role"], "content": OMITTED_NOTE + first["content"]}
+    return kept
+
+
+def cached_system(prompt: str) -> list[dict]:
+    """System prompt as a content block marked for provider-side prompt caching."""
+    return [{"type": "text", "text": prompt, "cache_control": {"type": "ephemeral"}}]
+
+
+def record_usage(agent: str, model: str, usage) -> None:
+    """Persist one call's token counts; never lets accounting break a reply."""
+    from extensions import db
+    from models import LlmUsage
+
+    try:
+        row = LlmUsage(
+            agent=agent,
+            model=model,
+            input_tokens=getattr(usage, "input_tokens", 0) or 0,
+            cache_read_tokens=getattr(usage, "cache_read_input_tokens", 0) or 0,
+            cache_write_tokens=getattr(usage, "cache_creation_input_tokens", 0) or 0,
+            output_tokens=getattr(usage, "output_tokens", 0) or 0,
+        )
+        db.session.add(row)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.warning("could not record token usage: %s", e)
@@ -8,28 +8,55 @@ Cache strategy:
 
 On cold start the file is read immediately; on stale/missing file a
 background thread fetches new data and writes it to disk.  The JS
-frontend polls /api/industry-news until loading=false.
+frontend long-polls /api/industry-news/wait, which returns as soon as the
+refresh finishes (see wait_for_refresh).
+
+Refreshes are single-flight across processes: a worker must hold an
+exclusive lock on instance/news_cache.json.lock to refresh, and everyone
+else keeps serving the stale entries meanwhile.  The "refreshing" flag
+and the last refresh error live in the shared cache file, so every
+worker reports the same loading state.
+
+Refreshes fetch every source concurrently using conditional GETs; each
+source's ETag / Last-Modified and last parsed items are kept in
+instance/feed_state.json.  When every source answers 304 the previous
+curated lists are reused without calling Claude.
 """
 
 import re
 import json
 import os
 import threading
-import xml.etree.ElementTree as ET
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
-import anthropic
-import requests
+from agents.client import get_client
+
+try:
+    import fcntl
+except ImportError:          # Windows dev boxes: single-flight stays per-process
+    fcntl = None
 
 # ── File cache path ───────────────────────────────────────────────────────────
 _BASE_DIR   = os.path.dirname(os.path.abspath(__file__))
 _CACHE_FILE = os.path.normpath(os.path.join(_BASE_DIR, "..", "instance", "news_cache.json"))
+# Per-source ETag / Last-Modified validators + last parsed items
+_FEED_STATE_FILE = os.path.normpath(os.path.join(_BASE_DIR, "..", "instance", "feed_state.json"))
 
 # ── In-memory cache (per Passenger worker) ───────────────────────────────────
 _cache: dict = {"news": None, "regulations": None, "updated": None}
 _fetch_lock  = threading.Lock()
 _is_fetching = False
 CACHE_TTL    = timedelta(hours=24)
+# A "refreshing" flag older than this is from a worker that died mid-refresh
+REFRESH_TIMEOUT = timedelta(minutes=5)
+# After a failed refresh, serve stale data this long before trying again
+RETRY_AFTER     = timedelta(minutes=5)
+# How often a waiting request re-reads the shared file for a refresh
+# running in another worker (same-worker refreshes wake waiters at once)
+WAIT_POLL_INTERVAL = 0.5
+_refresh_done      = threading.Condition()
 
 # ── RSS sources ───────────────────────────────────────────────────────────────
 NEWS_FEEDS = [
@@ -37,35 +64,110 @@ NEWS_FEEDS = [
     "https://cleantechnica.com/feed/",
     "https://www.greencarreports.com/rss/news",
 ]
+FEDERAL_REGISTER_URL = "https://www.federalregister.gov/api/v1/documents.json"
+USER_AGENT           = "PrezentEnergy-NewsAgent/1.0"
 
 
 # ── File cache helpers ────────────────────────────────────────────────────────
 
-def _write_file_cache(news: list, regulations: list) -> None:
+def _read_file_state() -> dict:
+    try:
+        with open(_CACHE_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def _write_file_state(state: dict) -> None:
     try:
         os.makedirs(os.path.dirname(_CACHE_FILE), exist_ok=True)
-        tmp = _CACHE_FILE + ".tmp"
+        tmp = f"{_CACHE_FILE}.{os.getpid()}.tmp"
         with open(tmp, "w", encoding="utf-8") as f:
-            json.dump({
-                "news":        news,
-                "regulations": regulations,
-                "updated":     datetime.utcnow().isoformat(),
-            }, f)
+            json.dump(state, f)
         os.replace(tmp, _CACHE_FILE)   # atomic on POSIX & Windows
     except Exception:
         pass
 
 
+def _update_file_state(**fields) -> None:
+    """Merge `fields` into the shared cache file (callers hold the refresh lock)."""
+    state = _read_file_state()
+    state.update(fields)
+    _write_file_state(state)
+
+
+def _write_file_cache(news: list, regulations: list) -> datetime:
+    updated = datetime.utcnow()
+    _write_file_state({
+        "news":             news,
+        "regulations":      regulations,
+        "updated":          updated.isoformat(),
+        "refreshing_since": None,
+        "last_error":       None,
+    })
+    return updated
+
+
 def _read_file_cache() -> tuple[list | None, list | None, datetime | None]:
     try:
-        with open(_CACHE_FILE, encoding="utf-8") as f:
-            data = json.load(f)
+        data = _read_file_state()
         updated = datetime.fromisoformat(data["updated"])
         return data["news"], data["regulations"], updated
     except Exception:
         return None, None, None
 
 
+# ── Cross-process refresh lock ────────────────────────────────────────────────
+
+def _acquire_refresh_lock():
+    """Try to take the cross-process refresh lock without blocking.
+
+    Returns a handle for _release_refresh_lock(), or None if another
+    worker holds it.  The OS drops the lock if the holder dies.
+    """
+    if fcntl is None:
+        return True
+    try:
+        os.makedirs(os.path.dirname(_CACHE_FILE), exist_ok=True)
+        fh = open(_CACHE_FILE + ".lock", "a")
+    except OSError:
+        return None
+    try:
+        fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        fh.close()
+        return None
+    return fh
+
+
+def _release_refresh_lock(handle) -> None:
+    if fcntl is None or handle is None:
+        return
+    try:
+        fcntl.flock(handle, fcntl.LOCK_UN)
+    finally:
+        handle.close()
+
+
+def _read_feed_state() -> dict:
+    try:
+        with open(_FEED_STATE_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def _write_feed_state(state: dict) -> None:
+    try:
+        os.makedirs(os.path.dirname(_FEED_STATE_FILE), exist_ok=True)
+        tmp = _FEED_STATE_FILE + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp, _FEED_STATE_FILE)
+    except Exception:
+        pass
+
+
 def _load_file_cache_into_memory() -> bool:
     """Read file cache into _cache. Returns True if cache is still valid."""
     news, regs, updated = _read_file_cache()
@@ -83,39 +185,108 @@ def _strip_html(text: str) -> str:
     return re.sub(r"<[^>]+>", "", text or "").strip()
 
 
-def _parse_rss(url: str, limit: int = 20) -> list[dict]:
+def _conditional_get(url: str, state: dict, **kwargs) -> "requests.Response | None":
+    """GET `url` with the validators saved in `state`.
+
+    Returns None on 304 Not Modified, otherwise the response.  `state` is
+    not touched: callers save the new validators with _save_validators()
+    only once the body has parsed, so a truncated or malformed response
+    is fetched again in full next time instead of answering 304 forever.
+    """
+    headers = {"User-Agent": USER_AGENT}
+    if state.get("etag"):
+        headers["If-None-Match"] = state["etag"]
+    if state.get("last_modified"):
+        headers["If-Modified-Since"] = state["last_modified"]
+
+    import requests
+
+    r = requests.get(url, timeout=8, headers=headers, **kwargs)
+    if r.status_code == 304:
+        return None
+    r.raise_for_status()
+    return r
+
+
+def _save_validators(state: dict, r: "requests.Response", items: list[dict]) -> None:
+    state["etag"]          = r.headers.get("ETag")
+    state["last_modified"] = r.headers.get("Last-Modified")
+    state["items"]         = items
+
+
+def _iter_rss_items(source, limit: int = 20) -> list[dict]:
+    """Incrementally parse the first `limit` <item>s from a file-like or path.
+
+    Each <item> is detached from the tree once read, so memory stays flat
+    however large the feed, and parsing stops (leaving the rest of the
+    stream unread) as soon as `limit` items have been seen.
+    """
+    import xml.etree.ElementTree as ET
+
+    items: list[dict] = []
+    seen  = 0
+    stack = []   # open elements, so finished items can be detached from their parent
+    for event, elem in ET.iterparse(source, events=("start", "end")):
+        if event == "start":
+            stack.append(elem)
+            continue
+        stack.pop()
+        if elem.tag != "item":
+            continue
+
+        title    = _strip_html(elem.findtext("title", ""))
+        link     = (elem.findtext("link") or "").strip()
+        pub_date = (elem.findtext("pubDate") or "").strip()
+        desc     = _strip_html(elem.findtext("description", ""))[:200]
+        if title and link:
+            items.append({"title": title, "link": link,
+                           "date": pub_date, "description": desc})
+
+        if stack:
+            stack[-1].remove(elem)
+        elem.clear()
+        seen += 1
+        if seen >= limit:
+            break
+    return items
+
+
+def _parse_rss(url: str, limit: int = 20, state: dict | None = None) -> tuple[list[dict], bool | None]:
+    """Return (items, changed). Unchanged (304) feeds reuse the saved items.
+
+    `changed` is True for a new body, False for 304 and None when the
+    feed failed (the saved items are returned then too).
+    """
+    state = {} if state is None else state
     try:
-        r = requests.get(url, timeout=8,
-                         headers={"User-Agent": "PrezentEnergy-NewsAgent/1.0"})
-        r.raise_for_status()
-        root  = ET.fromstring(r.content)
-        items = []
-        for item in root.findall(".//item")[:limit]:
-            title    = _strip_html(item.findtext("title", ""))
-            link     = (item.findtext("link") or "").strip()
-            pub_date = (item.findtext("pubDate") or "").strip()
-            desc     = _strip_html(item.findtext("description", ""))[:200]
-            if title and link:
-                items.append({"title": title, "link": link,
-                               "date": pub_date, "description": desc})
-        return items
+        r = _conditional_get(url, state, stream=True)
+        if r is None:
+            return state.get("items", []), False
+        with r:
+            r.raw.decode_content = True     # transparently gunzip
+            items = _iter_rss_items(r.raw, limit)
+        _save_validators(state, r, items)
+        return items, True
     except Exception:
-        return []
+        return state.get("items", []), None
 
 
-def _fetch_federal_register() -> list[dict]:
+def _fetch_federal_register(state: dict | None = None) -> tuple[list[dict], bool | None]:
+    """Return (items, changed) as _parse_rss does. Unchanged (304) results reuse the saved items."""
+    state = {} if state is None else state
     try:
-        r = requests.get(
-            "https://www.federalregister.gov/api/v1/documents.json",
+        r = _conditional_get(
+            FEDERAL_REGISTER_URL,
+            state,
             params={
                 "conditions[term]":    "electric vehicle charging",
                 "conditions[type][]":  ["RULE", "PROPOSED_RULE", "NOTICE"],
                 "per_page":            25,
                 "order":               "newest",
             },
-            timeout=8,
         )
-        r.raise_for_status()
+        if r is None:
+            return state.get("items", []), False
         items = []
         for doc in r.json().get("results", []):
             title    = (doc.get("title") or "").strip()
@@ -125,9 +296,10 @@ def _fetch_federal_register() -> list[dict]:
             if title and url:
                 items.append({"title": title, "link": url,
                                "date": pub_date, "description": abstract})
-        return items
+        _save_validators(state, r, items)
+        return items, True
     except Exception:
-        return []
+        return state.get("items", []), None
 
 
 def _curate_with_claude(items: list[dict], section: str, n: int = 10) -> list[dict]:
@@ -170,7 +342,7 @@ def _curate_with_claude(items: list[dict], section: str, n: int = 10) -> list[di
     )
 
     try:
-        client = anthropic.Anthropic(api_key=api_key)
+        client = get_client(api_key)
         resp   = client.messages.create(
             model="claude-haiku-4-5-20251001",
             max_tokens=1200,
@@ -189,28 +361,79 @@ def _curate_with_claude(items: list[dict], section: str, n: int = 10) -> list[di
 
 # ── Background fetch ──────────────────────────────────────────────────────────
 
-def _do_fetch() -> None:
+def _fetch_sources() -> tuple[list[dict], list[dict], bool]:
+    """Fetch every source concurrently with conditional GETs.
+
+    Returns (raw_news, raw_regs, changed); `changed` is False when no
+    source returned a new body.  Raises RuntimeError when every source
+    failed: the saved items are then no evidence of freshness, and the
+    cache's `updated` stamp (and so the API's ETag) must not move.
+    """
+    state = _read_feed_state()
+    for key in NEWS_FEEDS + [FEDERAL_REGISTER_URL]:
+        state.setdefault(key, {})
+
+    # One thread per source, so a refresh takes as long as the slowest one
+    with ThreadPoolExecutor(max_workers=len(NEWS_FEEDS) + 1) as pool:
+        news_futures = [pool.submit(_parse_rss, url, 20, state[url]) for url in NEWS_FEEDS]
+        regs_future  = pool.submit(_fetch_federal_register, state[FEDERAL_REGISTER_URL])
+
+        raw_news: list[dict] = []
+        outcomes = []
+        for future in news_futures:
+            items, fresh = future.result()
+            raw_news.extend(items)
+            outcomes.append(fresh)
+        raw_regs, fresh = regs_future.result()
+        outcomes.append(fresh)
+
+    _write_feed_state(state)
+    if all(fresh is None for fresh in outcomes):
+        raise RuntimeError("every news source failed")
+    return raw_news, raw_regs, any(outcomes)
+
+
+def _do_fetch(lock=None, force: bool = False) -> None:
+    """Refresh the shared cache; releases `lock` (the refresh lock) when done."""
     global _is_fetching
     try:
-        raw_news: list[dict] = []
-        for feed_url in NEWS_FEEDS:
-            raw_news.extend(_parse_rss(feed_url))
-        raw_regs = _fetch_federal_register()
-
-        news_items = _curate_with_claude(raw_news, "news", 10)
-        reg_items  = _curate_with_claude(raw_regs, "regulations", 10)
+        # Another worker may have finished a refresh while we waited for the lock
+        _, _, updated = _read_file_cache()
+        if not force and updated and datetime.utcnow() - updated < CACHE_TTL:
+            _load_file_cache_into_memory()
+            return
+
+        _update_file_state(refreshing_since=datetime.utcnow().isoformat())
+        raw_news, raw_regs, changed = _fetch_sources()
+        if not raw_news and not raw_regs:
+            raise RuntimeError("no items fetched from any news source")
+
+        prev_news, prev_regs, _ = _read_file_cache()
+        if not changed and prev_news:
+            # Nothing upstream changed — keep the curated lists, skip Claude
+            news_items, reg_items = prev_news, prev_regs
+        else:
+            news_items = _curate_with_claude(raw_news, "news", 10)
+            reg_items  = _curate_with_claude(raw_regs, "regulations", 10)
 
         # Write to file first (shared across all workers)
-        _write_file_cache(news_items, reg_items)
+        updated = _write_file_cache(news_items, reg_items)
 
-        # Update this worker's in-memory cache
+        # Update this worker's in-memory cache (same stamp as the file, so
+        # every worker derives the same /api/industry-news ETag)
         _cache["news"]        = news_items
         _cache["regulations"] = reg_items
-        _cache["updated"]     = datetime.utcnow()
-    except Exception:
-        pass
+        _cache["updated"]     = updated
+    except Exception as e:
+        _update_file_state(
+            refreshing_since=None,
+            last_error={"at": datetime.utcnow().isoformat(), "message": str(e)},
+        )
     finally:
         _is_fetching = False
+        _release_refresh_lock(lock)
+        with _refresh_done:
+            _refresh_done.notify_all()
 
 
 # ── Public API ────────────────────────────────────────────────────────────────
@@ -240,14 +463,61 @@ def get_industry_news(force_refresh: bool = False) -> tuple[list[dict], list[dic
         if file_valid:
             return _cache["news"], _cache["regulations"]
 
-    # 3. Stale or missing — kick off background refresh
+    # 3. Stale or missing — serve what we have; exactly one worker revalidates
     with _fetch_lock:
-        if not _is_fetching:
-            _is_fetching = True
-            threading.Thread(target=_do_fetch, daemon=True).start()
+        if not _is_fetching and (force_refresh or not _recently_failed()):
+            lock = _acquire_refresh_lock()
+            if lock is not None:
+                _is_fetching = True
+                threading.Thread(
+                    target=_do_fetch, args=(lock, force_refresh), daemon=True,
+                ).start()
 
     return _cache["news"] or [], _cache["regulations"] or []
 
 
+def _recently_failed() -> bool:
+    error = last_refresh_error()
+    if not error:
+        return False
+    return datetime.utcnow() - datetime.fromisoformat(error["at"]) < RETRY_AFTER
+
+
 def is_loading() -> bool:
-    return _is_fetching
+    """True while any worker is refreshing the shared cache."""
+    if _is_fetching:
+        return True
+    since = _read_file_state().get("refreshing_since")
+    if not since:
+        return False
+    return datetime.utcnow() - datetime.fromisoformat(since) < REFRESH_TIMEOUT
+
+
+def wait_for_refresh(timeout: float) -> bool:
+    """Block until no worker is refreshing the shared cache, or `timeout` seconds pass.
+
+    Returns True once the refresh is over, after loading its result into
+    this worker's memory so the next get_industry_news() serves it.
+    """
+    deadline = time.monotonic() + timeout
+    while is_loading():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        with _refresh_done:
+            _refresh_done.wait(min(remaining, WAIT_POLL_INTERVAL))
+
+    _, _, updated = _read_file_cache()
+    if updated and (_cache["updated"] is None or updated > _cache["updated"]):
+        _load_file_cache_into_memory()
+    return True
+
+
+def last_updated() -> datetime | None:
+    """When this worker's cached lists were produced (None before the first fetch)."""
+    return _cache["updated"]
+
+
+def last_refresh_error() -> dict | None:
+    """{"at": iso, "message": str} for the last failed refresh, if it hasn't succeeded since."""
+    return _read_file_state().get("last_error")
@@ -1,7 +1,9 @@
-import requests
-import anthropic
+from collections.abc import Iterator
 from flask import current_app
 
+from agents.client import get_client
+from agents.history import cached_system, fit_to_budget, record_usage
+
 NEWS_SYSTEM_PROMPT = """You are the Prezent.Energy News & Regulatory Intelligence agent.
 Your role is to help potential clients — City Fleet managers, Campus Facility Directors, and Residential
 Property Managers — understand the latest developments in the EV charging and clean-energy landscape
@@ -29,22 +31,41 @@ that are directly relevant to their operations.
 """
 
 
+NEWS_MODEL = "claude-sonnet-4-6"
+
+
+def _news_messages(user_query: str, conversation_history: list[dict] = None) -> list[dict]:
+    messages = list(conversation_history or [])
+    messages.append({"role": "user", "content": user_query})
+    return fit_to_budget(messages)
+
+
 def query_news_agent(user_query: str, conversation_history: list[dict] = None) -> str:
     """
     Answer a user query about CaaS news and regulations using Claude.
     conversation_history is an optional list of prior {role, content} exchanges.
     """
-    client = anthropic.Anthropic(
-        api_key=current_app.config["ANTHROPIC_API_KEY"],
-    )
-
-    messages = list(conversation_history or [])
-    messages.append({"role": "user", "content": user_query})
+    client = get_client(current_app.config["ANTHROPIC_API_KEY"])
 
     response = client.messages.create(
-        model="claude-sonnet-4-6",
+        model=NEWS_MODEL,
         max_tokens=1500,
-        system=NEWS_SYSTEM_PROMPT,
-        messages=messages,
+        system=cached_system(NEWS_SYSTEM_PROMPT),
+        messages=_news_messages(user_query, conversation_history),
     )
+    record_usage("news", NEWS_MODEL, response.usage)
     return response.content[0].text
+
+
+def stream_news_agent(user_query: str, conversation_history: list[dict] = None) -> Iterator[str]:
+    """Streaming variant of query_news_agent — yields answer text as it is generated."""
+    client = get_client(current_app.config["ANTHROPIC_API_KEY"])
+
+    with client.messages.stream(
+        model=NEWS_MODEL,
+        max_tokens=1500,
+        system=cached_system(NEWS_SYSTEM_PROMPT),
+        messages=_news_messages(user_query, conversation_history),
+    ) as stream:
+        yield from stream.text_stream
+        record_usage("news", NEWS_MODEL, stream.get_final_message().usage)
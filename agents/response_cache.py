@@ -0,0 +1,96 @@
+"""
+Response cache for chatbot completions.
+
+Backed by SQLite (instance/chat_cache.db) so every Passenger worker shares
+the same entries.  Entries expire after a TTL and the table is trimmed to
+a maximum size by least-recent use.
+
+Keys combine the model, a hash of the system prompt (so editing the fact
+base invalidates everything) and the conversation with whitespace, case
+and trailing punctuation normalised away.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+
+_BASE_DIR    = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PATH = os.path.normpath(os.path.join(_BASE_DIR, "..", "instance", "chat_cache.db"))
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS responses ("
+    "  key TEXT PRIMARY KEY,"
+    "  reply TEXT NOT NULL,"
+    "  created_at REAL NOT NULL,"
+    "  last_used REAL NOT NULL"
+    ")",
+    "CREATE INDEX IF NOT EXISTS ix_responses_last_used ON responses (last_used)",
+)
+
+
+def _normalise(text: str) -> str:
+    text = re.sub(r"\s+", " ", text or "").strip().lower()
+    return text.rstrip("?!. ")
+
+
+def cache_key(model: str, system_prompt: str, messages: list[dict]) -> str:
+    system_hash = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()
+    conversation = [[m["role"], _normalise(m["content"])] for m in messages]
+    raw = json.dumps([model, system_hash, conversation], separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, path: str = DEFAULT_PATH, ttl: float = 86400, max_entries: int = 5000):
+        self.path        = path
+        self.ttl         = ttl
+        self.max_entries = max_entries
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        for stmt in _SCHEMA:
+            conn.execute(stmt)
+        return conn
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT reply FROM responses WHERE key = ? AND created_at > ?",
+                (key, now - self.ttl),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            return row[0]
+        finally:
+            conn.close()
+
+    def set(self, key: str, reply: str) -> None:
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, reply, created_at, last_used) "
+                "VALUES (?, ?, ?, ?)",
+                (key, reply, now, now),
+            )
+            self._evict(conn, now)
+        finally:
+            conn.close()
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM responses WHERE created_at <= ?", (now - self.ttl,))
+        conn.execute(
+            "DELETE FROM responses WHERE key IN ("
+            "  SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?"
+            ")",
+            (self.max_entries,),
+        )
@@ -1,8 +1,11 @@
 import os
-from flask import Flask
+from flask import Flask, session
 from flask_cors import CORS
 from config import config
-from extensions import db, login_manager, mail
+from extensions import (
+    code_purger, db, lead_spool, login_manager, mail, mail_outbox, password_hasher,
+    schema_migrations, user_cache,
+)
 
 
 def create_app(config_name=None):
@@ -15,6 +18,12 @@ def create_app(config_name=None):
     CORS(app)
     db.init_app(app)
     mail.init_app(app)
+    lead_spool.init_app(app)
+    mail_outbox.init_app(app)
+    code_purger.init_app(app)
+    user_cache.init_app(app)
+    password_hasher.init_app(app)
+    schema_migrations.init_app(app)
 
     login_manager.login_view = "auth.login"
     login_manager.login_message = "Please sign in to access that page."
@@ -23,8 +32,8 @@ def create_app(config_name=None):
 
     @login_manager.user_loader
     def load_user(user_id):
-        from models import User
-        return User.query.get(int(user_id))
+        # Served from the per-worker snapshot cache; see services/user_cache.py
+        return user_cache.load(int(user_id), session.get("user_rev"))
 
     with app.app_context():
         from routes.main import main_bp
@@ -41,7 +50,8 @@ def create_app(config_name=None):
         app.register_blueprint(news_bp)
         app.register_blueprint(ev_users_bp)
 
-        db.create_all()
+        # One stamp query per worker boot; see services/schema_migrations.py
+        schema_migrations.check()
 
     return app
 
@@ -0,0 +1,108 @@
+"""
+Benchmark: worker cold start through passenger_wsgi, against a time budget.
+
+Each run is a fresh interpreter, as when Passenger spawns a worker: it
+imports passenger_wsgi (create_app("production")) and serves GET / once.
+Reported per run: boot (import + create_app), first byte (boot + first
+request) and the whole process wall time.  Also checks that the heavy
+dependencies now loaded on first use (anthropic, requests, xml.etree)
+were not imported.  The "eager" row pre-imports them, approximating the
+cold start before they were made lazy.
+
+Exits non-zero if the median first-byte time exceeds --budget-ms or a
+lazy dependency was imported at boot, so it can gate a deploy.
+
+Usage:
+    python benchmarks/bench_cold_start.py [--runs 7] [--budget-ms 1500]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+LAZY_MODULES = ("anthropic", "requests", "xml.etree.ElementTree")
+
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {root!r})
+if {eager!r}:
+    import anthropic, requests, xml.etree.ElementTree
+    from agents.chatbot import system_prompt; system_prompt()
+import passenger_wsgi
+boot = time.perf_counter() - start
+lazy_loaded = [m for m in {lazy!r} if m in sys.modules]
+
+from werkzeug.test import create_environ
+status = []
+body = b"".join(passenger_wsgi.application(create_environ("/"), lambda s, h, e=None: status.append(s)))
+first_byte = time.perf_counter() - start
+print(json.dumps({{"boot": boot, "first_byte": first_byte, "status": status[0],
+                  "lazy_loaded": lazy_loaded}}))
+"""
+
+
+def cold_start(env: dict, eager: bool = False) -> dict:
+    code = CHILD.format(root=ROOT, eager=eager, lazy=LAZY_MODULES)
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", code], env=env, cwd=ROOT,
+                         capture_output=True, text=True, check=True)
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    result["process"] = time.perf_counter() - start
+    if not result["status"].startswith("200"):
+        raise SystemExit(f"GET / returned {result['status']}:\n{out.stderr}")
+    return result
+
+
+def summarize(label: str, runs: list[dict]) -> float:
+    med = {k: statistics.median(r[k] for r in runs) * 1000 for k in ("boot", "first_byte", "process")}
+    worst = max(r["first_byte"] for r in runs) * 1000
+    print(f"{label:<8}{med['boot']:>10.0f}{med['first_byte']:>16.0f}{worst:>14.0f}{med['process']:>14.0f}")
+    return med["first_byte"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--budget-ms", type=float, default=1500)
+    parser.add_argument("--no-eager", action="store_true", help="skip the eager-import comparison")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Journals off: their backlog check runs in the background and
+        # would otherwise write the checkout's instance/ files
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                   IMPORT_TIME_REPORT="0", LEAD_SPOOL_ENABLED="0", MAIL_OUTBOX_ENABLED="0")
+        # Workers expect a migrated database; do it once, outside the timing
+        subprocess.run([sys.executable, "-m", "flask", "--app", "app", "db", "upgrade"],
+                       env=env, cwd=ROOT, capture_output=True, check=True)
+
+        cold_start(env)                                   # warm the OS file cache / .pyc files
+        runs = [cold_start(env) for _ in range(args.runs)]
+        print(f"{args.runs} cold starts (median ms; budget {args.budget_ms:.0f} ms to first byte)")
+        print(f"{'mode':<8}{'boot':>10}{'first byte':>16}{'worst fb':>14}{'process':>14}")
+        first_byte = summarize("lazy", runs)
+        if not args.no_eager:
+            summarize("eager", [cold_start(env, eager=True) for _ in range(args.runs)])
+
+    loaded = sorted({m for r in runs for m in r["lazy_loaded"]})
+    failures = []
+    if loaded:
+        failures.append(f"imported at boot: {', '.join(loaded)}")
+    if first_byte > args.budget_ms:
+        failures.append(f"median first byte {first_byte:.0f} ms exceeds {args.budget_ms:.0f} ms")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK: within budget")
+
+
+if __name__ == "__main__":
+    main()
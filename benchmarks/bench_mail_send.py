@@ -0,0 +1,121 @@
+"""
+Benchmark: vendored Flask-Mail throughput — connection per message vs.
+pooled sessions vs. send_many over one session.
+
+Runs against a local stand-in SMTP server that accepts everything and
+can add latency to the connection handshake (--handshake-ms), standing
+in for the TCP + STARTTLS + AUTH round trips of a real relay.
+
+Usage:
+    python benchmarks/bench_mail_send.py [--messages 500] [--handshake-ms 20]
+"""
+
+import argparse
+import os
+import socketserver
+import sys
+import threading
+import time
+
+_ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, os.path.join(_ROOT, "vendor"))
+sys.path.insert(0, _ROOT)
+
+from flask import Flask  # noqa: E402
+from flask_mail import Mail, Message  # noqa: E402
+
+
+class StandInSMTP(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: EHLO, MAIL, RCPT, DATA, NOOP, RSET, QUIT."""
+
+    handshake_delay = 0.0
+
+    def reply(self, line: str) -> None:
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+
+    def handle(self) -> None:
+        time.sleep(self.handshake_delay)
+        self.server.connections += 1
+        self.reply("220 stand-in ESMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            verb = line[:4].upper()
+            if verb in (b"EHLO", b"HELO"):
+                self.reply("250-stand-in")
+                self.reply("250 8BITMIME")
+            elif verb == b"DATA":
+                self.reply("354 go ahead")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                self.server.messages += 1
+                self.reply("250 queued")
+            elif verb == b"QUIT":
+                self.reply("221 bye")
+                return
+            else:
+                self.reply("250 ok")
+
+
+class StandInServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    connections = 0
+    messages = 0
+
+
+def make_messages(n: int) -> list[Message]:
+    return [
+        Message(f"Digest {i}", sender="info@prezent.energy",
+                recipients=[f"user{i}@example.com"], body="Weekly digest\n" * 20)
+        for i in range(n)
+    ]
+
+
+def run(server: StandInServer, pool_size: int, n: int, bulk: bool) -> tuple[float, int]:
+    app = Flask(__name__)
+    app.config.update(MAIL_SERVER="127.0.0.1", MAIL_PORT=server.server_address[1],
+                      MAIL_SUPPRESS_SEND=False, MAIL_POOL_SIZE=pool_size)
+    mail = Mail(app)
+    messages = make_messages(n)
+    server.connections = server.messages = 0
+
+    with app.app_context():
+        start = time.perf_counter()
+        if bulk:
+            assert not any(mail.send_many(messages))
+        else:
+            for msg in messages:
+                mail.send(msg)
+        elapsed = time.perf_counter() - start
+        if mail.pool:
+            mail.pool.clear()
+    assert server.messages == n
+    return elapsed, server.connections
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--handshake-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    StandInSMTP.handshake_delay = args.handshake_ms / 1000
+    server = StandInServer(("127.0.0.1", 0), StandInSMTP)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    print(f"{args.messages} messages, {args.handshake_ms:g} ms handshake")
+    print(f"{'mode':<22}{'time (s)':>10}{'msg/s':>10}{'connections':>13}")
+    for label, pool_size, bulk in (
+        ("send, no pool", 0, False),
+        ("send, pooled", 1, False),
+        ("send_many", 0, True),
+    ):
+        elapsed, conns = run(server, pool_size, args.messages, bulk)
+        print(f"{label:<22}{elapsed:>10.2f}{args.messages / elapsed:>10.0f}{conns:>13}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
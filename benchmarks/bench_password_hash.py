@@ -0,0 +1,99 @@
+"""
+Benchmark: a login burst with password hashing inline vs. in the bounded
+process pool, and what it does to an unrelated page view meanwhile.
+
+A burst of --logins concurrent check() calls runs on request threads;
+while it runs, a "page view" (a short pure-Python task on another
+thread) is timed repeatedly.
+
+Usage:
+    python benchmarks/bench_password_hash.py [--logins 32] [--workers 2]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from flask import Flask  # noqa: E402
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+from services.password_hasher import HasherBusy, PasswordHasher  # noqa: E402
+
+
+def page_view() -> float:
+    start = time.perf_counter()
+    sum(i * i for i in range(20_000))
+    return time.perf_counter() - start
+
+
+def run(workers: int, logins: int, method: str) -> dict:
+    app = Flask(__name__)
+    app.config.update(PASSWORD_HASH_WORKERS=workers, PASSWORD_HASH_METHOD=method,
+                      PASSWORD_HASH_QUEUE=workers * 4, PASSWORD_HASH_DEADLINE=10)
+    hasher = PasswordHasher(app)
+    pwhash = generate_password_hash("hunter2", method=method)
+    if workers:
+        hasher.check(pwhash, "hunter2")           # start the pool outside the timing
+
+    latencies, rejected = [], []
+    done = threading.Event()
+
+    def login():
+        start = time.perf_counter()
+        try:
+            hasher.check(pwhash, "hunter2")
+            latencies.append(time.perf_counter() - start)
+        except HasherBusy:
+            rejected.append(1)
+
+    views = []
+
+    def browse():
+        while not done.is_set():
+            views.append(page_view())
+
+    browser = threading.Thread(target=browse)
+    browser.start()
+    start = time.perf_counter()
+    threads = [threading.Thread(target=login) for _ in range(logins)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    done.set()
+    browser.join()
+
+    return {
+        "elapsed": elapsed,
+        "login_p50": statistics.median(latencies) if latencies else 0,
+        "served": len(latencies),
+        "rejected": len(rejected),
+        "view_p95": sorted(views)[int(0.95 * (len(views) - 1))] if views else 0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--logins", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--method", default="scrypt")
+    args = parser.parse_args()
+
+    baseline = statistics.median(page_view() for _ in range(50))
+    print(f"{args.logins} concurrent logins, {args.method}; idle page view {baseline * 1000:.1f} ms")
+    print(f"{'mode':<14}{'burst (s)':>11}{'login p50 (ms)':>16}{'served':>8}{'rejected':>10}"
+          f"{'view p95 (ms)':>15}")
+    for label, workers in (("inline", 0), (f"pool x{args.workers}", args.workers)):
+        r = run(workers, args.logins, args.method)
+        print(f"{label:<14}{r['elapsed']:>11.2f}{r['login_p50'] * 1000:>16.1f}{r['served']:>8}"
+              f"{r['rejected']:>10}{r['view_p95'] * 1000:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark: RSS parsing — whole-document ET.fromstring vs. streaming iterparse.
+
+Builds large local fixture feeds (full article HTML in content:encoded,
+like the real WordPress feeds) and reports parse time and peak traced
+memory for the old and new parsers.
+
+Usage:
+    python benchmarks/bench_rss_parse.py [--items 2000] [--body-kb 8]
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from agents.industry_news_agent import _iter_rss_items, _strip_html  # noqa: E402
+
+
+def build_feed(n_items: int, body_kb: int) -> bytes:
+    body = ("<p>" + "Lorem ipsum dolor sit amet, V2G charging. " * 24 + "</p>") * max(1, body_kb)
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<rss version="2.0" xmlns:content="http://purl.org/rss/1.0/modules/content/">',
+        "<channel><title>Fixture</title>",
+    ]
+    for i in range(n_items):
+        parts.append(
+            f"<item><title>Article {i}</title><link>https://example.com/{i}</link>"
+            f"<pubDate>Mon, 01 Jan 2026 00:00:00 +0000</pubDate>"
+            f"<description><![CDATA[Summary {i}]]></description>"
+            f"<content:encoded><![CDATA[{body}]]></content:encoded></item>"
+        )
+    parts.append("</channel></rss>")
+    return "".join(parts).encode("utf-8")
+
+
+def parse_fromstring(data: bytes, limit: int) -> list[dict]:
+    """The previous implementation: parse everything, then slice."""
+    root = ET.fromstring(data)
+    items = []
+    for item in root.findall(".//item")[:limit]:
+        title = _strip_html(item.findtext("title", ""))
+        link = (item.findtext("link") or "").strip()
+        if title and link:
+            items.append({"title": title, "link": link})
+    return items
+
+
+def measure(fn, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--body-kb", type=int, default=8)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    data = build_feed(args.items, args.body_kb)
+    print(f"fixture: {args.items} items, {len(data) / 1e6:.1f} MB, limit={args.limit}")
+
+    old, t_old, m_old = measure(parse_fromstring, data, args.limit)
+    new, t_new, m_new = measure(lambda: _iter_rss_items(io.BytesIO(data), args.limit))
+    assert [i["title"] for i in old] == [i["title"] for i in new]
+
+    print(f"{'parser':<12}{'time (ms)':>12}{'peak (MB)':>12}")
+    print(f"{'fromstring':<12}{t_old * 1000:>12.1f}{m_old / 1e6:>12.2f}")
+    print(f"{'iterparse':<12}{t_new * 1000:>12.1f}{m_new / 1e6:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
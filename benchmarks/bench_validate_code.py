@@ -0,0 +1,118 @@
+"""
+Benchmark: _validate_code lookup latency at millions of verification_codes
+rows, with and without ix_verification_codes_lookup, plus the expiry purge.
+
+Fills a throwaway SQLite database (mostly expired / used codes, one live
+code per user, like a table that was never purged), then times lookups
+for random users.
+
+Usage:
+    python benchmarks/bench_validate_code.py [--rows 2000000] [--users 20000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+# Engines are built from config at create_app time, so point at the
+# throwaway database before anything is imported
+_TMP = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TMP.name, 'bench.db')}"
+
+from app import create_app  # noqa: E402
+from extensions import db  # noqa: E402
+from models import User, VerificationCode  # noqa: E402
+from routes.auth import _validate_code  # noqa: E402
+from services.verification_codes import purge_expired_codes  # noqa: E402
+
+PURPOSES = ("login", "register", "settings")
+# Dropped to reproduce the table as it was before the indexes existed
+INDEXES = ("ix_verification_codes_lookup", "ix_verification_codes_expires_at")
+
+
+def fill(n_rows: int, n_users: int) -> None:
+    db.session.execute(User.__table__.insert(), [
+        {"full_name": f"User {i}", "email": f"u{i}@example.com", "password_hash": "x",
+         "is_verified": True}
+        for i in range(1, n_users + 1)
+    ])
+    now = datetime.utcnow()
+    table = VerificationCode.__table__
+    batch = []
+    for i in range(n_rows):
+        live = i >= n_rows - n_users          # the last n_users rows: one live code each
+        batch.append({
+            "user_id":    (i % n_users) + 1,
+            "code":       f"{random.randrange(1_000_000):06d}",
+            "purpose":    "login" if live else random.choice(PURPOSES),
+            "expires_at": now + timedelta(minutes=10) if live
+                          else now - timedelta(minutes=random.randrange(10, 500_000)),
+            "used":       False if live else random.random() < 0.8,
+        })
+        if len(batch) == 50_000:
+            db.session.execute(table.insert(), batch)
+            batch.clear()
+    if batch:
+        db.session.execute(table.insert(), batch)
+    db.session.commit()
+
+
+def time_lookups(n_users: int, samples: int, purpose: str = "login") -> float:
+    """Mean milliseconds per _validate_code call (wrong code: lookup only).
+
+    Every user holds a live "login" code; "settings" lookups find nothing
+    live, which is the case (expired code, retry) that scans the most.
+    """
+    users = [random.randint(1, n_users) for _ in range(samples)]
+    start = time.perf_counter()
+    for user_id in users:
+        ok, _ = _validate_code(user_id, purpose, "not-a-code")
+        assert not ok
+    return (time.perf_counter() - start) / samples * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--samples", type=int, default=200)
+    args = parser.parse_args()
+
+    with _TMP:
+        app = create_app("development")
+        app.config["VERIFICATION_PURGE_INTERVAL"] = 0
+        with app.app_context():
+            start = time.perf_counter()
+            fill(args.rows, args.users)
+            print(f"filled {args.rows:,} codes for {args.users:,} users "
+                  f"in {time.perf_counter() - start:.1f}s")
+
+            few = max(args.samples // 40, 3)
+            timings = {"indexed": (time_lookups(args.users, args.samples),
+                                   time_lookups(args.users, args.samples, "settings"))}
+            for name in INDEXES:
+                db.session.execute(db.text(f"DROP INDEX {name}"))
+            db.session.commit()
+            timings["no index"] = (time_lookups(args.users, few),
+                                   time_lookups(args.users, few, "settings"))
+
+            start = time.perf_counter()
+            purged = purge_expired_codes()
+            purge_s = time.perf_counter() - start
+            remaining = db.session.query(VerificationCode).count()
+            timings["no index, after purge"] = (time_lookups(args.users, few),
+                                                time_lookups(args.users, few, "settings"))
+
+        print(f"{'lookup (ms / call)':<26}{'live code':>12}{'no code':>12}")
+        for label, (hit, miss) in timings.items():
+            print(f"{label:<26}{hit:>12.3f}{miss:>12.3f}")
+        print(f"purge: {purged:,} rows in {purge_s:.1f}s, {remaining:,} left")
+
+if __name__ == "__main__":
+    main()
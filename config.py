@@ -25,14 +25,46 @@ class Config:
     MAIL_USERNAME = os.getenv("MAIL_USERNAME") or None
     MAIL_PASSWORD = os.getenv("MAIL_PASSWORD") or None
     MAIL_DEFAULT_SENDER = os.getenv("MAIL_DEFAULT_SENDER", "info@prezent.energy")
+    # Keep SMTP sessions open between Flask-Mail sends (vendored flask_mail)
+    MAIL_POOL_SIZE = int(os.getenv("MAIL_POOL_SIZE", "2"))
+    # Chatbot response cache (instance/chat_cache.db), shared by all workers
+    CHAT_CACHE_TTL = int(os.getenv("CHAT_CACHE_TTL", "86400"))
+    CHAT_CACHE_MAX_ENTRIES = int(os.getenv("CHAT_CACHE_MAX_ENTRIES", "5000"))
+    # Older chat turns are dropped to keep each request under this many tokens
+    CHAT_HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "6000"))
+    # /api/charging-stations result cache lifetime (zip geocodes never expire)
+    STATION_CACHE_TTL = int(os.getenv("STATION_CACHE_TTL", str(6 * 3600)))
+    # How long a "zip not found" geocode answer is trusted before asking again
+    UNKNOWN_ZIP_CACHE_TTL = int(os.getenv("UNKNOWN_ZIP_CACHE_TTL", str(24 * 3600)))
+    # Write-behind lead spool (instance/lead_spool.db) — see services/lead_spool.py
+    LEAD_SPOOL_ENABLED = os.getenv("LEAD_SPOOL_ENABLED", "0") == "1"
+    # Background verification-email delivery (instance/mail_outbox.db) — see services/mail_outbox.py
+    MAIL_OUTBOX_ENABLED = os.getenv("MAIL_OUTBOX_ENABLED", "0") == "1"
+    # Expired verification codes are deleted this often (seconds; 0 disables)
+    VERIFICATION_PURGE_INTERVAL = int(os.getenv("VERIFICATION_PURGE_INTERVAL", "3600"))
+    # Stateless HMAC codes instead of verification_codes rows
+    VERIFICATION_CODES_SIGNED = os.getenv("VERIFICATION_CODES_SIGNED", "0") == "1"
+    # Signed-in user snapshots kept per worker (seconds; 0 disables)
+    USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "300"))
+    # Password hashing — see services/password_hasher.py (0 workers = inline)
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt")
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "0"))
+    PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "8"))
+    PASSWORD_HASH_DEADLINE = float(os.getenv("PASSWORD_HASH_DEADLINE", "5"))
+    # Apply pending schema migrations at boot instead of via `flask db upgrade`
+    SCHEMA_AUTO_UPGRADE = os.getenv("SCHEMA_AUTO_UPGRADE", "0") == "1"
 
 
 class DevelopmentConfig(Config):
     DEBUG = True
+    SCHEMA_AUTO_UPGRADE = os.getenv("SCHEMA_AUTO_UPGRADE", "1") == "1"
 
 
 class ProductionConfig(Config):
     DEBUG = False
+    LEAD_SPOOL_ENABLED = os.getenv("LEAD_SPOOL_ENABLED", "1") == "1"
+    MAIL_OUTBOX_ENABLED = os.getenv("MAIL_OUTBOX_ENABLED", "1") == "1"
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
 
 
 config = {
@@ -83,8 +83,10 @@ echo "      cp .env.example .env"
 echo "      nano .env          # fill in ANTHROPIC_API_KEY and SECRET_KEY"
 echo ""
 echo " 6. Initialise the database:"
-echo "      python -c \"from app import create_app; create_app('production')\""
-echo "    (This runs db.create_all() and creates instance/leads.db.)"
+echo "      FLASK_ENV=production flask --app app db upgrade"
+echo "    (Creates the tables and indexes, or applies pending migrations on"
+echo "    an existing database. Re-run it after every deploy, before the"
+echo "    restart below.)"
 echo ""
 echo " 7. Back in 'Setup Python App', click 'Restart' to reload Passenger."
 echo ""
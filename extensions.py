@@ -1,7 +1,19 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_mail import Mail
+from services.lead_spool import LeadSpool
+from services.mail_outbox import MailOutbox
+from services.password_hasher import PasswordHasher
+from services.schema_migrations import SchemaMigrations
+from services.user_cache import UserCache
+from services.verification_codes import CodePurger
 
 db = SQLAlchemy()
 login_manager = LoginManager()
 mail = Mail()
+lead_spool = LeadSpool()
+mail_outbox = MailOutbox()
+code_purger = CodePurger()
+user_cache = UserCache()
+password_hasher = PasswordHasher()
+schema_migrations = SchemaMigrations()
@@ -5,6 +5,14 @@ from extensions import db
 
 class Lead(db.Model):
     __tablename__ = "leads"
+    __table_args__ = (
+        # Keyset pagination walks (created_at, id) newest-first
+        db.Index("ix_leads_created_at_id", "created_at", "id"),
+        # Lookups by contact email
+        db.Index("ix_leads_email", "email"),
+        # Lead spool replay: a journalled lead is inserted at most once
+        db.Index("ux_leads_spool_key", "spool_key", unique=True),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
@@ -36,6 +44,8 @@ class Lead(db.Model):
     comments = db.Column(db.Text, nullable=True)
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Idempotency key of the lead spool entry this row came from (NULL otherwise)
+    spool_key = db.Column(db.String(32), nullable=True)
 
     def to_dict(self):
         return {
@@ -51,7 +61,7 @@ class Lead(db.Model):
             "primary_interests": self.primary_interests,
             "timeline": self.timeline,
             "comments": self.comments,
-            "created_at": self.created_at.isoformat(),
+            "created_at": self.created_at.isoformat() if self.created_at else None,
         }
 
 
@@ -79,6 +89,12 @@ class User(UserMixin, db.Model):
 
 class EVUser(db.Model):
     __tablename__ = "ev_users"
+    # Dashboard: keyset pages per owner in either sort order, plus prefix search
+    __table_args__ = (
+        db.Index("ix_ev_users_user_full_name", "user_id", "full_name", "id"),
+        db.Index("ix_ev_users_user_license_plate", "user_id", "license_plate", "id"),
+        db.Index("ix_ev_users_user_make_model", "user_id", "car_make", "car_model"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     # Client account that owns this record
@@ -111,6 +127,12 @@ class EVUser(db.Model):
 
 class VerificationCode(db.Model):
     __tablename__ = "verification_codes"
+    __table_args__ = (
+        # _validate_code: equality on user/purpose/used, range on expiry
+        db.Index("ix_verification_codes_lookup", "user_id", "purpose", "used", "expires_at"),
+        # Expiry purge (services/verification_codes.py)
+        db.Index("ix_verification_codes_expires_at", "expires_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
@@ -119,3 +141,26 @@ class VerificationCode(db.Model):
     purpose = db.Column(db.String(20), nullable=False)
     expires_at = db.Column(db.DateTime, nullable=False)
     used = db.Column(db.Boolean, default=False, nullable=False)
+
+
+class LlmUsage(db.Model):
+    __tablename__ = "llm_usage"
+
+    id = db.Column(db.Integer, primary_key=True)
+    # agent: 'chatbot' | 'news'
+    agent = db.Column(db.String(30), nullable=False)
+    model = db.Column(db.String(60), nullable=False)
+    input_tokens = db.Column(db.Integer, nullable=False, default=0)
+    cache_read_tokens = db.Column(db.Integer, nullable=False, default=0)
+    cache_write_tokens = db.Column(db.Integer, nullable=False, default=0)
+    output_tokens = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class SchemaVersion(db.Model):
+    """One row per applied step in services/schema_migrations.py."""
+    __tablename__ = "schema_version"
+
+    version = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    description = db.Column(db.String(200), nullable=False)
+    applied_at = db.Column(db.DateTime, nullable=False)
@@ -3,9 +3,18 @@ _here = os.path.dirname(__file__)
 sys.path.insert(0, _here)
 sys.path.insert(0, os.path.join(_here, "vendor"))                                                                                        
   
+# Opt-in per-module import times, written to stderr.log; see services/import_timer.py
+_import_report = os.environ.get("IMPORT_TIME_REPORT") == "1"
+if _import_report:
+    from services import import_timer
+    import_timer.install()
+
 try:
     from app import create_app
     application = create_app("production")
+    if _import_report:
+        import_timer.uninstall()
+        sys.stderr.write(import_timer.report())
 except Exception:
     err = traceback.format_exc()
     def application(environ, start_response):
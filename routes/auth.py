@@ -1,19 +1,25 @@
 import random
-import smtplib
 import socket
 import string
 from datetime import datetime, timedelta
 from email.mime.text import MIMEText
 
-from flask import Blueprint, current_app, flash, redirect, render_template, request, session, url_for
+from flask import (
+    Blueprint, current_app, flash, jsonify, redirect, render_template, request, session, url_for,
+)
 from flask_login import current_user, login_required, login_user, logout_user
-from werkzeug.security import check_password_hash, generate_password_hash
+from werkzeug.security import generate_password_hash
 
-from extensions import db
+from extensions import code_purger, db, mail_outbox, password_hasher, user_cache
 from models import User, VerificationCode
+from services.mail_outbox import open_smtp
+from services.password_hasher import HasherBusy
+from services.verification_codes import check_signed_code, signed_code
 
 auth_bp = Blueprint("auth", __name__, url_prefix="/auth")
 
+BUSY_MESSAGE = "We're handling a lot of sign-ins right now. Please try again in a moment."
+
 
 # ---------------------------------------------------------------------------
 # Helper
@@ -22,20 +28,27 @@ auth_bp = Blueprint("auth", __name__, url_prefix="/auth")
 def send_verification_code(user, purpose):
     """Generate a 6-digit code, persist it, and email it to the user.
 
-    Returns (code, error_message). error_message is None on success.
+    With the mail outbox enabled the email is only queued here and sent by
+    the background dispatcher.  With VERIFICATION_CODES_SIGNED the code is
+    derived rather than stored.  Returns (code, error_message);
+    error_message is None on success.
     """
-    code = "".join(random.choices(string.digits, k=6))
-    expires_at = datetime.utcnow() + timedelta(minutes=10)
-
-    vc = VerificationCode(
-        user_id=user.id,
-        code=code,
-        purpose=purpose,
-        expires_at=expires_at,
-        used=False,
-    )
-    db.session.add(vc)
-    db.session.commit()
+    if current_app.config.get("VERIFICATION_CODES_SIGNED"):
+        code = signed_code(current_app.config["SECRET_KEY"], user.id, purpose)
+    else:
+        code = "".join(random.choices(string.digits, k=6))
+        expires_at = datetime.utcnow() + timedelta(minutes=10)
+
+        vc = VerificationCode(
+            user_id=user.id,
+            code=code,
+            purpose=purpose,
+            expires_at=expires_at,
+            used=False,
+        )
+        db.session.add(vc)
+        db.session.commit()
+        code_purger.start()
 
     purpose_labels = {
         "register": "complete your registration",
@@ -53,11 +66,7 @@ def send_verification_code(user, purpose):
         f"please ignore this email.\n\n"
         f"- The Prezent.Energy Team"
     )
-    sender   = current_app.config.get("MAIL_DEFAULT_SENDER", "info@prezent.energy")
-    server   = current_app.config.get("MAIL_SERVER", "localhost")
-    port     = int(current_app.config.get("MAIL_PORT", 25))
-    username = current_app.config.get("MAIL_USERNAME") or None
-    password = current_app.config.get("MAIL_PASSWORD") or None
+    sender = current_app.config.get("MAIL_DEFAULT_SENDER", "info@prezent.energy")
 
     mime = MIMEText(body, "plain", "utf-8")
     mime["Subject"] = subject
@@ -65,14 +74,11 @@ def send_verification_code(user, purpose):
     mime["To"] = user.email
 
     try:
-        with smtplib.SMTP(server, port, timeout=10) as smtp:
-            smtp.ehlo()
-            if smtp.has_extn("STARTTLS"):
-                smtp.starttls()
-                smtp.ehlo()
-            if username and password:
-                smtp.login(username, password)
-            smtp.sendmail(sender, [user.email], mime.as_string())
+        if mail_outbox.enabled:
+            mail_outbox.enqueue(sender, [user.email], mime.as_string())
+        else:
+            with open_smtp(current_app.config) as smtp:
+                smtp.sendmail(sender, [user.email], mime.as_string())
         return code, None
     except Exception as e:
         return code, str(e)
@@ -80,6 +86,11 @@ def send_verification_code(user, purpose):
 
 def _validate_code(user_id, purpose, submitted_code):
     """Return (True, None) if valid; (False, error_message) otherwise."""
+    if current_app.config.get("VERIFICATION_CODES_SIGNED"):
+        if check_signed_code(current_app.config["SECRET_KEY"], user_id, purpose, submitted_code):
+            return True, None
+        return False, "Incorrect or expired code. Please try again."
+
     now = datetime.utcnow()
     vc = (
         VerificationCode.query
@@ -131,10 +142,16 @@ def register_post():
         flash("An account with that email already exists.", "error")
         return redirect(url_for("auth.register"))
 
+    try:
+        password_hash = password_hasher.generate(password)
+    except HasherBusy:
+        flash(BUSY_MESSAGE, "error")
+        return redirect(url_for("auth.register"))
+
     user = User(
         full_name=full_name,
         email=email,
-        password_hash=generate_password_hash(password),
+        password_hash=password_hash,
         address=address,
         organization=organization,
         phone=phone,
@@ -188,6 +205,7 @@ def verify_post():
     if purpose == "register":
         user.is_verified = True
         db.session.commit()
+        user_cache.user_changed(user.id, session)
         login_user(user)
         session.pop("pending_user_id", None)
         session.pop("verify_purpose", None)
@@ -214,9 +232,13 @@ def verify_post():
             user.phone = pending["phone"]
         if "additional_info" in pending:
             user.additional_info = pending["additional_info"]
-        if pending.get("new_password"):
+        if pending.get("new_password_hash"):
+            user.password_hash = pending["new_password_hash"]
+        elif pending.get("new_password"):
+            # Staged before passwords were hashed at account_post time
             user.password_hash = generate_password_hash(pending["new_password"])
         db.session.commit()
+        user_cache.user_changed(user.id, session)
         session.pop("pending_user_id", None)
         session.pop("verify_purpose", None)
         flash("Account updated successfully.", "success")
@@ -243,7 +265,12 @@ def login_post():
     password = request.form.get("password", "")
 
     user = User.query.filter_by(email=email).first()
-    if not user or not check_password_hash(user.password_hash, password):
+    try:
+        valid = user is not None and password_hasher.check(user.password_hash, password)
+    except HasherBusy:
+        flash(BUSY_MESSAGE, "error")
+        return redirect(url_for("auth.login"))
+    if not valid:
         flash("Invalid email or password.", "error")
         return redirect(url_for("auth.login"))
 
@@ -290,13 +317,20 @@ def account_post():
         flash("New passwords do not match.", "error")
         return redirect(url_for("auth.account"))
 
+    # Hash now so the signed (not encrypted) session never holds the password
+    try:
+        new_password_hash = password_hasher.generate(new_password) if new_password else None
+    except HasherBusy:
+        flash(BUSY_MESSAGE, "error")
+        return redirect(url_for("auth.account"))
+
     session["pending_profile"] = {
         "full_name": full_name,
         "address": address,
         "organization": organization,
         "phone": phone,
         "additional_info": additional_info,
-        "new_password": new_password if new_password else None,
+        "new_password_hash": new_password_hash,
     }
     _, mail_err = send_verification_code(current_user, "settings")
     if mail_err:
@@ -305,3 +339,25 @@ def account_post():
     session["pending_user_id"] = current_user.id
     session["verify_purpose"] = "settings"
     return redirect(url_for("auth.verify"))
+
+
+# ---------------------------------------------------------------------------
+# Mail outbox
+# ---------------------------------------------------------------------------
+
+@auth_bp.route("/outbox", methods=["GET"])
+def outbox_status():
+    """Admin endpoint — queue depth and delivery latency of the mail outbox."""
+    if not mail_outbox.enabled:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, **mail_outbox.stats()})
+
+
+# ---------------------------------------------------------------------------
+# Password hashing
+# ---------------------------------------------------------------------------
+
+@auth_bp.route("/hasher", methods=["GET"])
+def hasher_status():
+    """Admin endpoint — password-hash pool queue depth, rejections and timings."""
+    return jsonify(password_hasher.stats())
@@ -1,9 +1,10 @@
 import os
+import json
 import smtplib
 from email.mime.text import MIMEText
-from flask import Blueprint, request, jsonify, current_app
-from agents.chatbot import get_chat_response
-from agents.news_agent import query_news_agent
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
+from agents.chatbot import get_chat_response, stream_chat_response
+from agents.news_agent import query_news_agent, stream_news_agent
 
 chat_bp = Blueprint("chat", __name__)
 
@@ -28,8 +29,8 @@ def chat_debug():
     # 3. Quick API call (haiku, 5 tokens)
     if api_key:
         try:
-            import anthropic as _a
-            c = _a.Anthropic(api_key=api_key)
+            from agents.client import get_client
+            c = get_client(api_key)
             r = c.messages.create(
                 model="claude-haiku-4-5-20251001",
                 max_tokens=5,
@@ -39,7 +40,28 @@ def chat_debug():
         except Exception as e:
             info["api_call_error"] = str(e)
 
-    # 4. env file path check
+    # 4. Token usage totals (prompt-caching savings show up as cache_read)
+    try:
+        from sqlalchemy import func
+        from extensions import db
+        from models import LlmUsage
+        rows = db.session.query(
+            LlmUsage.agent,
+            func.count(LlmUsage.id),
+            func.sum(LlmUsage.input_tokens),
+            func.sum(LlmUsage.cache_read_tokens),
+            func.sum(LlmUsage.cache_write_tokens),
+            func.sum(LlmUsage.output_tokens),
+        ).group_by(LlmUsage.agent).all()
+        info["token_usage"] = {
+            agent: {"calls": calls, "input": inp or 0, "cache_read": read or 0,
+                    "cache_write": write or 0, "output": out or 0}
+            for agent, calls, inp, read, write, out in rows
+        }
+    except Exception as e:
+        info["token_usage_error"] = str(e)
+
+    # 5. env file path check
     env_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".env")
     info["env_file_exists"] = os.path.isfile(os.path.normpath(env_path))
 
@@ -128,6 +150,9 @@ def chat():
         if msg.get("role") not in ("user", "assistant") or not msg.get("content"):
             return jsonify({"error": "each message needs role and content"}), 400
 
+    if _wants_stream(data):
+        return _sse_response(stream_chat_response(messages))
+
     try:
         reply = get_chat_response(messages)
         return jsonify({"reply": reply})
@@ -146,6 +171,9 @@ def news_query():
     if not query:
         return jsonify({"error": "query is required"}), 400
 
+    if _wants_stream(data):
+        return _sse_response(stream_news_agent(query, history))
+
     try:
         answer = query_news_agent(query, history)
         return jsonify({"answer": answer})
@@ -155,6 +183,38 @@ def news_query():
         return jsonify({"error": "AI service unavailable"}), 200
 
 
+def _wants_stream(data):
+    """Stream when the body says so or the client prefers text/event-stream."""
+    if data.get("stream") is True:
+        return True
+    best = request.accept_mimetypes.best_match(["application/json", "text/event-stream"])
+    return best == "text/event-stream"
+
+
+def _sse_response(chunks):
+    """Relay text chunks as Server-Sent Events.
+
+    Each chunk is sent as `data: {"delta": ...}`; the stream ends with an
+    `event: done` frame, or `event: error` if the model call fails.
+    """
+    def generate():
+        # Commit headers right away so proxies start relaying
+        yield ": stream open\n\n"
+        try:
+            for text in chunks:
+                yield f"data: {json.dumps({'delta': text})}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except Exception as e:
+            current_app_logger_safe(e)
+            yield f"event: error\ndata: {json.dumps({'error': 'AI service unavailable'})}\n\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 def current_app_logger_safe(e):
     try:
         from flask import current_app
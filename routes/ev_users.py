@@ -1,53 +1,142 @@
-from flask import Blueprint, flash, redirect, render_template, request, url_for
+import base64
+import csv
+import hashlib
+import io
+
+from flask import (
+    Blueprint, Response, flash, jsonify, redirect, render_template, request, stream_with_context,
+    url_for,
+)
 from flask_login import current_user, login_required
+from sqlalchemy import and_, bindparam, delete as sql_delete, or_, select, update
 
 from extensions import db
 from models import EVUser
 
 ev_users_bp = Blueprint("ev_users", __name__, url_prefix="/settings")
 
+PAGE_SIZE = 50
+SORT_FIELDS = ("full_name", "license_plate")
+SEARCH_FIELDS = ("full_name", "license_plate", "car_make", "car_model")
+EV_USER_FIELDS = ("full_name", "email", "phone", "car_make", "car_model", "license_plate")
+IMPORT_BATCH_SIZE = 500
+IMPORT_ERRORS_SHOWN = 5
+EXPORT_CHUNK_SIZE = 500
+MAX_BATCH_OPERATIONS = 500
+
+
+# ---------------------------------------------------------------------------
+# Keyset cursor helpers
+# ---------------------------------------------------------------------------
+
+def _encode_cursor(ev_user, sort):
+    raw = f"{getattr(ev_user, sort)}|{ev_user.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor):
+    """Return (sort value, id) for an opaque cursor, or None if missing/malformed."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value, _, ev_user_id = base64.urlsafe_b64decode(padded).decode().rpartition("|")
+        return value, int(ev_user_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def _keyset(query, column, descending, cursor=None):
+    """Order by (column, id), resuming strictly past `cursor` in that direction."""
+    if cursor is not None:
+        value, ev_user_id = cursor
+        if descending:
+            query = query.filter(or_(
+                column < value, and_(column == value, EVUser.id < ev_user_id),
+            ))
+        else:
+            query = query.filter(or_(
+                column > value, and_(column == value, EVUser.id > ev_user_id),
+            ))
+    if descending:
+        return query.order_by(column.desc(), EVUser.id.desc())
+    return query.order_by(column.asc(), EVUser.id.asc())
+
+
+def _prefix_search(query, q):
+    """Rows where name, plate, make or model starts with `q`."""
+    pattern = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    return query.filter(or_(*(
+        getattr(EVUser, field).like(pattern, escape="\\") for field in SEARCH_FIELDS
+    )))
+
 
 @ev_users_bp.route("/ev-users")
 @login_required
 def dashboard():
+    """One page of the fleet, sorted on an indexed column and optionally filtered.
+
+    Query args: sort (full_name | license_plate), dir (asc | desc), q (prefix
+    search) and after / before (opaque cursors from the page links).
+    """
     sort = request.args.get("sort", "full_name")
-    if sort not in ("full_name", "license_plate"):
+    if sort not in SORT_FIELDS:
         sort = "full_name"
+    direction = "desc" if request.args.get("dir") == "desc" else "asc"
+    q = request.args.get("q", "").strip()
 
-    ev_users = (
-        EVUser.query.filter_by(user_id=current_user.id)
-        .order_by(getattr(EVUser, sort))
+    query = EVUser.query.filter_by(user_id=current_user.id)
+    if q:
+        query = _prefix_search(query, q)
+    total = query.count()
+
+    # Paging backwards walks the index the other way, then flips the page
+    before = _decode_cursor(request.args.get("before"))
+    after = None if before else _decode_cursor(request.args.get("after"))
+    backwards = before is not None
+    column = getattr(EVUser, sort)
+    rows = (
+        _keyset(query, column, (direction == "desc") != backwards, before or after)
+        .limit(PAGE_SIZE + 1)
         .all()
     )
-    return render_template("ev_users.html", ev_users=ev_users, sort=sort)
+    has_more = len(rows) > PAGE_SIZE
+    ev_users = rows[:PAGE_SIZE]
+    if backwards:
+        ev_users.reverse()
+
+    has_next = has_more if not backwards else True
+    has_prev = has_more if backwards else after is not None
+    params = {"sort": sort, "dir": direction, "q": q or None}
+    next_url = prev_url = None
+    if ev_users and has_next:
+        next_url = url_for("ev_users.dashboard", after=_encode_cursor(ev_users[-1], sort), **params)
+    if ev_users and has_prev:
+        prev_url = url_for("ev_users.dashboard", before=_encode_cursor(ev_users[0], sort), **params)
+
+    return render_template(
+        "ev_users.html", ev_users=ev_users, sort=sort, direction=direction, q=q,
+        total=total, next_url=next_url, prev_url=prev_url,
+    )
+
+
+def _ev_user_values(source):
+    """The stripped EVUser fields from a form or CSV row (missing → "")."""
+    return {field: (source.get(field) or "").strip() for field in EV_USER_FIELDS}
 
 
 @ev_users_bp.route("/ev-users/add", methods=["POST"])
 @login_required
 def add():
-    full_name = request.form.get("full_name", "").strip()
-    email = request.form.get("email", "").strip()
-    phone = request.form.get("phone", "").strip()
-    car_make = request.form.get("car_make", "").strip()
-    car_model = request.form.get("car_model", "").strip()
-    license_plate = request.form.get("license_plate", "").strip()
-
-    if not all([full_name, email, phone, car_make, car_model, license_plate]):
+    values = _ev_user_values(request.form)
+    if not all(values.values()):
         flash("All fields are required.", "error")
         return redirect(url_for("ev_users.dashboard"))
 
-    ev_user = EVUser(
-        user_id=current_user.id,
-        full_name=full_name,
-        email=email,
-        phone=phone,
-        car_make=car_make,
-        car_model=car_model,
-        license_plate=license_plate,
-    )
+    ev_user = EVUser(user_id=current_user.id, **values)
     db.session.add(ev_user)
     db.session.commit()
-    flash(f"{full_name} has been added to your EV fleet.", "success")
+    flash(f"{values['full_name']} has been added to your EV fleet.", "success")
     return redirect(url_for("ev_users.dashboard"))
 
 
@@ -77,3 +166,310 @@ def delete(ev_user_id):
     db.session.commit()
     flash(f"{name} has been removed from your EV fleet.", "success")
     return redirect(url_for("ev_users.dashboard"))
+
+
+# ---------------------------------------------------------------------------
+# CSV roster import / export
+# ---------------------------------------------------------------------------
+
+def _roster_reject_reason(values):
+    if not all(values.values()):
+        return "all fields are required"
+    for name, value in values.items():
+        length = EVUser.__table__.c[name].type.length
+        if len(value) > length:
+            return f"{name} exceeds {length} characters"
+    return None
+
+
+def _insert_roster_batch(user_id, batch):
+    """Insert one batch in a single transaction, skipping plates the owner already has.
+
+    Returns (inserted, duplicates).
+    """
+    plates = [values["license_plate"] for values in batch]
+    existing = set(db.session.scalars(
+        select(EVUser.license_plate).where(
+            EVUser.user_id == user_id, EVUser.license_plate.in_(plates),
+        )
+    ))
+    rows = [{"user_id": user_id, **values} for values in batch
+            if values["license_plate"] not in existing]
+    if rows:
+        db.session.execute(EVUser.__table__.insert(), rows)
+    db.session.commit()
+    return len(rows), len(batch) - len(rows)
+
+
+@ev_users_bp.route("/ev-users/import", methods=["POST"])
+@login_required
+def import_roster():
+    """Add vehicles from an uploaded CSV with a header row of EV_USER_FIELDS.
+
+    The upload is read row by row (werkzeug spools large files to disk) and
+    valid rows are inserted in transactions of IMPORT_BATCH_SIZE. Rows get
+    the same required-field check as `add`; a license plate already in the
+    fleet, or earlier in the file, is skipped.
+    """
+    upload = request.files.get("roster")
+    if upload is None or not upload.filename:
+        flash("Choose a CSV file to import.", "error")
+        return redirect(url_for("ev_users.dashboard"))
+
+    user_id = current_user.id
+    inserted = duplicates = 0
+    errors = []
+    seen = set()
+    batch = []
+    try:
+        reader = csv.DictReader(io.TextIOWrapper(upload.stream, encoding="utf-8-sig", newline=""))
+        missing = [f for f in EV_USER_FIELDS if f not in (reader.fieldnames or ())]
+        if missing:
+            flash(f"CSV is missing column(s): {', '.join(missing)}.", "error")
+            return redirect(url_for("ev_users.dashboard"))
+
+        for record in reader:
+            values = _ev_user_values(record)
+            error = _roster_reject_reason(values)
+            if error:
+                errors.append(f"line {reader.line_num}: {error}")
+                continue
+            if values["license_plate"] in seen:
+                duplicates += 1
+                continue
+            seen.add(values["license_plate"])
+            batch.append(values)
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                added, skipped = _insert_roster_batch(user_id, batch)
+                inserted, duplicates = inserted + added, duplicates + skipped
+                batch = []
+        if batch:
+            added, skipped = _insert_roster_batch(user_id, batch)
+            inserted, duplicates = inserted + added, duplicates + skipped
+    except (UnicodeDecodeError, csv.Error) as e:
+        # Batches already committed stay committed
+        errors.append(f"stopped reading the file: {e}")
+
+    flash(
+        f"Imported {inserted} vehicle{'s' if inserted != 1 else ''}; "
+        f"skipped {duplicates} duplicate plate{'s' if duplicates != 1 else ''} "
+        f"and {len(errors)} invalid row{'s' if len(errors) != 1 else ''}.",
+        "error" if errors and not inserted else "success",
+    )
+    if errors:
+        more = len(errors) - IMPORT_ERRORS_SHOWN
+        flash("; ".join(errors[:IMPORT_ERRORS_SHOWN]) + (f"; and {more} more" if more > 0 else ""),
+              "error")
+    return redirect(url_for("ev_users.dashboard"))
+
+
+@ev_users_bp.route("/ev-users/export")
+@login_required
+def export_roster():
+    """Stream the fleet as CSV through a server-side cursor, EXPORT_CHUNK_SIZE rows at a time."""
+    columns = [EVUser.__table__.c[field] for field in EV_USER_FIELDS]
+    stmt = (
+        select(*columns)
+        .where(EVUser.user_id == current_user.id)
+        .order_by(EVUser.full_name, EVUser.id)
+        .execution_options(stream_results=True, yield_per=EXPORT_CHUNK_SIZE)
+    )
+
+    def generate():
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(EV_USER_FIELDS)
+
+        result = db.session.execute(stmt)
+        try:
+            for partition in result.partitions():
+                writer.writerows(partition)
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+            if buf.tell():
+                yield buf.getvalue()
+        finally:
+            result.close()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/csv",
+        headers={"Content-Disposition": "attachment; filename=ev-fleet.csv"},
+    )
+
+
+# ---------------------------------------------------------------------------
+# JSON batch API
+# ---------------------------------------------------------------------------
+
+def _etag(ev_user_id, values):
+    """Opaque version tag for a record: changes whenever any field does."""
+    raw = "\x1f".join([str(ev_user_id)] + [values[field] for field in EV_USER_FIELDS])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _api_item(ev_user):
+    return {**ev_user.to_dict(), "etag": _etag(ev_user.id, ev_user.to_dict())}
+
+
+@ev_users_bp.route("/ev-users/api", methods=["GET"])
+@login_required
+def api_list():
+    """One page of the fleet with ETags, for clients of the batch endpoint.
+
+    Query params: ?after=<cursor> (from "next"), or ?ids=1,2,3 for specific
+    records. Ordered by full_name like the dashboard.
+    """
+    query = EVUser.query.filter_by(user_id=current_user.id)
+    if request.args.get("ids"):
+        try:
+            ids = [int(i) for i in request.args["ids"].split(",")][:MAX_BATCH_OPERATIONS]
+        except ValueError:
+            return jsonify({"error": "ids must be comma-separated integers"}), 400
+        ev_users = query.filter(EVUser.id.in_(ids)).order_by(EVUser.id).all()
+        return jsonify({"items": [_api_item(e) for e in ev_users], "next": None})
+
+    after = None
+    if request.args.get("after"):
+        after = _decode_cursor(request.args["after"])
+        if after is None:
+            return jsonify({"error": "invalid cursor"}), 400
+    rows = _keyset(query, EVUser.full_name, False, after).limit(PAGE_SIZE + 1).all()
+    ev_users = rows[:PAGE_SIZE]
+    next_cursor = _encode_cursor(ev_users[-1], "full_name") if len(rows) > PAGE_SIZE else None
+    return jsonify({"items": [_api_item(e) for e in ev_users], "next": next_cursor})
+
+
+def _check_operation(op, owned, seen_ids):
+    """Return (error, http-ish status) for one batch operation, or (None, None)."""
+    if not isinstance(op, dict) or op.get("op") not in ("create", "update", "delete"):
+        return "op must be create, update or delete", 400
+
+    fields = op.get("fields") or {}
+    if op["op"] != "delete":
+        if not isinstance(fields, dict):
+            return "fields must be an object", 400
+        unknown = sorted(set(fields) - set(EV_USER_FIELDS))
+        if unknown:
+            return f"unknown field(s): {', '.join(unknown)}", 400
+        if not all(isinstance(v, str) for v in fields.values()):
+            return "field values must be strings", 400
+
+    if op["op"] == "create":
+        return _roster_reject_reason(_ev_user_values(fields)), 400
+
+    ev_user_id = op.get("id")
+    if not isinstance(ev_user_id, int) or isinstance(ev_user_id, bool):
+        return "id must be an integer", 400
+    if ev_user_id in seen_ids:
+        return "id appears more than once in the batch", 400
+    seen_ids.add(ev_user_id)
+    if ev_user_id not in owned:
+        return "not found", 404
+    if op.get("etag") is not None and op["etag"] != owned[ev_user_id][0]:
+        return "etag does not match the current record", 412
+    if op["op"] == "update":
+        if not fields:
+            return "fields is required for update", 400
+        values = {**owned[ev_user_id][1], **{k: v.strip() for k, v in fields.items()}}
+        return _roster_reject_reason(values), 400
+    return None, None
+
+
+@ev_users_bp.route("/ev-users/batch", methods=["POST"])
+@login_required
+def api_batch():
+    """Apply many create / update / delete operations in one transaction.
+
+    Body: {"operations": [
+        {"op": "create", "fields": {...all EV_USER_FIELDS...}},
+        {"op": "update", "id": 7, "etag": "...", "fields": {"car_model": "R1S"}},
+        {"op": "delete", "id": 9, "etag": "..."},
+    ]}
+
+    "etag" is optional; when given, the operation only applies if the record
+    still matches it. Everything is checked against one locked read of the
+    targeted rows before anything is written. Deletes are then a single
+    DELETE ... WHERE id IN, and updates one executemany UPDATE per set of
+    changed fields, all scoped to the signed-in owner. If any operation is
+    rejected nothing is applied and the response is 409 (412 when only
+    ETags failed) with per-item results.
+    """
+    data = request.get_json(silent=True)
+    operations = data.get("operations") if isinstance(data, dict) else None
+    if not isinstance(operations, list) or not operations:
+        return jsonify({"error": "operations must be a non-empty list"}), 400
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        return jsonify({"error": f"at most {MAX_BATCH_OPERATIONS} operations per batch"}), 400
+
+    user_id = current_user.id
+    table = EVUser.__table__
+    target_ids = {op.get("id") for op in operations
+                  if isinstance(op, dict) and isinstance(op.get("id"), int)}
+    owned = {}
+    if target_ids:
+        rows = db.session.execute(
+            select(table.c.id, *[table.c[f] for f in EV_USER_FIELDS])
+            .where(table.c.user_id == user_id, table.c.id.in_(target_ids))
+            .with_for_update()
+        )
+        for row in rows:
+            values = {f: getattr(row, f) for f in EV_USER_FIELDS}
+            owned[row.id] = (_etag(row.id, values), values)
+
+    results, statuses, seen_ids = [], set(), set()
+    for index, op in enumerate(operations):
+        error, status = _check_operation(op, owned, seen_ids)
+        if error:
+            statuses.add(status)
+            results.append({"index": index, "status": status, "error": error})
+        else:
+            results.append({"index": index, "status": None})
+    if statuses:
+        db.session.rollback()
+        for result in results:
+            if result["status"] is None:
+                result.update(status=424, error="not applied: another operation was rejected")
+        return jsonify({"applied": False, "results": results}), 412 if statuses == {412} else 409
+
+    deletes = [op["id"] for op in operations if op["op"] == "delete"]
+    if deletes:
+        db.session.execute(
+            sql_delete(table).where(table.c.user_id == user_id, table.c.id.in_(deletes))
+        )
+
+    updates = {}       # sorted field names -> executemany parameter rows
+    for op in operations:
+        if op["op"] == "update":
+            changed = {k: v.strip() for k, v in op["fields"].items()}
+            owned[op["id"]][1].update(changed)
+            updates.setdefault(tuple(sorted(changed)), []).append(
+                {"b_id": op["id"], **{f"b_{k}": v for k, v in changed.items()}}
+            )
+    for fields, params in updates.items():
+        db.session.execute(
+            update(table)
+            .where(table.c.user_id == user_id, table.c.id == bindparam("b_id"))
+            .values({f: bindparam(f"b_{f}") for f in fields}),
+            params,
+        )
+
+    created = [EVUser(user_id=user_id, **_ev_user_values(op["fields"]))
+               for op in operations if op["op"] == "create"]
+    db.session.add_all(created)
+    db.session.flush()
+    # Read ids before commit expires the instances (and would reload each one)
+    created_ids = iter([ev_user.id for ev_user in created])
+    db.session.commit()
+
+    for result, op in zip(results, operations):
+        if op["op"] == "create":
+            ev_user_id = next(created_ids)
+            result.update(status=201, id=ev_user_id,
+                          etag=_etag(ev_user_id, _ev_user_values(op["fields"])))
+        elif op["op"] == "update":
+            result.update(status=200, id=op["id"], etag=_etag(op["id"], owned[op["id"]][1]))
+        else:
+            result.update(status=204, id=op["id"])
+    return jsonify({"applied": True, "results": results})
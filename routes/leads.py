@@ -1,9 +1,97 @@
-from flask import Blueprint, request, jsonify
-from extensions import db
+import base64
+import csv
+import io
+import json
+from datetime import datetime
+
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from sqlalchemy import and_, or_, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from extensions import db, lead_spool
 from models import Lead
 
 leads_bp = Blueprint("leads", __name__)
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE     = 1000
+EXPORT_CHUNK_SIZE = 500
+BULK_BATCH_SIZE   = 1000
+
+LEAD_COLUMNS = [
+    "id", "full_name", "email", "phone", "company_name", "industry_segment",
+    "fleet_size", "location_zip", "current_charging_status", "primary_interests",
+    "timeline", "comments", "created_at",
+]
+
+
+# ---------------------------------------------------------------------------
+# Keyset cursor helpers
+# ---------------------------------------------------------------------------
+
+def _encode_cursor(lead):
+    # A NULL created_at (rows written outside the ORM) encodes as ""
+    created = lead.created_at.isoformat() if lead.created_at is not None else ""
+    raw = f"{created}|{lead.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor):
+    """Return (created_at or None, id) for an opaque cursor, or None if malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created, _, lead_id = base64.urlsafe_b64decode(padded).decode().partition("|")
+        return (datetime.fromisoformat(created) if created else None), int(lead_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def _newest_first(query, after=None):
+    """Order by (created_at, id) descending, resuming strictly after `after`.
+
+    SQLite and MySQL sort NULL lowest, so leads without a created_at come
+    last; the filter lets the walk continue into them.  No COALESCE, so
+    ix_leads_created_at_id still serves the ORDER BY.
+    """
+    if after is not None:
+        created, lead_id = after
+        if created is None:
+            query = query.where(Lead.created_at.is_(None), Lead.id < lead_id)
+        else:
+            query = query.where(or_(
+                Lead.created_at < created,
+                and_(Lead.created_at == created, Lead.id < lead_id),
+                Lead.created_at.is_(None),
+            ))
+    return query.order_by(Lead.created_at.desc(), Lead.id.desc())
+
+
+def _text(data, key):
+    value = data.get(key)
+    return str(value).strip() if value is not None else ""
+
+
+def _lead_values(data):
+    """Normalise a submitted lead into Lead column values."""
+    # Normalise multi-value interests list → comma-separated string
+    interests = data.get("primary_interests", "")
+    if isinstance(interests, list):
+        interests = ", ".join(str(i) for i in interests)
+
+    return {
+        "full_name": _text(data, "full_name"),
+        "email": _text(data, "email").lower(),
+        "phone": _text(data, "phone") or None,
+        "company_name": _text(data, "company_name") or None,
+        "industry_segment": data.get("industry_segment") or None,
+        "fleet_size": _text(data, "fleet_size") or None,
+        "location_zip": _text(data, "location_zip") or None,
+        "current_charging_status": data.get("current_charging_status") or None,
+        "primary_interests": interests or None,
+        "timeline": data.get("timeline") or None,
+        "comments": _text(data, "comments") or None,
+    }
+
 
 @leads_bp.route("/leads", methods=["POST"])
 def submit_lead():
@@ -12,24 +100,18 @@ def submit_lead():
     if not data.get("full_name") or not data.get("email"):
         return jsonify({"error": "full_name and email are required"}), 400
 
-    # Normalise multi-value interests list → comma-separated string
-    interests = data.get("primary_interests", "")
-    if isinstance(interests, list):
-        interests = ", ".join(interests)
-
-    lead = Lead(
-        full_name=data.get("full_name", "").strip(),
-        email=data.get("email", "").strip().lower(),
-        phone=data.get("phone", "").strip() or None,
-        company_name=data.get("company_name", "").strip() or None,
-        industry_segment=data.get("industry_segment") or None,
-        fleet_size=data.get("fleet_size", "").strip() or None,
-        location_zip=data.get("location_zip", "").strip() or None,
-        current_charging_status=data.get("current_charging_status") or None,
-        primary_interests=interests or None,
-        timeline=data.get("timeline") or None,
-        comments=data.get("comments", "").strip() or None,
-    )
+    values = _lead_values(data)
+    # Checked up front: a spooled lead is acknowledged before it is inserted
+    too_long = _too_long(values)
+    if too_long:
+        return jsonify({"error": too_long}), 400
+
+    # Write-behind: acknowledge once journalled, the drainer inserts later
+    if lead_spool.enabled:
+        spool_id = lead_spool.enqueue(values)
+        return jsonify({"success": True, "queued": True, "spool_id": spool_id}), 202
+
+    lead = Lead(**values)
 
     db.session.add(lead)
     db.session.commit()
@@ -37,8 +119,221 @@ def submit_lead():
     return jsonify({"success": True, "id": lead.id}), 201
 
 
+@leads_bp.route("/leads/spool", methods=["GET"])
+def spool_status():
+    """Admin endpoint — backlog of journalled leads awaiting the drainer."""
+    if not lead_spool.enabled:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, **lead_spool.backlog()})
+
+
+# ---------------------------------------------------------------------------
+# Bulk ingestion
+# ---------------------------------------------------------------------------
+
+def _iter_bulk_records():
+    """Yield (row_number, record, error) for each lead in the request body.
+
+    JSON arrays are decoded whole; NDJSON and CSV bodies are read line by
+    line from the request stream.
+    """
+    mimetype = request.mimetype
+    if mimetype in ("application/x-ndjson", "application/ndjson", "text/csv"):
+        text = io.TextIOWrapper(request.stream, encoding="utf-8-sig", newline="")
+        if mimetype == "text/csv":
+            for n, record in enumerate(csv.DictReader(text), start=1):
+                yield n, record, None
+            return
+        n = 0
+        for line in text:
+            if not line.strip():
+                continue
+            n += 1
+            try:
+                record = json.loads(line)
+            except ValueError:
+                yield n, None, "invalid JSON"
+                continue
+            yield n, record, None
+        return
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, list):
+        raise ValueError("body must be a JSON array, NDJSON or CSV")
+    for n, record in enumerate(data, start=1):
+        yield n, record, None
+
+
+def _bulk_reject_reason(record):
+    if not isinstance(record, dict):
+        return "record must be an object"
+    if not record.get("full_name") or not record.get("email"):
+        return "full_name and email are required"
+    return None
+
+
+def _too_long(values):
+    for name, value in values.items():
+        length = getattr(Lead.__table__.c[name].type, "length", None)
+        if length and value and len(value) > length:
+            return f"{name} exceeds {length} characters"
+    return None
+
+
+def _insert_batch(batch, results):
+    """Insert one batch in a single transaction via executemany.
+
+    pymysql rewrites an executemany INSERT into a multi-row VALUES statement.
+    If the batch fails, fall back to row-by-row inserts so the offending
+    rows can be reported individually.
+    """
+    table = Lead.__table__
+    try:
+        db.session.execute(table.insert(), [values for _, values in batch])
+        db.session.commit()
+        results.extend({"row": n, "status": "accepted"} for n, _ in batch)
+        return
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        current_app.logger.warning("bulk lead batch failed, retrying per row: %s", e)
+
+    for n, values in batch:
+        try:
+            db.session.execute(table.insert(), values)
+            db.session.commit()
+            results.append({"row": n, "status": "accepted"})
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            results.append({"row": n, "status": "rejected", "error": str(getattr(e, "orig", None) or e)})
+
+
+@leads_bp.route("/leads/bulk", methods=["POST"])
+def bulk_submit_leads():
+    """Ingest many leads in one request.
+
+    Accepts a JSON array (application/json), NDJSON (application/x-ndjson)
+    or CSV with a header row (text/csv). Every record gets the same
+    normalisation as POST /api/leads; valid rows are inserted in
+    transactions of BULK_BATCH_SIZE. Returns a per-row accept/reject report.
+    """
+    results = []
+    batch = []
+    try:
+        for n, record, error in _iter_bulk_records():
+            error = error or _bulk_reject_reason(record)
+            values = None
+            if error is None:
+                values = _lead_values(record)
+                error = _too_long(values)
+            if error:
+                results.append({"row": n, "status": "rejected", "error": error})
+                continue
+            batch.append((n, values))
+            if len(batch) >= BULK_BATCH_SIZE:
+                _insert_batch(batch, results)
+                batch = []
+        if batch:
+            _insert_batch(batch, results)
+    except (ValueError, csv.Error) as e:
+        # Batches already committed stay committed and are reported below
+        return jsonify({"error": str(e), **_bulk_report(results)}), 400
+
+    return jsonify(_bulk_report(results))
+
+
+def _bulk_report(results):
+    results.sort(key=lambda r: r["row"])
+    accepted = sum(1 for r in results if r["status"] == "accepted")
+    return {
+        "accepted": accepted,
+        "rejected": len(results) - accepted,
+        "results": results,
+    }
+
+
 @leads_bp.route("/leads", methods=["GET"])
 def list_leads():
-    """Simple admin endpoint — protect with auth in production."""
-    leads = Lead.query.order_by(Lead.created_at.desc()).all()
-    return jsonify([l.to_dict() for l in leads])
+    """Simple admin endpoint — protect with auth in production.
+
+    Query params:
+      ?limit=N          page size (default 100, max 1000)
+      ?after=<cursor>   resume after the cursor from the previous page
+      ?format=ndjson|csv  stream the whole table (from `after`, if given)
+
+    Paged responses are a JSON list; the next page's cursor is returned in
+    the X-Next-Cursor header (absent on the last page).
+    """
+    after = None
+    if request.args.get("after"):
+        after = _decode_cursor(request.args["after"])
+        if after is None:
+            return jsonify({"error": "invalid cursor"}), 400
+
+    fmt = request.args.get("format", "json").lower()
+    if fmt in ("ndjson", "csv"):
+        return _export_leads(fmt, after)
+    if fmt != "json":
+        return jsonify({"error": "format must be json, ndjson or csv"}), 400
+
+    try:
+        limit = int(request.args.get("limit", DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    # Fetch one extra row to learn whether another page exists
+    leads = db.session.scalars(_newest_first(select(Lead), after).limit(limit + 1)).all()
+    has_more = len(leads) > limit
+    leads = leads[:limit]
+
+    resp = jsonify([l.to_dict() for l in leads])
+    if has_more:
+        resp.headers["X-Next-Cursor"] = _encode_cursor(leads[-1])
+    return resp
+
+
+def _export_leads(fmt, after):
+    """Stream leads through a server-side cursor, EXPORT_CHUNK_SIZE rows at a time."""
+    columns = [Lead.__table__.c[name] for name in LEAD_COLUMNS]
+    stmt = _newest_first(select(*columns), after).execution_options(
+        stream_results=True, yield_per=EXPORT_CHUNK_SIZE,
+    )
+
+    def _row_dict(row):
+        data = dict(row._mapping)
+        if data["created_at"] is not None:
+            data["created_at"] = data["created_at"].isoformat()
+        return data
+
+    def generate():
+        buf = io.StringIO()
+        writer = csv.DictWriter(buf, fieldnames=LEAD_COLUMNS) if fmt == "csv" else None
+        if writer:
+            writer.writeheader()
+
+        result = db.session.execute(stmt)
+        try:
+            for partition in result.partitions():
+                for row in partition:
+                    if writer:
+                        writer.writerow(_row_dict(row))
+                    else:
+                        buf.write(json.dumps(_row_dict(row)))
+                        buf.write("\n")
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+            if buf.tell():
+                yield buf.getvalue()
+        finally:
+            result.close()
+
+    if fmt == "csv":
+        mimetype, filename = "text/csv", "leads.csv"
+    else:
+        mimetype, filename = "application/x-ndjson", "leads.ndjson"
+    return Response(
+        stream_with_context(generate()),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
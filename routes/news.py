@@ -1,11 +1,38 @@
-from flask import Blueprint, render_template, jsonify, request, current_app
+import gzip
+import hashlib
+import json
 
-import requests
+from flask import Blueprint, Response, render_template, jsonify, request, current_app
 
-from agents.industry_news_agent import get_industry_news, is_loading
+from agents.industry_news_agent import (
+    get_industry_news, is_loading, last_refresh_error, last_updated, wait_for_refresh,
+)
+from services.geo_cache import DEFAULT_PATH as GEO_CACHE_PATH, MISSING, GeoCache, snap_to_tile
+from services.station_index import (
+    DEFAULT_PATH as STATION_INDEX_PATH, cluster_stations, get_station_index, haversine_miles,
+)
+from services.zip_index import DEFAULT_PATH as ZIP_INDEX_PATH, get_zip_index
 
 news_bp = Blueprint("news", __name__)
 
+MAX_STATIONS = 500
+# Upper bound on how long /api/industry-news/wait holds a request open
+MAX_NEWS_WAIT = 25
+
+# One keep-alive session per worker for Nominatim / OpenChargeMap, built
+# on first use so requests is not imported at worker boot
+_http = None
+
+
+def _http_session():
+    global _http
+    if _http is None:
+        import requests
+
+        _http = requests.Session()
+        _http.headers["User-Agent"] = "PrezentEnergy-StationFinder/1.0"
+    return _http
+
 
 @news_bp.route("/news")
 def news_page():
@@ -15,100 +42,288 @@ def news_page():
     return render_template("news.html", maps_key=maps_key)
 
 
+# Pre-encoded /api/industry-news body for the current cache generation;
+# replaced wholesale (never mutated) so readers need no lock
+_news_payload: dict = {"key": None}
+
+
+def _encoded_news_payload(news, regulations, loading, error):
+    """(etag, json_bytes, gzip_bytes), encoded once per cache generation."""
+    global _news_payload
+    updated = last_updated()
+    key = (updated.isoformat() if updated else None, loading, (error or {}).get("at"))
+    payload = _news_payload
+    if payload["key"] != key:
+        body = json.dumps({
+            "news": news,
+            "regulations": regulations,
+            "loading": loading,
+            "last_error": error,
+        }, separators=(",", ":")).encode("utf-8")
+        payload = {
+            "key":  key,
+            "etag": "news-" + hashlib.sha1(repr(key).encode()).hexdigest()[:20],
+            "body": body,
+            "gzip": gzip.compress(body, compresslevel=6),
+        }
+        _news_payload = payload
+    return payload["etag"], payload["body"], payload["gzip"]
+
+
 @news_bp.route("/api/industry-news")
 def industry_news_api():
     force = request.args.get("refresh") == "1"
+    return _industry_news_response(force)
+
+
+@news_bp.route("/api/industry-news/wait")
+def industry_news_wait():
+    """Long-poll: answer once the in-flight refresh finishes (or after `timeout` s).
+
+    Returns the same body as /api/industry-news; `loading` is still true
+    if the wait timed out and the client should call again.
+    """
+    try:
+        timeout = float(request.args.get("timeout", MAX_NEWS_WAIT))
+    except ValueError:
+        return jsonify({"error": "timeout must be a number"}), 400
+    wait_for_refresh(max(0.0, min(timeout, MAX_NEWS_WAIT)))
+    resp = _industry_news_response(force=False)
+    resp.headers["Cache-Control"] = "no-store"
+    return resp
+
+
+def _industry_news_response(force):
     news, regulations = get_industry_news(force_refresh=force)
-    return jsonify({
-        "news": news,
-        "regulations": regulations,
-        "loading": is_loading(),
-    })
+    loading = is_loading()
+    etag, body, gzipped = _encoded_news_payload(news, regulations, loading, last_refresh_error())
+
+    # Quality of gzip (or "*"): 0 when absent or refused with q=0
+    if request.accept_encodings["gzip"] > 0:
+        resp = Response(gzipped, mimetype="application/json")
+        resp.headers["Content-Encoding"] = "gzip"
+        etag += "-gz"     # strong ETags differ per content-coding
+    else:
+        resp = Response(body, mimetype="application/json")
+    resp.headers["Vary"] = "Accept-Encoding"
+    resp.set_etag(etag)
+    if force or loading:
+        # Pollers must revalidate every time while a refresh is in flight
+        resp.headers["Cache-Control"] = "no-cache"
+    else:
+        resp.headers["Cache-Control"] = "public, max-age=300, stale-while-revalidate=3600"
+    return resp.make_conditional(request)
+
+
+def _geo_cache():
+    cfg = current_app.config
+    return GeoCache(
+        path=cfg.get("GEO_CACHE_PATH", GEO_CACHE_PATH),
+        station_ttl=cfg.get("STATION_CACHE_TTL", 6 * 3600),
+        unknown_zip_ttl=cfg.get("UNKNOWN_ZIP_CACHE_TTL", 24 * 3600),
+    )
+
+
+def _geocode_zip(cache, zipcode):
+    """Return (lat, lng) for a US zip, or None if Nominatim doesn't know it.
+
+    The bundled ZIP centroid table answers known zips offline; only codes
+    missing from it go to the geocode cache and then Nominatim.
+    """
+    index = get_zip_index(current_app.config.get("ZIP_INDEX_PATH", ZIP_INDEX_PATH))
+    if index is not None:
+        coords = index.lookup(zipcode)
+        if coords is not None:
+            return coords
+
+    coords = cache.get_zip(zipcode)
+    if coords is not MISSING:
+        return coords
+
+    r = _http_session().get(
+        "https://nominatim.openstreetmap.org/search",
+        params={
+            "q": zipcode,
+            "format": "json",
+            "countrycodes": "us",
+            "limit": 1,
+        },
+        timeout=8,
+    )
+    results = r.json()
+    coords = (float(results[0]["lat"]), float(results[0]["lon"])) if results else None
+    cache.put_zip(zipcode, coords)
+    return coords
+
+
+def _fetch_stations(lat, lng, radius):
+    """OpenChargeMap Level-3 (DC fast charge) stations around a point."""
+    r = _http_session().get(
+        "https://api.openchargemap.io/v3/poi/",
+        params={
+            "output": "json",
+            "latitude": lat,
+            "longitude": lng,
+            "distance": radius,
+            "distanceunit": "miles",
+            "levelid": 3,
+            "maxresults": 30,
+            "compact": True,
+            "verbose": False,
+        },
+        timeout=10,
+    )
+    r.raise_for_status()
+    stations = []
+    for s in r.json():
+        addr = s.get("AddressInfo", {})
+        station_lat = addr.get("Latitude")
+        station_lng = addr.get("Longitude")
+        if station_lat is None or station_lng is None:
+            continue
+        stations.append(
+            {
+                "name": addr.get("Title", "EV Charging Station"),
+                "lat": station_lat,
+                "lng": station_lng,
+                "address": addr.get("AddressLine1", ""),
+                "city": addr.get("Town", ""),
+                "state": addr.get("StateOrProvince", ""),
+            }
+        )
+    return stations
+
+
+def _parse_bbox(raw):
+    """(south, west, north, east) from "s,w,n,e", or None if malformed."""
+    try:
+        south, west, north, east = (float(v) for v in raw.split(","))
+    except ValueError:
+        return None
+    if south > north or west > east:
+        return None
+    return south, west, north, east
+
+
+def _clustered_bbox(index, cache, bbox, center):
+    """Clustered stations for one map viewport tile (bbox + zoom)."""
+    try:
+        zoom = max(0, min(int(request.args["zoom"]), 22))
+    except ValueError:
+        return jsonify({"error": "zoom must be an integer"}), 400
+
+    south, west, north, east = bbox
+    if index is not None:
+        clustered = index.cluster_bbox(*bbox, zoom=zoom, limit=MAX_STATIONS)
+    else:
+        # No local store yet: cover the box with one cached upstream query
+        radius = haversine_miles(south, west, north, east) / 2
+        tile = snap_to_tile(center["lat"], center["lng"])
+        key = GeoCache.station_key(tile, round(radius, 1))
+        try:
+            stations = cache.get_stations(key)
+            if stations is None:
+                stations = _fetch_stations(tile[0], tile[1], round(radius, 1))
+                cache.put_stations(key, stations)
+        except Exception as exc:
+            return jsonify({"error": str(exc)}), 500
+        stations = [s for s in stations
+                    if south <= s["lat"] <= north and west <= s["lng"] <= east]
+        clustered = cluster_stations(stations, zoom)
+
+    resp = jsonify({"zoom": zoom, **clustered})
+    # Tiles are stable between index refreshes — let the browser keep them
+    resp.headers["Cache-Control"] = "public, max-age=600"
+    return resp
 
 
 @news_bp.route("/api/charging-stations")
 def charging_stations():
     """
-    Proxy endpoint for DC fast-charging station lookup.
+    DC fast-charging station lookup.
 
     Accepts:
       ?lat=X&lng=Y            (coordinates)
-      ?zip=XXXXX              (US zip code — geocoded via Nominatim)
+      ?zip=XXXXX              (US zip code — offline table, then Nominatim)
+      ?bbox=S,W,N,E           (bounding box instead of a point + radius)
+      &zoom=Z                 (with bbox: return grid-clustered points for
+                               map zoom Z — lone stations plus
+                               {"lat", "lng", "count"} clusters; from zoom
+                               15 up, the nearest MAX_STATIONS unclustered)
       &radius=<miles>         (optional, default 25)
+      &limit=N                (optional, default 30, max 500)
 
-    Returns OpenChargeMap Level-3 stations as JSON.
+    Answered from the local station index (services/station_index.py)
+    once it has been loaded; until then proxied to OpenChargeMap, with
+    zip geocodes and results (per ~2 km tile + radius) cached in
+    instance/geo_cache.db.
     """
-    lat = request.args.get("lat")
-    lng = request.args.get("lng")
+    # None when absent: a bbox centre or geocode may legitimately be 0.0
+    lat = request.args.get("lat") or None
+    lng = request.args.get("lng") or None
     zipcode = request.args.get("zip", "").strip()
-    radius = request.args.get("radius", 25)
+    cache = _geo_cache()
+
+    try:
+        radius = float(request.args.get("radius", 25))
+        limit = max(1, min(int(request.args.get("limit", 30)), MAX_STATIONS))
+    except ValueError:
+        return jsonify({"error": "radius and limit must be numbers"}), 400
+
+    index = get_station_index(current_app.config.get("STATION_INDEX_PATH", STATION_INDEX_PATH))
+
+    if request.args.get("bbox"):
+        bbox = _parse_bbox(request.args["bbox"])
+        if bbox is None:
+            return jsonify({"error": "bbox must be south,west,north,east"}), 400
+        south, west, north, east = bbox
+        center = {"lat": (south + north) / 2, "lng": (west + east) / 2}
+        if request.args.get("zoom") is not None:
+            return _clustered_bbox(index, cache, bbox, center)
+        if index is not None:
+            return jsonify({
+                "stations": index.query_bbox(*bbox, limit=limit),
+                "center": center,
+            })
+        # No local store yet: cover the box with a radius query upstream
+        lat, lng = center["lat"], center["lng"]
+        radius = haversine_miles(south, west, north, east) / 2
 
     # ── Zip → lat/lng via Nominatim (OSM) ────────────────────────────────────
-    if zipcode and not (lat and lng):
+    if zipcode and (lat is None or lng is None):
         try:
-            r = requests.get(
-                "https://nominatim.openstreetmap.org/search",
-                params={
-                    "q": zipcode,
-                    "format": "json",
-                    "countrycodes": "us",
-                    "limit": 1,
-                },
-                headers={"User-Agent": "PrezentEnergy-StationFinder/1.0"},
-                timeout=8,
-            )
-            results = r.json()
-            if results:
-                lat = results[0]["lat"]
-                lng = results[0]["lon"]
-            else:
-                return jsonify({"error": "Zip code not found"}), 404
+            coords = _geocode_zip(cache, zipcode)
         except Exception as exc:
             return jsonify({"error": f"Geocoding failed: {exc}"}), 500
+        if coords is None:
+            return jsonify({"error": "Zip code not found"}), 404
+        lat, lng = coords
 
-    if not (lat and lng):
-        return jsonify({"error": "Provide lat/lng or zip"}), 400
+    if lat is None or lng is None:
+        return jsonify({"error": "Provide lat/lng, zip or bbox"}), 400
+    try:
+        lat, lng = float(lat), float(lng)
+    except ValueError:
+        return jsonify({"error": "lat and lng must be numbers"}), 400
 
-    # ── OpenChargeMap — Level 3 (DC fast charge) ─────────────────────────────
+    if index is not None:
+        return jsonify({
+            "stations": index.query_radius(lat, lng, radius, limit=limit),
+            "center": {"lat": lat, "lng": lng},
+        })
+
+    # ── OpenChargeMap — Level 3 (DC fast charge), cached per tile ────────────
+    tile = snap_to_tile(lat, lng)
+    key = GeoCache.station_key(tile, radius)
     try:
-        r = requests.get(
-            "https://api.openchargemap.io/v3/poi/",
-            params={
-                "output": "json",
-                "latitude": lat,
-                "longitude": lng,
-                "distance": radius,
-                "distanceunit": "miles",
-                "levelid": 3,
-                "maxresults": 30,
-                "compact": True,
-                "verbose": False,
-            },
-            headers={"User-Agent": "PrezentEnergy-StationFinder/1.0"},
-            timeout=10,
-        )
-        r.raise_for_status()
-        stations = []
-        for s in r.json():
-            addr = s.get("AddressInfo", {})
-            station_lat = addr.get("Latitude")
-            station_lng = addr.get("Longitude")
-            if station_lat is None or station_lng is None:
-                continue
-            stations.append(
-                {
-                    "name": addr.get("Title", "EV Charging Station"),
-                    "lat": station_lat,
-                    "lng": station_lng,
-                    "address": addr.get("AddressLine1", ""),
-                    "city": addr.get("Town", ""),
-                    "state": addr.get("StateOrProvince", ""),
-                }
-            )
+        stations = cache.get_stations(key)
+        if stations is None:
+            stations = _fetch_stations(tile[0], tile[1], radius)
+            cache.put_stations(key, stations)
         return jsonify(
             {
-                "stations": stations,
-                "center": {"lat": float(lat), "lng": float(lng)},
+                "stations": stations[:limit],
+                "center": {"lat": lat, "lng": lng},
             }
         )
     except Exception as exc:
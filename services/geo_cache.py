@@ -0,0 +1,117 @@
+"""
+Geo Cache — persistent lookup cache for /api/charging-stations.
+
+Two layers in one SQLite file (instance/geo_cache.db), shared by every
+Passenger worker:
+
+  * geocodes — zip code → lat/lng from Nominatim, kept indefinitely
+    (zip centroids don't move).  Unknown zips are remembered for
+    unknown_zip_ttl only, so a new or briefly mis-answered zip recovers.
+  * stations — OpenChargeMap results keyed by a quantised location tile
+    plus radius, expiring after a TTL.
+"""
+
+import json
+import os
+import sqlite3
+import time
+
+_BASE_DIR    = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PATH = os.path.normpath(os.path.join(_BASE_DIR, "..", "instance", "geo_cache.db"))
+
+# Station lookups snap to a grid of this many degrees (~2 km of latitude)
+TILE_DEGREES = 0.02
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS geocodes ("
+    "  zip TEXT PRIMARY KEY, lat REAL, lng REAL, created_at REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS stations ("
+    "  key TEXT PRIMARY KEY, payload TEXT NOT NULL, created_at REAL NOT NULL)",
+)
+
+MISSING = object()
+
+
+def snap_to_tile(lat: float, lng: float) -> tuple[float, float]:
+    """Centre of the grid tile containing (lat, lng)."""
+    def snap(v):
+        return round((int(v // TILE_DEGREES) + 0.5) * TILE_DEGREES, 5)
+    return snap(lat), snap(lng)
+
+
+class GeoCache:
+    def __init__(self, path: str = DEFAULT_PATH, station_ttl: float = 6 * 3600,
+                 unknown_zip_ttl: float = 24 * 3600):
+        self.path            = path
+        self.station_ttl     = station_ttl
+        self.unknown_zip_ttl = unknown_zip_ttl
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        for stmt in _SCHEMA:
+            conn.execute(stmt)
+        return conn
+
+    # ── Zip geocodes ─────────────────────────────────────────────────────────
+
+    def get_zip(self, zipcode: str):
+        """(lat, lng), None for a zip known not to exist, or MISSING if uncached.
+
+        "Not found" answers older than unknown_zip_ttl count as uncached.
+        """
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT lat, lng, created_at FROM geocodes WHERE zip = ?", (zipcode,)
+            ).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return MISSING
+        if row[0] is None:
+            return None if row[2] > time.time() - self.unknown_zip_ttl else MISSING
+        return row[0], row[1]
+
+    def put_zip(self, zipcode: str, coords: tuple[float, float] | None) -> None:
+        lat, lng = coords if coords else (None, None)
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO geocodes (zip, lat, lng, created_at) VALUES (?, ?, ?, ?)",
+                (zipcode, lat, lng, time.time()),
+            )
+        finally:
+            conn.close()
+
+    # ── Station results ──────────────────────────────────────────────────────
+
+    @staticmethod
+    def station_key(tile: tuple[float, float], radius: float) -> str:
+        return f"{tile[0]:.5f},{tile[1]:.5f},{radius:g}"
+
+    def get_stations(self, key: str) -> list[dict] | None:
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT payload FROM stations WHERE key = ? AND created_at > ?",
+                (key, time.time() - self.station_ttl),
+            ).fetchone()
+        finally:
+            conn.close()
+        return json.loads(row[0]) if row else None
+
+    def put_stations(self, key: str, stations: list[dict]) -> None:
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO stations (key, payload, created_at) VALUES (?, ?, ?)",
+                (key, json.dumps(stations), now),
+            )
+            conn.execute("DELETE FROM stations WHERE created_at <= ?", (now - self.station_ttl,))
+        finally:
+            conn.close()
+
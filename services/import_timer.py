@@ -0,0 +1,94 @@
+"""
+Import Timer — opt-in per-module import times for worker cold starts.
+
+Passenger starts the interpreter itself, so `python -X importtime` is
+not available where cold starts actually happen.  With
+IMPORT_TIME_REPORT=1 in the application's environment, passenger_wsgi.py
+installs this module's finder before importing the app and writes
+report() to stderr (Passenger's stderr.log) once create_app returns.
+
+Each first-time import is timed around its module body: "cumulative"
+includes the imports it triggers, "self" excludes them.  The finder
+adds a little overhead of its own, so compare reports with each other
+rather than with un-instrumented timings.
+
+This module must not import Flask or anything from the app: it has to
+be loaded before them.
+"""
+
+import importlib.abc
+import sys
+import time
+
+_timings: dict[str, list[float]] = {}    # module -> [cumulative, self] seconds
+_stack: list[list[float]] = []           # [start, seconds spent in child imports]
+_top_level = [0.0]                       # seconds in imports not nested in a timed one
+
+
+class _TimedLoader(importlib.abc.Loader):
+    def __init__(self, loader):
+        self._loader = loader
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        frame = [time.perf_counter(), 0.0]
+        _stack.append(frame)
+        try:
+            self._loader.exec_module(module)
+        finally:
+            _stack.pop()
+            elapsed = time.perf_counter() - frame[0]
+            _timings[module.__name__] = [elapsed, elapsed - frame[1]]
+            if _stack:
+                _stack[-1][1] += elapsed
+            else:
+                _top_level[0] += elapsed
+
+    def __getattr__(self, name):
+        # get_data, get_resource_reader, is_package, ... from the real loader
+        return getattr(self._loader, name)
+
+
+class _TimingFinder(importlib.abc.MetaPathFinder):
+    def find_spec(self, name, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is None:
+                continue
+            if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                spec.loader = _TimedLoader(spec.loader)
+            return spec
+        return None
+
+
+_finder = _TimingFinder()
+
+
+def install() -> None:
+    """Start timing imports that have not happened yet."""
+    if _finder not in sys.meta_path:
+        sys.meta_path.insert(0, _finder)
+
+
+def uninstall() -> None:
+    if _finder in sys.meta_path:
+        sys.meta_path.remove(_finder)
+
+
+def timings() -> dict[str, tuple[float, float]]:
+    """module -> (cumulative seconds, self seconds) for every timed import."""
+    return {name: (cum, own) for name, (cum, own) in _timings.items()}
+
+
+def report(limit: int = 30) -> str:
+    """The `limit` slowest imports by cumulative time, as a text table."""
+    rows = sorted(_timings.items(), key=lambda item: item[1][0], reverse=True)
+    lines = [f"import times: {len(rows)} modules, {_top_level[0] * 1000:.0f} ms in total",
+             f"{'cumulative ms':>14}{'self ms':>10}  module"]
+    for name, (cum, own) in rows[:limit]:
+        lines.append(f"{cum * 1000:>14.1f}{own * 1000:>10.1f}  {name}")
+    return "\n".join(lines) + "\n"
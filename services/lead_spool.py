@@ -0,0 +1,331 @@
+"""
+Lead Spool — write-behind journal for lead submissions.
+
+When enabled, POST /api/leads appends the normalised lead to a local
+SQLite journal (instance/lead_spool.db) and returns as soon as the row
+is durable.  A background drainer thread flushes the journal into the
+`leads` table in batches, so submit latency no longer depends on MySQL.
+
+Crash safety:
+  * Drainers claim rows with a lease, so several Passenger workers can
+    drain the same journal without double-inserting.
+  * A journal row is deleted only after its batch has committed.  If a
+    worker dies between the commit and the delete, the lease expires and
+    the rows are replayed.  Each entry carries a random spool_key that is
+    stored on its `leads` row (unique), so replayed rows are skipped
+    while genuine repeat submissions are not.
+  * A batch the database rejects is retried row by row, so one bad row
+    cannot hold back the leads queued after it.  Rejected rows are
+    retried up to MAX_ATTEMPTS times and then marked failed (kept in the
+    journal, counted by backlog()).  Connection errors are not counted:
+    the whole batch waits for the database to come back.
+"""
+
+import json
+import os
+import sqlite3
+import uuid
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
+
+_BASE_DIR     = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PATH  = os.path.normpath(os.path.join(_BASE_DIR, "..", "instance", "lead_spool.db"))
+
+BATCH_SIZE    = 500
+LEASE_SECONDS = 120
+IDLE_WAIT     = 5       # seconds between backlog checks when idle
+MAX_BACKOFF   = 60      # seconds, after repeated database errors
+MAX_ATTEMPTS  = 5       # rejected inserts before a row is marked failed
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS spool (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    payload     TEXT    NOT NULL,
+    queued_at   REAL    NOT NULL,
+    claimed_by  TEXT,
+    claimed_at  REAL,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    failed      INTEGER NOT NULL DEFAULT 0,
+    last_error  TEXT
+)
+"""
+
+
+def _db_message(error: Exception) -> str:
+    # The DBAPI message, not SQLAlchemy's, which also lists the lead's values
+    return str(getattr(error, "orig", None) or error)
+
+
+class LeadSpool:
+    def __init__(self, app=None):
+        self.app          = None
+        self._wake        = threading.Event()
+        self._thread      = None
+        self._thread_lock = threading.Lock()
+        self._checked     = None     # journal path whose columns are known current
+        self._resumed     = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.config.setdefault("LEAD_SPOOL_ENABLED", False)
+        app.config.setdefault("LEAD_SPOOL_PATH", DEFAULT_PATH)
+        app.config.setdefault("LEAD_SPOOL_AUTOSTART", True)
+        app.extensions["lead_spool"] = self
+
+        # Replay whatever a previous (possibly crashed) worker left behind,
+        # from the worker's first request rather than at boot
+        if app.config["LEAD_SPOOL_ENABLED"] and app.config["LEAD_SPOOL_AUTOSTART"]:
+            app.before_request(self._resume)
+
+    def _resume(self) -> None:
+        """First request: check the backlog in the background.
+
+        Spawning a worker then does no journal I/O, and the drainer thread
+        starts in the Passenger worker rather than in a pre-fork parent.
+        """
+        if self._resumed:
+            return
+        self._resumed = True
+        threading.Thread(target=self._resume_backlog, daemon=True).start()
+
+    def _resume_backlog(self) -> None:
+        try:
+            if self.backlog()["pending"]:
+                self.start_drainer()
+        except Exception as e:
+            self.app.logger.error("lead spool backlog check failed: %s", e)
+
+    @property
+    def _owner(self) -> str:
+        # Resolved per call: Passenger may fork workers after import
+        return f"{os.getpid()}-{id(self)}"
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.app and self.app.config["LEAD_SPOOL_ENABLED"])
+
+    # ── Journal ──────────────────────────────────────────────────────────────
+
+    def _connect(self) -> sqlite3.Connection:
+        path = self.app.config["LEAD_SPOOL_PATH"]
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = sqlite3.connect(path, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=FULL")
+        conn.execute(_SCHEMA)
+        if self._checked != path:
+            # Journals created before rows could fail lack the column
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(spool)")}
+            if "failed" not in columns:
+                try:
+                    conn.execute("ALTER TABLE spool ADD COLUMN failed INTEGER NOT NULL DEFAULT 0")
+                except sqlite3.OperationalError:
+                    pass    # another worker added it first
+            self._checked = path
+        return conn
+
+    def enqueue(self, values: dict) -> int:
+        """Durably journal one lead's column values; returns its spool id."""
+        values = dict(values)
+        values["spool_key"] = uuid.uuid4().hex
+        # Whole seconds, as MySQL DATETIME stores them
+        values.setdefault("created_at", datetime.utcnow().replace(microsecond=0))
+        payload = json.dumps({**values, "created_at": values["created_at"].isoformat()})
+
+        conn = self._connect()
+        try:
+            cur = conn.execute(
+                "INSERT INTO spool (payload, queued_at) VALUES (?, ?)",
+                (payload, time.time()),
+            )
+            spool_id = cur.lastrowid
+        finally:
+            conn.close()
+
+        if self.app.config["LEAD_SPOOL_AUTOSTART"]:
+            self.start_drainer()
+        self._wake.set()
+        return spool_id
+
+    def backlog(self) -> dict:
+        conn = self._connect()
+        try:
+            pending, oldest, attempts = conn.execute(
+                "SELECT COUNT(*), MIN(queued_at), MAX(attempts) FROM spool WHERE failed = 0"
+            ).fetchone()
+            failed = conn.execute("SELECT COUNT(*) FROM spool WHERE failed = 1").fetchone()[0]
+            last_error = conn.execute(
+                "SELECT last_error FROM spool WHERE last_error IS NOT NULL "
+                "ORDER BY id DESC LIMIT 1"
+            ).fetchone()
+        finally:
+            conn.close()
+        return {
+            "pending":            pending,
+            "oldest_age_seconds": round(time.time() - oldest, 3) if oldest else None,
+            "max_attempts":       attempts or 0,
+            "failed":             failed,
+            "last_error":         last_error[0] if last_error else None,
+            "drainer_running":    bool(self._thread and self._thread.is_alive()),
+        }
+
+    def _claim(self, conn, limit: int) -> list[tuple[int, int, dict]]:
+        """Lease up to `limit` rows; returns (spool_id, attempts incl. this one, values)."""
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # A lease that expired on the last attempt: the row keeps killing its drainer
+            conn.execute(
+                "UPDATE spool SET failed = 1, claimed_by = NULL, claimed_at = NULL, "
+                "last_error = COALESCE(last_error, 'lease expired on the last attempt') "
+                "WHERE failed = 0 AND attempts >= ? AND claimed_at < ?",
+                (MAX_ATTEMPTS, now - LEASE_SECONDS),
+            )
+            rows = conn.execute(
+                "SELECT id, attempts, payload FROM spool "
+                "WHERE failed = 0 AND attempts < ? "
+                "AND (claimed_at IS NULL OR claimed_at < ? OR claimed_by = ?) "
+                "ORDER BY id LIMIT ?",
+                (MAX_ATTEMPTS, now - LEASE_SECONDS, self._owner, limit),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE spool SET claimed_by = ?, claimed_at = ?, attempts = attempts + 1 "
+                "WHERE id = ?",
+                [(self._owner, now, r[0]) for r in rows],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return [(spool_id, attempts + 1, json.loads(payload)) for spool_id, attempts, payload in rows]
+
+    def _release(self, conn, rows: list[tuple], error: Exception, rejected: bool = True) -> None:
+        """Unclaim (spool_id, attempts, values) rows for a later drain.
+
+        Rejected rows out of attempts are marked failed; rows released
+        because the database was unreachable get their attempt back.
+        """
+        message = _db_message(error)[:500]
+        if rejected:
+            conn.executemany(
+                "UPDATE spool SET claimed_by = NULL, claimed_at = NULL, failed = ?, last_error = ? "
+                "WHERE id = ?",
+                [(int(attempts >= MAX_ATTEMPTS), message, spool_id) for spool_id, attempts, _ in rows],
+            )
+        else:
+            conn.executemany(
+                "UPDATE spool SET claimed_by = NULL, claimed_at = NULL, attempts = attempts - 1, "
+                "last_error = ? WHERE id = ?",
+                [(message, spool_id) for spool_id, _, _ in rows],
+            )
+
+    def _delete(self, conn, spool_ids: list[int]) -> None:
+        conn.executemany("DELETE FROM spool WHERE id = ?", [(i,) for i in spool_ids])
+
+    # ── Draining ─────────────────────────────────────────────────────────────
+
+    def drain_once(self, batch_size: int = BATCH_SIZE) -> int:
+        """Flush up to `batch_size` journalled leads; returns how many left the journal.
+
+        Must be called inside an application context.
+        """
+        from extensions import db
+        from models import Lead
+
+        conn = self._connect()
+        try:
+            claimed = self._claim(conn, batch_size)
+            if not claimed:
+                return 0
+
+            for _, _, values in claimed:
+                values["created_at"] = datetime.fromisoformat(values["created_at"])
+                # Entries journalled before spool keys existed get a fresh key:
+                # a rare duplicate beats dropping a genuine lead
+                values.setdefault("spool_key", uuid.uuid4().hex)
+
+            fresh = claimed
+            try:
+                # Skip rows an earlier, interrupted drain already committed
+                existing = set(db.session.scalars(select(Lead.spool_key).where(
+                    Lead.spool_key.in_([values["spool_key"] for _, _, values in claimed])
+                )))
+                fresh = [row for row in claimed if row[2]["spool_key"] not in existing]
+                if fresh:
+                    db.session.execute(Lead.__table__.insert(), [values for _, _, values in fresh])
+                db.session.commit()
+            except OperationalError as e:
+                db.session.rollback()
+                self._release(conn, claimed, e, rejected=False)
+                raise
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                self.app.logger.warning("lead spool batch failed, retrying per row: %s", _db_message(e))
+                fresh_ids = {spool_id for spool_id, _, _ in fresh}
+                done = [spool_id for spool_id, _, _ in claimed if spool_id not in fresh_ids]
+                return len(done) + self._drain_rows(conn, fresh, done)
+
+            self._delete(conn, [spool_id for spool_id, _, _ in claimed])
+            return len(claimed)
+        finally:
+            conn.close()
+
+    def _drain_rows(self, conn, rows: list[tuple], done: list[int]) -> int:
+        """Insert `rows` one at a time after their batch failed; returns how many went in.
+
+        `done` holds journal ids already in `leads`; they are deleted along
+        with the rows inserted here.
+        """
+        from extensions import db
+        from models import Lead
+
+        inserted = 0
+        try:
+            for i, row in enumerate(rows):
+                spool_id, _, values = row
+                try:
+                    db.session.execute(Lead.__table__.insert(), values)
+                    db.session.commit()
+                except OperationalError as e:
+                    db.session.rollback()
+                    self._release(conn, rows[i:], e, rejected=False)
+                    raise
+                except SQLAlchemyError as e:
+                    db.session.rollback()
+                    self.app.logger.warning("lead spool row %s rejected: %s", spool_id, _db_message(e))
+                    self._release(conn, [row], e)
+                    continue
+                done.append(spool_id)
+                inserted += 1
+        finally:
+            self._delete(conn, done)
+        return inserted
+
+    def start_drainer(self) -> None:
+        with self._thread_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._drain_loop, daemon=True)
+            self._thread.start()
+
+    def _drain_loop(self) -> None:
+        backoff = 1
+        while True:
+            try:
+                with self.app.app_context():
+                    flushed = self.drain_once()
+                backoff = 1
+            except Exception as e:
+                self.app.logger.error("lead spool drain failed: %s", e)
+                time.sleep(backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF)
+                continue
+            if not flushed:
+                self._wake.wait(IDLE_WAIT)
+                self._wake.clear()
@@ -0,0 +1,351 @@
+"""
+Mail Outbox — background delivery for transactional email.
+
+When enabled, send_verification_code() (routes/auth.py) only journals the
+rendered message in a local SQLite outbox (instance/mail_outbox.db) and
+returns; a dispatcher thread in each worker delivers it.
+
+  * The dispatcher keeps its SMTP session open between batches and reuses
+    it while the server answers NOOP, so EHLO / STARTTLS / login happen
+    once per busy period instead of once per message.
+  * Messages are claimed in batches with a lease, so several Passenger
+    workers can share the outbox without sending anything twice.
+  * Transient failures are retried with exponential backoff; permanent
+    (5xx) rejections and messages out of attempts are marked failed.
+  * stats() reports queue depth, the oldest message's age and recent
+    delivery latency (queued → accepted by the mail server).  Error
+    text can name recipients, so it stays in the outbox and the log.
+"""
+
+import json
+import os
+import smtplib
+import sqlite3
+import threading
+import time
+
+_BASE_DIR    = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PATH = os.path.normpath(os.path.join(_BASE_DIR, "..", "instance", "mail_outbox.db"))
+
+BATCH_SIZE        = 50
+LEASE_SECONDS     = 120
+IDLE_WAIT         = 5       # seconds between outbox checks when idle
+SMTP_IDLE_TIMEOUT = 60      # close the warm connection after this long unused
+NOOP_AFTER        = 10      # probe a connection with NOOP once it's been quiet this long
+MAX_ATTEMPTS      = 8
+RETRY_DELAY       = 5       # seconds before a failed message's next attempt; doubles each time
+MAX_RETRY_DELAY   = 1800
+MAX_BACKOFF       = 60      # seconds, dispatcher pause after repeated errors
+LATENCY_SAMPLES   = 1000    # recent deliveries kept for stats()
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS outbox ("
+    "  id              INTEGER PRIMARY KEY AUTOINCREMENT,"
+    "  sender          TEXT    NOT NULL,"
+    "  recipients      TEXT    NOT NULL,"
+    "  message         TEXT    NOT NULL,"
+    "  queued_at       REAL    NOT NULL,"
+    "  next_attempt_at REAL    NOT NULL,"
+    "  claimed_by      TEXT,"
+    "  claimed_at      REAL,"
+    "  attempts        INTEGER NOT NULL DEFAULT 0,"
+    "  failed          INTEGER NOT NULL DEFAULT 0,"
+    "  last_error      TEXT)",
+    "CREATE INDEX IF NOT EXISTS ix_outbox_due ON outbox (failed, next_attempt_at)",
+    "CREATE TABLE IF NOT EXISTS deliveries ("
+    "  id INTEGER PRIMARY KEY AUTOINCREMENT, delivered_at REAL NOT NULL, latency REAL NOT NULL)",
+)
+
+
+def open_smtp(config, timeout: float = 10) -> smtplib.SMTP:
+    """Connected SMTP session: EHLO, STARTTLS when offered, login when configured."""
+    smtp = smtplib.SMTP(config.get("MAIL_SERVER", "localhost"),
+                        int(config.get("MAIL_PORT", 25)), timeout=timeout)
+    try:
+        smtp.ehlo()
+        if smtp.has_extn("STARTTLS"):
+            smtp.starttls()
+            smtp.ehlo()
+        username = config.get("MAIL_USERNAME") or None
+        password = config.get("MAIL_PASSWORD") or None
+        if username and password:
+            smtp.login(username, password)
+    except Exception:
+        smtp.close()
+        raise
+    return smtp
+
+
+def _is_permanent(error: Exception) -> bool:
+    code = getattr(error, "smtp_code", None)
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        codes = [c for c, _ in error.recipients.values()]
+        code = min(codes) if codes else None
+    return code is not None and code >= 500
+
+
+class MailOutbox:
+    def __init__(self, app=None):
+        self.app          = None
+        self._wake        = threading.Event()
+        self._thread      = None
+        self._thread_lock = threading.Lock()
+        self._smtp        = None
+        self._smtp_used   = 0.0
+        self._resumed     = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.config.setdefault("MAIL_OUTBOX_ENABLED", False)
+        app.config.setdefault("MAIL_OUTBOX_PATH", DEFAULT_PATH)
+        app.config.setdefault("MAIL_OUTBOX_AUTOSTART", True)
+        app.extensions["mail_outbox"] = self
+
+        # Deliver whatever a previous worker left queued, from the worker's
+        # first request rather than at boot (see LeadSpool._resume)
+        if app.config["MAIL_OUTBOX_ENABLED"] and app.config["MAIL_OUTBOX_AUTOSTART"]:
+            app.before_request(self._resume)
+
+    def _resume(self) -> None:
+        if self._resumed:
+            return
+        self._resumed = True
+        threading.Thread(target=self._resume_backlog, daemon=True).start()
+
+    def _resume_backlog(self) -> None:
+        try:
+            if self.stats()["pending"]:
+                self.start_dispatcher()
+        except Exception as e:
+            self.app.logger.error("mail outbox backlog check failed: %s", e)
+
+    @property
+    def _owner(self) -> str:
+        # Resolved per call: Passenger may fork workers after import
+        return f"{os.getpid()}-{id(self)}"
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.app and self.app.config["MAIL_OUTBOX_ENABLED"])
+
+    # ── Outbox ───────────────────────────────────────────────────────────────
+
+    def _connect(self) -> sqlite3.Connection:
+        path = self.app.config["MAIL_OUTBOX_PATH"]
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = sqlite3.connect(path, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=FULL")
+        for stmt in _SCHEMA:
+            conn.execute(stmt)
+        return conn
+
+    def enqueue(self, sender: str, recipients: list[str], message: str) -> int:
+        """Durably queue one rendered message; returns its outbox id."""
+        now = time.time()
+        conn = self._connect()
+        try:
+            cur = conn.execute(
+                "INSERT INTO outbox (sender, recipients, message, queued_at, next_attempt_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (sender, json.dumps(recipients), message, now, now),
+            )
+            outbox_id = cur.lastrowid
+        finally:
+            conn.close()
+
+        if self.app.config["MAIL_OUTBOX_AUTOSTART"]:
+            self.start_dispatcher()
+        self._wake.set()
+        return outbox_id
+
+    def stats(self) -> dict:
+        conn = self._connect()
+        try:
+            pending, oldest = conn.execute(
+                "SELECT COUNT(*), MIN(queued_at) FROM outbox WHERE failed = 0"
+            ).fetchone()
+            failed = conn.execute("SELECT COUNT(*) FROM outbox WHERE failed = 1").fetchone()[0]
+            latencies = sorted(r[0] for r in conn.execute("SELECT latency FROM deliveries"))
+        finally:
+            conn.close()
+
+        latency = None
+        if latencies:
+            latency = {
+                "count": len(latencies),
+                "avg":   round(sum(latencies) / len(latencies), 3),
+                "p95":   round(latencies[int(0.95 * (len(latencies) - 1))], 3),
+                "max":   round(latencies[-1], 3),
+            }
+        return {
+            "pending":            pending,
+            "failed":             failed,
+            "oldest_age_seconds": round(time.time() - oldest, 3) if oldest else None,
+            "latency_seconds":    latency,
+            "dispatcher_running": bool(self._thread and self._thread.is_alive()),
+        }
+
+    def _claim(self, conn, limit: int) -> list[tuple]:
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # A lease that ran out on the last attempt means the sender died
+            # mid-send; give up rather than reclaiming the row forever
+            conn.execute(
+                "UPDATE outbox SET failed = 1, claimed_by = NULL, claimed_at = NULL, "
+                "  last_error = COALESCE(last_error, 'lease expired on the last attempt') "
+                "WHERE failed = 0 AND attempts >= ? AND claimed_at < ?",
+                (MAX_ATTEMPTS, now - LEASE_SECONDS),
+            )
+            rows = conn.execute(
+                "SELECT id, sender, recipients, message, queued_at, attempts + 1 FROM outbox "
+                "WHERE failed = 0 AND attempts < ? AND next_attempt_at <= ? "
+                "  AND (claimed_at IS NULL OR claimed_at < ? OR claimed_by = ?) "
+                "ORDER BY id LIMIT ?",
+                (MAX_ATTEMPTS, now, now - LEASE_SECONDS, self._owner, limit),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE outbox SET claimed_by = ?, claimed_at = ?, attempts = attempts + 1 "
+                "WHERE id = ?",
+                [(self._owner, now, r[0]) for r in rows],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return rows
+
+    def _retry_later(self, conn, rows: list[tuple], error: Exception, permanent: bool = False) -> None:
+        now = time.time()
+        updates = []
+        for outbox_id, *_, attempts in rows:
+            delay = min(RETRY_DELAY * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+            give_up = permanent or attempts >= MAX_ATTEMPTS
+            updates.append((now + delay, int(give_up), str(error)[:500], outbox_id))
+        conn.executemany(
+            "UPDATE outbox SET claimed_by = NULL, claimed_at = NULL, next_attempt_at = ?, "
+            "failed = ?, last_error = ? WHERE id = ?",
+            updates,
+        )
+
+    # ── SMTP session ─────────────────────────────────────────────────────────
+
+    def _session(self) -> smtplib.SMTP:
+        """The warm SMTP connection, reopened if the server dropped it."""
+        if self._smtp is not None:
+            if time.time() - self._smtp_used < NOOP_AFTER:
+                return self._smtp
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._close_session()
+        self._smtp = open_smtp(self.app.config)
+        return self._smtp
+
+    def _close_session(self) -> None:
+        smtp, self._smtp = self._smtp, None
+        if smtp is None:
+            return
+        try:
+            smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            smtp.close()
+
+    # ── Dispatching ──────────────────────────────────────────────────────────
+
+    def dispatch_once(self, batch_size: int = BATCH_SIZE) -> int:
+        """Deliver up to `batch_size` due messages over one SMTP session.
+
+        Returns how many were accepted by the server.
+        """
+        conn = self._connect()
+        try:
+            claimed = self._claim(conn, batch_size)
+            if not claimed:
+                return 0
+
+            try:
+                smtp = self._session()
+            except (smtplib.SMTPException, OSError) as e:
+                self._retry_later(conn, claimed, e)
+                raise
+
+            delivered = []
+            try:
+                for i, row in enumerate(claimed):
+                    outbox_id, sender, recipients, message, queued_at, _ = row
+                    try:
+                        smtp.sendmail(sender, json.loads(recipients), message)
+                    except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused) as e:
+                        self._retry_later(conn, [row], e, permanent=_is_permanent(e))
+                        continue
+                    except OSError as e:
+                        # Connection lost (SMTPServerDisconnected is an OSError too):
+                        # requeue this and the rest of the batch on a fresh session
+                        self._close_session()
+                        self._retry_later(conn, claimed[i:], e)
+                        break
+                    except Exception as e:
+                        # Bad row (undecodable recipients, unencodable body, ...):
+                        # a ValueError will never succeed, anything else is retried
+                        # until it runs out of attempts rather than resent forever
+                        self.app.logger.warning("mail outbox message %s failed: %r", outbox_id, e)
+                        self._retry_later(conn, [row], e, permanent=isinstance(e, ValueError))
+                        continue
+                    delivered.append((outbox_id, time.time() - queued_at))
+            finally:
+                self._smtp_used = time.time()
+                # Whatever happened later in the batch, accepted messages must
+                # leave the outbox or they are sent again when the lease expires
+                if delivered:
+                    self._record_deliveries(conn, delivered)
+            return len(delivered)
+        finally:
+            conn.close()
+
+    def _record_deliveries(self, conn, delivered: list[tuple[int, float]]) -> None:
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany("DELETE FROM outbox WHERE id = ?", [(i,) for i, _ in delivered])
+            conn.executemany(
+                "INSERT INTO deliveries (delivered_at, latency) VALUES (?, ?)",
+                [(now, latency) for _, latency in delivered],
+            )
+            conn.execute(
+                "DELETE FROM deliveries WHERE id <= (SELECT MAX(id) FROM deliveries) - ?",
+                (LATENCY_SAMPLES,),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def start_dispatcher(self) -> None:
+        with self._thread_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._dispatch_loop, daemon=True)
+            self._thread.start()
+
+    def _dispatch_loop(self) -> None:
+        backoff = 1
+        while True:
+            try:
+                sent = self.dispatch_once()
+                backoff = 1
+            except Exception as e:
+                self.app.logger.error("mail outbox dispatch failed: %s", e)
+                time.sleep(backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF)
+                continue
+            if not sent:
+                if self._smtp is not None and time.time() - self._smtp_used > SMTP_IDLE_TIMEOUT:
+                    self._close_session()
+                self._wake.wait(IDLE_WAIT)
+                self._wake.clear()
@@ -0,0 +1,199 @@
+"""
+Password Hasher — bounded process pool for password hashing.
+
+Hashing is deliberately CPU-heavy.  Run inline, a burst of logins (or a
+credential-stuffing run) pins every Passenger worker on it and ordinary
+page views stall.  With PASSWORD_HASH_WORKERS > 0, hashes run in a small
+per-worker process pool instead:
+
+  * at most PASSWORD_HASH_QUEUE hashes may be queued or running per
+    worker; beyond that, or once PASSWORD_HASH_DEADLINE seconds have
+    passed, the caller gets HasherBusy and the route asks the user to
+    retry, rather than every request piling up behind the CPU;
+  * the algorithm is PASSWORD_HASH_METHOD (any werkzeug method string,
+    e.g. "scrypt:32768:8:1" or "pbkdf2:sha256:600000"); existing hashes
+    keep verifying whatever they were made with.
+
+Pool processes are started with forkserver (spawn where that is not
+available), not fork: forking a threaded worker can copy a lock some
+other thread holds and hang the child.  If a pool process dies (e.g.
+the OOM killer), the broken pool is dropped and the hash retried once
+on a fresh one instead of failing every later login in that worker.
+
+stats() reports queue depth, rejections, pool restarts, and recent
+hash / queue-wait times, i.e. the CPU time taken off the request threads.
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+SAMPLES = 1000      # recent hashes kept for stats()
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+class HasherBusy(Exception):
+    """The hashing queue is full or the request's deadline passed."""
+
+
+def _generate(password: str, method: str, salt_length: int) -> tuple[str, float]:
+    start = time.perf_counter()
+    pwhash = generate_password_hash(password, method=method, salt_length=salt_length)
+    return pwhash, time.perf_counter() - start
+
+
+def _check(pwhash: str, password: str) -> tuple[bool, float]:
+    start = time.perf_counter()
+    ok = check_password_hash(pwhash, password)
+    return ok, time.perf_counter() - start
+
+
+class PasswordHasher:
+    def __init__(self, app=None):
+        self.app        = None
+        self._executor  = None
+        self._pid       = None
+        self._lock      = threading.Lock()
+        self._in_flight = 0
+        self._samples   = deque(maxlen=SAMPLES)     # (hash seconds, queue-wait seconds)
+        self._counts    = {"hashed": 0, "rejected": 0, "timed_out": 0, "pool_restarts": 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.config.setdefault("PASSWORD_HASH_METHOD", "scrypt")
+        app.config.setdefault("PASSWORD_HASH_SALT_LENGTH", 16)
+        app.config.setdefault("PASSWORD_HASH_WORKERS", 0)
+        app.config.setdefault("PASSWORD_HASH_QUEUE", 8)
+        app.config.setdefault("PASSWORD_HASH_DEADLINE", 5.0)
+        app.extensions["password_hasher"] = self
+
+    # ── Public API ───────────────────────────────────────────────────────────
+
+    def generate(self, password: str) -> str:
+        cfg = self.app.config
+        return self._run(_generate, password, cfg["PASSWORD_HASH_METHOD"],
+                         cfg["PASSWORD_HASH_SALT_LENGTH"])
+
+    def check(self, pwhash: str, password: str) -> bool:
+        return self._run(_check, pwhash, password)
+
+    def stats(self) -> dict:
+        with self._lock:
+            samples = list(self._samples)
+            counts = dict(self._counts)
+            in_flight = self._in_flight
+        result = {
+            "workers":   self.app.config["PASSWORD_HASH_WORKERS"],
+            "method":    self.app.config["PASSWORD_HASH_METHOD"],
+            "in_flight": in_flight,
+            **counts,
+        }
+        for name, idx in (("hash_ms", 0), ("queue_wait_ms", 1)):
+            values = sorted(s[idx] for s in samples)
+            result[name] = {
+                "avg": round(sum(values) / len(values) * 1000, 2),
+                "p95": round(values[int(0.95 * (len(values) - 1))] * 1000, 2),
+            } if values else None
+        result["offloaded_seconds"] = round(sum(s[0] for s in samples), 3) if self.pooled else 0
+        return result
+
+    @property
+    def pooled(self) -> bool:
+        return bool(self.app.config["PASSWORD_HASH_WORKERS"])
+
+    # ── Pool ─────────────────────────────────────────────────────────────────
+
+    def _pool(self) -> ProcessPoolExecutor:
+        # Created lazily and per pid: Passenger forks workers after import
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.app.config["PASSWORD_HASH_WORKERS"],
+                    mp_context=multiprocessing.get_context(START_METHOD),
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def _discard(self, executor: ProcessPoolExecutor) -> None:
+        # Another thread may already have replaced the broken pool
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+            self._counts["pool_restarts"] += 1
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, fn, *args):
+        """Queue fn on the pool, replacing a broken pool once; the caller holds a slot."""
+        executor = self._pool()
+        try:
+            try:
+                future = executor.submit(fn, *args)
+            except BrokenProcessPool:
+                self._discard(executor)
+                executor = self._pool()
+                future = executor.submit(fn, *args)
+        except Exception:
+            self._release()
+            raise
+        # The slot stays taken until the hash really finishes, even if we give up
+        future.add_done_callback(self._release)
+        return executor, future
+
+    def _wait(self, future, deadline: float):
+        try:
+            return future.result(timeout=max(deadline - time.monotonic(), 0))
+        except FutureTimeout:
+            future.cancel()
+            self._count("timed_out")
+            raise HasherBusy("password hashing deadline passed")
+
+    def _record(self, hash_seconds: float, wait_seconds: float) -> None:
+        with self._lock:
+            self._counts["hashed"] += 1
+            self._samples.append((hash_seconds, max(wait_seconds, 0.0)))
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._counts[key] += 1
+
+    def _release(self, _future=None) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    def _run(self, fn, *args):
+        if not self.pooled:
+            result, seconds = fn(*args)
+            self._record(seconds, 0.0)
+            return result
+
+        start = time.monotonic()
+        deadline = start + self.app.config["PASSWORD_HASH_DEADLINE"]
+        with self._lock:
+            full = self._in_flight >= self.app.config["PASSWORD_HASH_QUEUE"]
+            if full:
+                self._counts["rejected"] += 1
+            else:
+                self._in_flight += 1
+        if full:
+            raise HasherBusy("password hashing queue is full")
+        executor, future = self._submit(fn, *args)
+        try:
+            result, seconds = self._wait(future, deadline)
+        except BrokenProcessPool:
+            # A pool process died mid-hash: retry once on a fresh pool
+            self._discard(executor)
+            with self._lock:
+                self._in_flight += 1        # the failed future gave its slot back
+            _, future = self._submit(fn, *args)
+            result, seconds = self._wait(future, deadline)
+        self._record(seconds, time.monotonic() - start - seconds)
+        return result
@@ -0,0 +1,208 @@
+"""
+Schema Migrations — versioned schema changes with a stamp table.
+
+create_app used to call db.create_all() in every Passenger worker: a
+catalogue query per table on each spawn, and it never touches tables
+that already exist, so older databases never got the indexes added to
+models.py since.  Instead, schema changes are numbered steps in
+MIGRATIONS and the `schema_version` table (models.SchemaVersion)
+records which have run.
+
+  * At boot, check() is a single SELECT MAX(version).  A database that
+    is behind is upgraded in place when SCHEMA_AUTO_UPGRADE is set
+    (development); otherwise the worker logs a warning and carries on.
+  * `flask --app app db upgrade` applies pending steps, each committed
+    and stamped on its own, so an interrupted run resumes where it
+    stopped.  `flask --app app db status` lists them.
+
+Index and column steps skip what already exists (fresh databases get
+it from the baseline create_all).  Steps that add columns must run
+before workers on the new code restart, so the deploy steps run the
+upgrade ahead of the Passenger restart.  On MySQL they are built with
+ALGORITHM=INPLACE, LOCK=NONE so the table stays writable meanwhile.
+"""
+
+from datetime import datetime
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import func, inspect, select
+from sqlalchemy.exc import IntegrityError, OperationalError, ProgrammingError
+from sqlalchemy.schema import CreateIndex
+
+
+# ── Steps ────────────────────────────────────────────────────────────────────
+
+def _create_index(name: str) -> None:
+    """Create the index called `name` in models.py unless the table has it."""
+    from extensions import db
+
+    index = next(ix for table in db.metadata.tables.values()
+                 for ix in table.indexes if ix.name == name)
+    existing = {ix["name"] for ix in inspect(db.engine).get_indexes(index.table.name)}
+    if name in existing:
+        return
+    ddl = str(CreateIndex(index).compile(dialect=db.engine.dialect))
+    if db.engine.dialect.name == "mysql":
+        ddl += " ALGORITHM=INPLACE LOCK=NONE"
+    db.session.execute(db.text(ddl))
+
+
+def _add_column(table_name: str, column_name: str) -> None:
+    """Add the column as declared in models.py unless the table has it."""
+    from extensions import db
+
+    column = db.metadata.tables[table_name].c[column_name]
+    existing = {c["name"] for c in inspect(db.engine).get_columns(table_name)}
+    if column_name in existing:
+        return
+    dialect = db.engine.dialect
+    null = "NULL" if column.nullable else "NOT NULL"
+    db.session.execute(db.text(
+        f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column.type.compile(dialect)} {null}"
+    ))
+
+
+def _baseline() -> None:
+    # Creates missing tables only (with their current indexes); existing
+    # tables are left alone and picked up by the index steps below
+    from extensions import db
+
+    db.create_all()
+
+
+def _index_leads() -> None:
+    _create_index("ix_leads_created_at_id")
+    _create_index("ix_leads_email")
+
+
+def _index_ev_users() -> None:
+    # All three lead with user_id, so they also serve plain owner lookups
+    _create_index("ix_ev_users_user_full_name")
+    _create_index("ix_ev_users_user_license_plate")
+    _create_index("ix_ev_users_user_make_model")
+
+
+def _index_verification_codes() -> None:
+    _create_index("ix_verification_codes_lookup")
+    _create_index("ix_verification_codes_expires_at")
+
+
+def _leads_spool_key() -> None:
+    _add_column("leads", "spool_key")
+    _create_index("ux_leads_spool_key")
+
+
+# Append only: never renumber or edit a step that has shipped
+MIGRATIONS = [
+    (1, "baseline tables", _baseline),
+    (2, "leads: created_at/id and email indexes", _index_leads),
+    (3, "ev_users: owner + sort / search indexes", _index_ev_users),
+    (4, "verification_codes: lookup and expiry indexes", _index_verification_codes),
+    (5, "leads: spool_key idempotency column", _leads_spool_key),
+]
+LATEST = MIGRATIONS[-1][0]
+
+
+class SchemaMigrations:
+    def __init__(self, app=None):
+        self.app = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.config.setdefault("SCHEMA_AUTO_UPGRADE", False)
+        app.extensions["schema_migrations"] = self
+        app.cli.add_command(db_cli)
+
+    # ── Public API (inside an application context) ──────────────────────────
+
+    def current_version(self) -> int:
+        """Highest applied version; 0 for a database that predates the stamp table."""
+        from extensions import db
+        from models import SchemaVersion
+
+        try:
+            return db.session.scalar(select(func.max(SchemaVersion.version))) or 0
+        except (OperationalError, ProgrammingError):
+            db.session.rollback()
+            return 0
+
+    def check(self) -> int:
+        """Boot-time check: one query when the schema is current."""
+        version = self.current_version()
+        if version >= LATEST:
+            return version
+        if self.app.config["SCHEMA_AUTO_UPGRADE"]:
+            return self.upgrade(version)
+        self.app.logger.warning(
+            "database schema is at version %s of %s; run `flask --app app db upgrade`",
+            version, LATEST,
+        )
+        return version
+
+    def upgrade(self, version: int | None = None) -> int:
+        """Apply every pending step in order; returns the new version."""
+        from extensions import db
+        from models import SchemaVersion
+
+        if version is None:
+            version = self.current_version()
+        SchemaVersion.__table__.create(db.engine, checkfirst=True)
+        for number, description, step in MIGRATIONS:
+            if number <= version:
+                continue
+            self.app.logger.info("schema migration %s: %s", number, description)
+            step()
+            try:
+                db.session.add(SchemaVersion(
+                    version=number, description=description, applied_at=datetime.utcnow(),
+                ))
+                db.session.commit()
+            except IntegrityError:
+                # Another process applied and stamped the same step
+                db.session.rollback()
+            version = number
+        return version
+
+    def status(self) -> list[tuple[int, str, datetime | None]]:
+        """(version, description, applied_at or None) for every step."""
+        from extensions import db
+        from models import SchemaVersion
+
+        applied = {}
+        if self.current_version():
+            applied = dict(db.session.execute(
+                select(SchemaVersion.version, SchemaVersion.applied_at)
+            ).all())
+        return [(n, d, applied.get(n)) for n, d, _ in MIGRATIONS]
+
+
+# ── CLI ──────────────────────────────────────────────────────────────────────
+
+db_cli = AppGroup("db", help="Database schema migrations.")
+
+
+@db_cli.command("upgrade")
+def upgrade_command():
+    """Apply pending schema migrations."""
+    from flask import current_app
+
+    migrations = current_app.extensions["schema_migrations"]
+    before = migrations.current_version()
+    after = migrations.upgrade(before)
+    if after == before:
+        click.echo(f"Schema is up to date (version {after}).")
+    else:
+        click.echo(f"Upgraded schema from version {before} to {after}.")
+
+
+@db_cli.command("status")
+def status_command():
+    """List schema migrations and when each was applied."""
+    from flask import current_app
+
+    for number, description, applied_at in current_app.extensions["schema_migrations"].status():
+        stamp = applied_at.isoformat(sep=" ", timespec="seconds") if applied_at else "pending"
+        click.echo(f"{number:>4}  {stamp:<19}  {description}")
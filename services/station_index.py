@@ -0,0 +1,391 @@
+"""
+Station Index — local spatial store of DC fast-charging stations.
+
+Stations from OpenChargeMap are kept in SQLite (instance/stations.db)
+with an R-tree over their coordinates, so radius and bounding-box
+queries are answered locally instead of proxying every map load to
+api.openchargemap.io.  Where SQLite was built without R-tree support a
+plain (lat, lng) index is used instead.
+
+Loading is incremental: each station carries OpenChargeMap's
+last-modified stamp and unchanged rows are skipped.
+
+Routes share one StationIndex per worker through get_station_index(),
+so the schema is set up once rather than on every request.
+
+    python -m services.station_index load <export.json|export.ndjson> [--prune]
+    python -m services.station_index refresh      # OCM API, modified since last run
+"""
+
+import json
+import math
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+
+_BASE_DIR    = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PATH = os.path.normpath(os.path.join(_BASE_DIR, "..", "instance", "stations.db"))
+
+OCM_URL         = "https://api.openchargemap.io/v3/poi/"
+EARTH_RADIUS_MI = 3958.8
+MILES_PER_DEG   = 69.0
+
+# Clustering for map display (see cluster_stations)
+TILE_PX          = 256
+CLUSTER_CELL_PX  = 64
+CLUSTER_MAX_ZOOM = 15      # at and beyond this zoom every station is drawn
+
+EMPTY_RECHECK = 300        # seconds before an empty store is looked at again
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS stations ("
+    "  id INTEGER PRIMARY KEY, name TEXT, lat REAL NOT NULL, lng REAL NOT NULL,"
+    "  address TEXT, city TEXT, state TEXT, modified TEXT)",
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)",
+)
+_STATION_COLUMNS = "s.id, s.name, s.lat, s.lng, s.address, s.city, s.state"
+_RTREE  = "CREATE VIRTUAL TABLE IF NOT EXISTS stations_rtree USING rtree(id, min_lat, max_lat, min_lng, max_lng)"
+_LATLNG = "CREATE INDEX IF NOT EXISTS ix_stations_lat_lng ON stations (lat, lng)"
+
+
+def haversine_miles(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_MI * math.asin(math.sqrt(a))
+
+
+def _mercator_px(lat: float, lng: float, zoom: int) -> tuple[float, float]:
+    """Global Web-Mercator pixel coordinates (256 px tiles) at `zoom`."""
+    size = TILE_PX * (1 << zoom)
+    lat = max(min(lat, 85.05112878), -85.05112878)
+    siny = math.sin(math.radians(lat))
+    x = (lng + 180.0) / 360.0 * size
+    y = (0.5 - math.log((1 + siny) / (1 - siny)) / (4 * math.pi)) * size
+    return x, y
+
+
+def cluster_stations(stations: list[dict], zoom: int, cell_px: int = CLUSTER_CELL_PX) -> dict:
+    """Grid-cluster stations for display at `zoom`.
+
+    Cells are aligned to the global pixel grid, so each cell falls in
+    exactly one map tile and clusters are identical whichever tile they
+    are requested through.  Returns {"stations": [...], "clusters":
+    [{"lat", "lng", "count"}]}: cells holding one station keep it as-is.
+    """
+    if zoom >= CLUSTER_MAX_ZOOM:
+        return {"stations": stations, "clusters": []}
+
+    cells: dict[tuple[int, int], list[dict]] = {}
+    for s in stations:
+        x, y = _mercator_px(s["lat"], s["lng"], zoom)
+        cells.setdefault((int(x // cell_px), int(y // cell_px)), []).append(s)
+
+    singles, clusters = [], []
+    for members in cells.values():
+        if len(members) == 1:
+            singles.append(members[0])
+            continue
+        clusters.append({
+            "lat":   round(sum(m["lat"] for m in members) / len(members), 6),
+            "lng":   round(sum(m["lng"] for m in members) / len(members), 6),
+            "count": len(members),
+        })
+    return {"stations": singles, "clusters": clusters}
+
+
+def _station_dict(row) -> dict:
+    return {"id": row[0], "name": row[1], "lat": row[2], "lng": row[3],
+            "address": row[4], "city": row[5], "state": row[6]}
+
+
+def _is_dc_fast(poi: dict) -> bool:
+    connections = poi.get("Connections") or []
+    if not connections:
+        return True   # compact exports omit connections; they were filtered upstream
+    return any(c.get("LevelID") == 3 for c in connections)
+
+
+def _station_row(poi: dict) -> tuple | None:
+    addr = poi.get("AddressInfo") or {}
+    lat, lng = addr.get("Latitude"), addr.get("Longitude")
+    if poi.get("ID") is None or lat is None or lng is None or not _is_dc_fast(poi):
+        return None
+    modified = poi.get("DateLastStatusUpdate") or poi.get("DateLastVerified") or poi.get("DateCreated")
+    return (
+        int(poi["ID"]),
+        addr.get("Title", "EV Charging Station"),
+        float(lat),
+        float(lng),
+        addr.get("AddressLine1", ""),
+        addr.get("Town", ""),
+        addr.get("StateOrProvince", ""),
+        modified,
+    )
+
+
+def _iter_export(path: str):
+    """POIs from a JSON array or NDJSON (one POI per line) export."""
+    with open(path, encoding="utf-8") as f:
+        first = f.read(1)
+        while first.isspace():
+            first = f.read(1)
+        f.seek(0)
+        if first == "[":
+            yield from json.load(f)
+            return
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+class StationIndex:
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.path = path
+        self._rtree = None
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        if self._rtree is None:
+            # First connection from this instance: make sure the tables exist
+            for stmt in _SCHEMA:
+                conn.execute(stmt)
+            try:
+                conn.execute(_RTREE)
+                self._rtree = True
+            except sqlite3.OperationalError:
+                conn.execute(_LATLNG)
+                self._rtree = False
+        return conn
+
+    def count(self) -> int:
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT COUNT(*) FROM stations").fetchone()[0]
+        finally:
+            conn.close()
+
+    # ── Loading ──────────────────────────────────────────────────────────────
+
+    def upsert(self, pois, prune: bool = False) -> dict:
+        """Insert new / changed stations; with `prune`, drop ones not in `pois`.
+
+        Returns counts of added, updated, unchanged and removed stations.
+        """
+        stats = {"added": 0, "updated": 0, "unchanged": 0, "removed": 0}
+        conn = self._connect()
+        try:
+            known = dict(conn.execute("SELECT id, modified FROM stations"))
+            seen = set()
+            with conn:
+                for poi in pois:
+                    row = _station_row(poi)
+                    if row is None:
+                        continue
+                    station_id = row[0]
+                    seen.add(station_id)
+                    if station_id in known and known[station_id] == row[-1]:
+                        stats["unchanged"] += 1
+                        continue
+                    stats["updated" if station_id in known else "added"] += 1
+                    conn.execute("INSERT OR REPLACE INTO stations VALUES (?, ?, ?, ?, ?, ?, ?, ?)", row)
+                    if self._rtree:
+                        lat, lng = row[2], row[3]
+                        conn.execute(
+                            "INSERT OR REPLACE INTO stations_rtree VALUES (?, ?, ?, ?, ?)",
+                            (station_id, lat, lat, lng, lng),
+                        )
+
+                if prune:
+                    gone = [(i,) for i in known.keys() - seen]
+                    conn.executemany("DELETE FROM stations WHERE id = ?", gone)
+                    if self._rtree:
+                        conn.executemany("DELETE FROM stations_rtree WHERE id = ?", gone)
+                    stats["removed"] = len(gone)
+        finally:
+            conn.close()
+        return stats
+
+    def load_export(self, path: str, prune: bool = False) -> dict:
+        return self.upsert(_iter_export(path), prune=prune)
+
+    def refresh_from_api(self, session=None, api_key: str | None = None) -> dict:
+        """Pull US DC fast chargers changed since the last refresh from OpenChargeMap."""
+        import requests
+
+        session = session or requests.Session()
+        since = self._get_meta("last_refresh")
+        params = {
+            "output": "json", "countrycode": "US", "levelid": 3,
+            "maxresults": 100000, "compact": True, "verbose": False,
+        }
+        if since:
+            params["modifiedsince"] = since
+        if api_key:
+            params["key"] = api_key
+
+        started = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+        r = session.get(OCM_URL, params=params, timeout=120,
+                        headers={"User-Agent": "PrezentEnergy-StationFinder/1.0"})
+        r.raise_for_status()
+        stats = self.upsert(r.json())
+        self._set_meta("last_refresh", started)
+        return stats
+
+    def _get_meta(self, key: str) -> str | None:
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+            return row[0] if row else None
+        finally:
+            conn.close()
+
+    def _set_meta(self, key: str, value: str) -> None:
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, value))
+        finally:
+            conn.close()
+
+    # ── Queries ──────────────────────────────────────────────────────────────
+
+    def is_empty(self) -> bool:
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT 1 FROM stations LIMIT 1").fetchone() is None
+        finally:
+            conn.close()
+
+    def _bbox_from(self) -> str:
+        """FROM / WHERE for stations inside (south, north, west, east); call after _connect()."""
+        if self._rtree:
+            return ("FROM stations_rtree r JOIN stations s ON s.id = r.id "
+                    "WHERE r.max_lat >= ? AND r.min_lat <= ? AND r.max_lng >= ? AND r.min_lng <= ?")
+        return "FROM stations s WHERE s.lat >= ? AND s.lat <= ? AND s.lng >= ? AND s.lng <= ?"
+
+    def _in_bbox(self, south: float, west: float, north: float, east: float,
+                 tail: str = "", params: tuple = ()) -> list[dict]:
+        conn = self._connect()
+        try:
+            sql = f"SELECT {_STATION_COLUMNS} {self._bbox_from()} {tail}"
+            rows = conn.execute(sql, (south, north, west, east) + params).fetchall()
+        finally:
+            conn.close()
+        return [_station_dict(r) for r in rows]
+
+    def query_bbox(self, south: float, west: float, north: float, east: float,
+                   limit: int | None = None) -> list[dict]:
+        """Stations inside the box, nearest to its centre first.
+
+        Ordered and limited in SQL by equirectangular distance (the same
+        order as haversine at map scales), so only `limit` rows are read.
+        """
+        c_lat, c_lng = (south + north) / 2, (west + east) / 2
+        tail = "ORDER BY (s.lat - ?) * (s.lat - ?) + (s.lng - ?) * (s.lng - ?) * ?"
+        params = (c_lat, c_lat, c_lng, c_lng, math.cos(math.radians(c_lat)) ** 2)
+        if limit:
+            tail += " LIMIT ?"
+            params += (limit,)
+        return self._in_bbox(south, west, north, east, tail, params)
+
+    def cluster_bbox(self, south: float, west: float, north: float, east: float,
+                     zoom: int, cell_px: int = CLUSTER_CELL_PX, limit: int | None = None) -> dict:
+        """cluster_stations() for the box, with the grid cells grouped in SQL.
+
+        One row per occupied cell comes back, however many stations the
+        box holds.  At CLUSTER_MAX_ZOOM and beyond, the nearest `limit`
+        stations are returned unclustered.
+        """
+        if zoom >= CLUSTER_MAX_ZOOM:
+            return {"stations": self.query_bbox(south, west, north, east, limit=limit),
+                    "clusters": []}
+
+        conn = self._connect()
+        try:
+            # Mercator x is linear in longitude; y needs log/sin, which
+            # SQLite may lack, so the row comes from a Python function
+            conn.create_function(
+                "mercator_row", 1,
+                lambda lat: int(_mercator_px(lat, 0.0, zoom)[1] // cell_px),
+                deterministic=True,
+            )
+            # With MIN(s.id), SQLite takes the bare columns from that row:
+            # the whole station when a cell holds just one
+            sql = (
+                f"SELECT COUNT(*), AVG(s.lat), AVG(s.lng), MIN(s.id), {_STATION_COLUMNS} "
+                f"{self._bbox_from()} "
+                "GROUP BY CAST((s.lng + 180.0) / 360.0 * ? AS INTEGER), mercator_row(s.lat)"
+            )
+            cells_across = TILE_PX * (1 << zoom) / cell_px
+            rows = conn.execute(sql, (south, north, west, east, cells_across)).fetchall()
+        finally:
+            conn.close()
+
+        singles, clusters = [], []
+        for count, lat, lng, _, *station in rows:
+            if count == 1:
+                singles.append(_station_dict(station))
+            else:
+                clusters.append({"lat": round(lat, 6), "lng": round(lng, 6), "count": count})
+        return {"stations": singles, "clusters": clusters}
+
+    def query_radius(self, lat: float, lng: float, miles: float,
+                     limit: int | None = None) -> list[dict]:
+        """Stations within `miles` of (lat, lng), nearest first, with a `distance` field."""
+        dlat = miles / MILES_PER_DEG
+        dlng = miles / (MILES_PER_DEG * max(math.cos(math.radians(lat)), 0.01))
+        results = []
+        for s in self._in_bbox(lat - dlat, lng - dlng, lat + dlat, lng + dlng):
+            distance = haversine_miles(lat, lng, s["lat"], s["lng"])
+            if distance <= miles:
+                s["distance"] = round(distance, 2)
+                results.append(s)
+        results.sort(key=lambda s: s["distance"])
+        return results[:limit] if limit else results
+
+
+_indexes: dict[str, StationIndex] = {}
+_empty: dict[str, float] = {}        # path -> monotonic time it was found empty
+_indexes_lock = threading.Lock()
+
+
+def get_station_index(path: str = DEFAULT_PATH) -> StationIndex | None:
+    """The shared index for `path`, or None until stations have been loaded.
+
+    An empty store is remembered for EMPTY_RECHECK seconds, so requests
+    don't each query it; one loaded later is picked up after that.
+    """
+    index = _indexes.get(path)
+    if index is not None:
+        return index
+    empty_since = _empty.get(path)
+    if empty_since is not None and time.monotonic() - empty_since < EMPTY_RECHECK:
+        return None
+    with _indexes_lock:
+        if path not in _indexes:
+            index = StationIndex(path)
+            if index.is_empty():
+                _empty[path] = time.monotonic()
+                return None
+            _empty.pop(path, None)
+            _indexes[path] = index
+    return _indexes[path]
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    index = StationIndex()
+    start = time.monotonic()
+    if len(args) >= 2 and args[0] == "load":
+        stats = index.load_export(args[1], prune="--prune" in args)
+    elif args == ["refresh"]:
+        stats = index.refresh_from_api(api_key=os.environ.get("OCM_API_KEY"))
+    else:
+        sys.exit("usage: python -m services.station_index load <export> [--prune] | refresh")
+    print(f"{stats} in {time.monotonic() - start:.1f}s — {index.count()} stations indexed")
@@ -0,0 +1,81 @@
+"""
+User Cache — per-worker snapshots of signed-in users for login_manager.
+
+flask-login calls the user_loader on every request from a signed-in
+user, which used to be one SELECT on `users` per page view.  Column
+values are now kept in a small LRU with a TTL; a hit is attached to the
+request's session with merge(load=False), so no SQL is issued and
+relationships still lazy-load as usual.
+
+Each worker has its own cache.  When a profile changes, routes call
+user_changed(), which drops this worker's entries and gives the signed
+session a new "user_rev".  The rev is part of the cache key, so the
+browser that made the change sees fresh values on every worker; other
+sessions of the same account may see the old ones for up to the TTL.
+"""
+
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy.orm import make_transient_to_detached
+
+DEFAULT_TTL         = 300
+DEFAULT_MAX_ENTRIES = 1024
+
+
+class UserCache:
+    def __init__(self, app=None):
+        self.app      = None
+        self._entries = OrderedDict()     # (user_id, rev) -> (stored_at, column values)
+        self._lock    = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.config.setdefault("USER_CACHE_TTL", DEFAULT_TTL)
+        app.config.setdefault("USER_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)
+        app.extensions["user_cache"] = self
+
+    def load(self, user_id: int, rev: str | None = None):
+        """The User for `user_id`, attached to the current db session, or None."""
+        from extensions import db
+        from models import User
+
+        ttl = self.app.config["USER_CACHE_TTL"]
+        key = (user_id, rev)
+        now = time.monotonic()
+
+        values = None
+        if ttl:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and now - entry[0] < ttl:
+                    self._entries.move_to_end(key)
+                    values = entry[1]
+        if values is not None:
+            user = User(**values)
+            make_transient_to_detached(user)
+            return db.session.merge(user, load=False)
+
+        user = db.session.get(User, user_id)
+        if user is not None and ttl:
+            values = {attr.key: getattr(user, attr.key) for attr in User.__mapper__.column_attrs}
+            with self._lock:
+                self._entries[key] = (now, values)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.app.config["USER_CACHE_MAX_ENTRIES"]:
+                    self._entries.popitem(last=False)
+        return user
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == user_id]:
+                del self._entries[key]
+
+    def user_changed(self, user_id: int, session) -> None:
+        """Call after committing changes to a user row."""
+        self.invalidate(user_id)
+        session["user_rev"] = secrets.token_hex(4)
@@ -0,0 +1,114 @@
+"""
+Verification Codes — expiry purge and stateless signed codes.
+
+Codes are single use and live for ten minutes, but rows used to be kept
+forever, so verification_codes (and every _validate_code lookup) grew
+with each sign-in.  CodePurger runs a daemon thread per worker that
+deletes rows past their expiry every VERIFICATION_PURGE_INTERVAL
+seconds.  Used codes expire like any other, so they go in the same
+sweep.  Rows are deleted in small batches so MySQL never holds long
+locks, and concurrent purges from several workers are harmless.
+
+With VERIFICATION_CODES_SIGNED the table is skipped entirely: the code
+is an HMAC of (user, purpose, 10-minute window) under SECRET_KEY and is
+checked by recomputing it.  A signed code cannot be marked used, so it
+stays valid until its window closes (10–20 minutes).
+"""
+
+import hashlib
+import hmac
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import delete, select
+
+PURGE_INTERVAL = 3600      # seconds between sweeps
+PURGE_BATCH    = 5000
+CODE_WINDOW    = 600       # seconds each signed code window lasts
+
+
+def purge_expired_codes(now: datetime | None = None, batch_size: int = PURGE_BATCH) -> int:
+    """Delete codes that expired before `now`; returns how many went.
+
+    Must be called inside an application context.
+    """
+    from extensions import db
+    from models import VerificationCode
+
+    cutoff = now or datetime.utcnow()
+    purged = 0
+    while True:
+        ids = db.session.scalars(
+            select(VerificationCode.id)
+            .where(VerificationCode.expires_at <= cutoff)
+            .limit(batch_size)
+        ).all()
+        if not ids:
+            break
+        db.session.execute(delete(VerificationCode).where(VerificationCode.id.in_(ids)))
+        db.session.commit()
+        purged += len(ids)
+        if len(ids) < batch_size:
+            break
+    return purged
+
+
+class CodePurger:
+    def __init__(self, app=None):
+        self.app          = None
+        self._thread      = None
+        self._thread_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.config.setdefault("VERIFICATION_PURGE_INTERVAL", PURGE_INTERVAL)
+        app.config.setdefault("VERIFICATION_CODES_SIGNED", False)
+        app.extensions["code_purger"] = self
+
+    def start(self) -> None:
+        """Start this worker's purge thread (no-op if running or disabled).
+
+        Called lazily from the first code send, so the thread is created
+        in the Passenger worker rather than in a pre-fork parent.
+        """
+        if not self.app.config["VERIFICATION_PURGE_INTERVAL"]:
+            return
+        with self._thread_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._purge_loop, daemon=True)
+            self._thread.start()
+
+    def _purge_loop(self) -> None:
+        while True:
+            try:
+                with self.app.app_context():
+                    purged = purge_expired_codes()
+                if purged:
+                    self.app.logger.info("purged %d expired verification codes", purged)
+            except Exception as e:
+                self.app.logger.error("verification code purge failed: %s", e)
+            time.sleep(self.app.config["VERIFICATION_PURGE_INTERVAL"])
+
+
+# ── Signed codes ──────────────────────────────────────────────────────────────
+
+def signed_code(secret: str, user_id: int, purpose: str, window: int | None = None) -> str:
+    """6-digit code for `user_id` / `purpose` in the given (default: current) window."""
+    if window is None:
+        window = int(time.time() // CODE_WINDOW)
+    msg = f"{user_id}:{purpose}:{window}".encode("utf-8")
+    digest = hmac.new(secret.encode("utf-8"), msg, hashlib.sha256).digest()
+    return f"{int.from_bytes(digest[:4], 'big') % 1_000_000:06d}"
+
+
+def check_signed_code(secret: str, user_id: int, purpose: str, submitted: str) -> bool:
+    """True if `submitted` matches the current or the previous window's code."""
+    window = int(time.time() // CODE_WINDOW)
+    return any(
+        hmac.compare_digest(signed_code(secret, user_id, purpose, w), submitted)
+        for w in (window, window - 1)
+    )
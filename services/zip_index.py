@@ -0,0 +1,160 @@
+"""
+ZIP Index — offline US ZIP → centroid lookup.
+
+The table (data/zip_centroids.bin) is a sorted array of fixed-size
+records, memory-mapped and binary-searched, so a lookup touches a
+handful of pages and takes microseconds with no network round trip.
+
+File format (little-endian):
+    header  b"ZIPC" | u16 version | u32 record count
+    record  u32 zip | i32 lat * 1e6 | i32 lng * 1e6     (sorted by zip)
+
+Regenerate it from a CSV of centroids (e.g. the Census Gazetteer ZCTA
+file — GEOID / INTPTLAT / INTPTLONG columns are recognised):
+
+    python -m services.zip_index path/to/centroids.csv [output.bin]
+
+setup_server.sh downloads the Gazetteer file and builds the table on the
+server.  Without a table, get_zip_index() returns None and zip searches
+fall back to the geocode cache / Nominatim.
+"""
+
+import csv
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+
+_BASE_DIR    = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PATH = os.path.normpath(os.path.join(_BASE_DIR, "..", "data", "zip_centroids.bin"))
+
+MAGIC   = b"ZIPC"
+VERSION = 1
+_HEADER = struct.Struct("<4sHI")
+_RECORD = struct.Struct("<Iii")
+SCALE   = 1_000_000
+MISSING_RECHECK = 300   # seconds before a missing / unreadable table is looked for again
+
+_ZIP_COLUMNS = ("zip", "zipcode", "zip_code", "zcta", "zcta5", "geoid")
+_LAT_COLUMNS = ("lat", "latitude", "intptlat")
+_LNG_COLUMNS = ("lng", "lon", "long", "longitude", "intptlong")
+
+
+class ZipIndex:
+    def __init__(self, path: str = DEFAULT_PATH):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self._mm.close()
+            raise ValueError(f"{path} is not a v{VERSION} ZIP centroid table")
+        if _HEADER.size + count * _RECORD.size > len(self._mm):
+            self._mm.close()
+            raise ValueError(f"{path} is truncated")
+        self.count = count
+
+    def __len__(self) -> int:
+        return self.count
+
+    def lookup(self, zipcode: str) -> tuple[float, float] | None:
+        """(lat, lng) for a 5-digit zip, or None if it isn't in the table."""
+        if len(zipcode) != 5 or not zipcode.isdigit():
+            return None
+        target = int(zipcode)
+        lo, hi = 0, self.count - 1
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            key, lat, lng = _RECORD.unpack_from(self._mm, _HEADER.size + mid * _RECORD.size)
+            if key < target:
+                lo = mid + 1
+            elif key > target:
+                hi = mid - 1
+            else:
+                return lat / SCALE, lng / SCALE
+        return None
+
+    def close(self) -> None:
+        self._mm.close()
+
+
+# ── Per-process singleton ─────────────────────────────────────────────────────
+
+_index: ZipIndex | None = None
+_index_path: str | None = None
+_missing: dict[str, float] = {}      # path -> monotonic time it was found missing
+_index_lock = threading.Lock()
+
+
+def get_zip_index(path: str = DEFAULT_PATH) -> ZipIndex | None:
+    """The shared index for `path`, or None when no table has been built.
+
+    A missing table is remembered for MISSING_RECHECK seconds, so requests
+    don't each try to open it; one built later is picked up after that.
+    """
+    global _index, _index_path
+    if _index is not None and _index_path == path:
+        return _index
+    missing_since = _missing.get(path)
+    if missing_since is not None and time.monotonic() - missing_since < MISSING_RECHECK:
+        return None
+    with _index_lock:
+        if _index is None or _index_path != path:
+            try:
+                _index = ZipIndex(path)
+            except (OSError, ValueError):
+                _missing[path] = time.monotonic()
+                return None
+            _missing.pop(path, None)
+            _index_path = path
+    return _index
+
+
+# ── Builder ───────────────────────────────────────────────────────────────────
+
+def _pick(fieldnames: list[str], candidates: tuple[str, ...]) -> str:
+    for name in fieldnames:
+        if name.strip().lower() in candidates:
+            return name
+    raise ValueError(f"CSV needs one of the columns: {', '.join(candidates)}")
+
+
+def build(csv_path: str, out_path: str = DEFAULT_PATH) -> int:
+    """Write a ZIP centroid table from a CSV/TSV; returns the record count."""
+    with open(csv_path, newline="", encoding="utf-8-sig") as f:
+        sample = f.read(4096)
+        f.seek(0)
+        dialect = csv.Sniffer().sniff(sample, delimiters=",\t|;")
+        reader = csv.DictReader(f, dialect=dialect)
+        zip_col = _pick(reader.fieldnames, _ZIP_COLUMNS)
+        lat_col = _pick(reader.fieldnames, _LAT_COLUMNS)
+        lng_col = _pick(reader.fieldnames, _LNG_COLUMNS)
+
+        records: dict[int, tuple[int, int]] = {}
+        for row in reader:
+            code = (row[zip_col] or "").strip()
+            if len(code) != 5 or not code.isdigit():
+                continue
+            try:
+                lat = round(float(row[lat_col]) * SCALE)
+                lng = round(float(row[lng_col]) * SCALE)
+            except (TypeError, ValueError):
+                continue
+            records[int(code)] = (lat, lng)
+
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    tmp = out_path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(records)))
+        for code in sorted(records):
+            f.write(_RECORD.pack(code, *records[code]))
+    os.replace(tmp, out_path)
+    return len(records)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        sys.exit("usage: python -m services.zip_index <centroids.csv> [output.bin]")
+    n = build(*sys.argv[1:])
+    print(f"Wrote {n} ZIP centroids to {sys.argv[2] if len(sys.argv) == 3 else DEFAULT_PATH}")
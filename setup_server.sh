@@ -92,10 +92,28 @@ echo "==> Initialising SQLite database …"
 cd "${APP_ROOT}"
 python - <<'PYEOF'
 from app import create_app
+from extensions import schema_migrations
 app = create_app("production")
-print("  Database tables created successfully.")
+with app.app_context():
+    version = schema_migrations.upgrade()
+print(f"  Database schema at version {version}.")
 PYEOF
 
+# ── Build the offline ZIP centroid table ───────────────────────────────────
+# Census Gazetteer ZCTA centroids → data/zip_centroids.bin (services/zip_index.py).
+# Without it, zip searches fall back to Nominatim.
+ZCTA_URL="${ZCTA_URL:-https://www2.census.gov/geo/docs/maps-data/data/gazetteer/2023_Gazetteer/2023_Gaz_zcta_national.zip}"
+echo ""
+echo "==> Building ZIP centroid table …"
+ZCTA_TMP="$(mktemp -d)"
+if curl -fsSL "${ZCTA_URL}" -o "${ZCTA_TMP}/zcta.zip" \
+   && unzip -q -o "${ZCTA_TMP}/zcta.zip" -d "${ZCTA_TMP}"; then
+  python -m services.zip_index "$(ls "${ZCTA_TMP}"/*.txt | head -n 1)"
+else
+  echo "WARNING: could not download ${ZCTA_URL} — zip searches will use Nominatim."
+fi
+rm -rf "${ZCTA_TMP}"
+
 # ── Fix permissions ────────────────────────────────────────────────────────
 echo ""
 echo "==> Setting file permissions …"
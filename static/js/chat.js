@@ -47,6 +47,7 @@ function appendBotMessage(text) {
   bubble.textContent = text;
   chatMessages.appendChild(bubble);
   chatMessages.scrollTop = chatMessages.scrollHeight;
+  return bubble;
 }
 
 function showTyping() {
@@ -75,17 +76,25 @@ async function sendChatMessage() {
   chatSend.disabled = true;
   showTyping();
 
+  let bubble = null;
   try {
-    const res  = await fetch(window.API_CHAT, {
-      method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify({ messages: chatHistory }),
-    });
-    const json = await res.json();
+    // Tokens are rendered as they stream in (see fetchStreamingReply in main.js)
+    const reply = await fetchStreamingReply(
+      window.API_CHAT,
+      { messages: chatHistory },
+      delta => {
+        if (!bubble) {
+          removeTyping();
+          bubble = appendBotMessage('');
+        }
+        bubble.textContent += delta;
+        chatMessages.scrollTop = chatMessages.scrollHeight;
+      },
+      'reply',
+    );
     removeTyping();
-    const reply = json.reply || json.error || 'No response.';
-    appendBotMessage(reply);
-    chatHistory.push({ role: 'assistant', content: reply });
+    if (!bubble) appendBotMessage('No response.');
+    chatHistory.push({ role: 'assistant', content: reply || 'No response.' });
   } catch (err) {
     removeTyping();
     appendBotMessage('Error: ' + (err && err.message ? err.message : 'fetch failed') + ' — URL: ' + window.API_CHAT);
@@ -1,9 +1,68 @@
 /* =============================================
    Prezent.Energy — main.js
    Handles: FAQ accordion, demo form submission,
-   news agent widget.
+   news agent widget, streaming AI replies.
    ============================================= */
 
+// ---- Streaming AI replies ---------------------------------
+// POSTs `body` asking for Server-Sent Events and calls onDelta(text) for
+// each chunk as it arrives.  Falls back to the plain JSON reply (field
+// `jsonField`) when the browser can't read streams or the server answers
+// with JSON.  Resolves with the full reply text.
+async function fetchStreamingReply(url, body, onDelta, jsonField) {
+  const canStream = !!(window.ReadableStream && window.TextDecoder);
+  const res = await fetch(url, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      'Accept': canStream ? 'text/event-stream' : 'application/json',
+    },
+    body: JSON.stringify(Object.assign({}, body, { stream: canStream })),
+  });
+
+  const type = res.headers.get('Content-Type') || '';
+  if (!canStream || !res.body || !type.startsWith('text/event-stream')) {
+    const json = await res.json();
+    const text = json[jsonField] || json.error || '';
+    if (text) onDelta(text);
+    return text;
+  }
+
+  const reader  = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let full   = '';
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let sep;
+    while ((sep = buffer.indexOf('\n\n')) !== -1) {
+      const frame = buffer.slice(0, sep);
+      buffer = buffer.slice(sep + 2);
+
+      let event = 'message';
+      let data  = '';
+      frame.split('\n').forEach(line => {
+        if (line.startsWith('event:')) event = line.slice(6).trim();
+        else if (line.startsWith('data:')) data += line.slice(5).trim();
+      });
+      if (!data) continue;   // comment / keep-alive frame
+
+      const payload = JSON.parse(data);
+      if (event === 'error') throw new Error(payload.error || 'stream failed');
+      if (event === 'done') return full;
+      if (payload.delta) {
+        full += payload.delta;
+        onDelta(payload.delta);
+      }
+    }
+  }
+  return full;
+}
+
+
 // ---- FAQ Accordion ----------------------------------------
 document.querySelectorAll('.faq-trigger').forEach(trigger => {
   trigger.addEventListener('click', () => {
@@ -95,6 +154,7 @@ function appendNewsMessage(text, role) {
   div.textContent = text;
   newsMessages.appendChild(div);
   newsMessages.scrollTop = newsMessages.scrollHeight;
+  return div;
 }
 
 function showNewsTyping() {
@@ -121,17 +181,24 @@ async function sendNewsQuery() {
   newsSend.disabled = true;
   showNewsTyping();
 
+  let bubble = null;
   try {
-    const res  = await fetch(window.API_NEWS, {
-      method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify({ query, history: newsHistory.slice(0, -1) }),
-    });
-    const json = await res.json();
+    const answer = await fetchStreamingReply(
+      window.API_NEWS,
+      { query, history: newsHistory.slice(0, -1) },
+      delta => {
+        if (!bubble) {
+          removeNewsTyping();
+          bubble = appendNewsMessage('', 'agent');
+        }
+        bubble.textContent += delta;
+        newsMessages.scrollTop = newsMessages.scrollHeight;
+      },
+      'answer',
+    );
     removeNewsTyping();
-    const answer = json.answer || json.error || 'No response received.';
-    appendNewsMessage(answer, 'agent');
-    newsHistory.push({ role: 'assistant', content: answer });
+    if (!bubble) appendNewsMessage('No response received.', 'agent');
+    newsHistory.push({ role: 'assistant', content: answer || 'No response received.' });
   } catch (err) {
     removeNewsTyping();
     appendNewsMessage('Error: ' + (err && err.message ? err.message : 'fetch failed') + ' — URL: ' + window.API_NEWS, 'agent');
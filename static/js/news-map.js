@@ -1,10 +1,20 @@
-/* news-map.js — Google Maps + OpenChargeMap integration for /news page */
+/* news-map.js — Google Maps + OpenChargeMap integration for /news page
+ *
+ * Stations are loaded per 256 px map tile for the current zoom level:
+ * each newly exposed tile is fetched once (bbox + zoom) and the server
+ * returns it pre-clustered, so panning only requests the new edge and
+ * dense metros stay light.  Tiles that leave the viewport (plus a one
+ * tile margin) or belong to another zoom level are evicted with their
+ * markers; tile responses are browser-cacheable, so panning back is cheap.
+ */
 
 (function () {
   "use strict";
 
   let map, infoWindow;
   const API_STATIONS = "/api/charging-stations";
+  const MAX_TILES_PER_VIEW = 64;   // guard against huge viewports at low zoom
+  const KEEP_MARGIN_TILES = 1;     // off-screen ring kept around the viewport
 
   /* ── Bootstrap called by Google Maps callback ─────────────────────────── */
   window.initNewsMap = function () {
@@ -20,6 +30,9 @@
 
     infoWindow = new google.maps.InfoWindow();
 
+    // Load whatever tiles the viewport exposes once panning/zooming settles
+    map.addListener("idle", loadVisibleTiles);
+
     // Auto-locate user
     autoLocate();
 
@@ -40,8 +53,7 @@
     navigator.geolocation.getCurrentPosition(
       (pos) => {
         const { latitude: lat, longitude: lng } = pos.coords;
-        map.setCenter({ lat, lng });
-        loadStations({ lat, lng });
+        map.setCenter({ lat, lng });   // "idle" loads the new viewport
       },
       () => {
         // Silent fallback — default center already set
@@ -64,63 +76,166 @@
         }
         if (statusEl) statusEl.textContent = "";
         map.setCenter(data.center);
-        map.setZoom(12);
-        plotStations(data.stations);
+        map.setZoom(12);             // "idle" loads the new viewport
       })
       .catch(() => {
         if (statusEl) statusEl.textContent = "Could not load stations. Try again.";
       });
   }
 
-  /* ── Load stations by coordinates ────────────────────────────────────── */
-  function loadStations({ lat, lng }) {
-    fetch(`${API_STATIONS}?lat=${lat}&lng=${lng}`)
-      .then((r) => r.json())
-      .then((data) => {
-        if (!data.error) plotStations(data.stations);
-      })
-      .catch(() => {});
+  /* ── Tile math (Web Mercator, 256 px tiles) ──────────────────────────── */
+  function lngToTileX(lng, z) {
+    return Math.floor(((lng + 180) / 360) * Math.pow(2, z));
+  }
+
+  function latToTileY(lat, z) {
+    const rad = (Math.max(Math.min(lat, 85.0511), -85.0511) * Math.PI) / 180;
+    return Math.floor(
+      ((1 - Math.log(Math.tan(rad) + 1 / Math.cos(rad)) / Math.PI) / 2) * Math.pow(2, z)
+    );
+  }
+
+  function tileToLng(x, z) {
+    return (x / Math.pow(2, z)) * 360 - 180;
+  }
+
+  function tileToLat(y, z) {
+    const n = Math.PI - (2 * Math.PI * y) / Math.pow(2, z);
+    return (180 / Math.PI) * Math.atan(Math.sinh(n));
   }
 
-  /* ── Plot markers ────────────────────────────────────────────────────── */
-  let markers = [];
+  /* ── Viewport tile loading ───────────────────────────────────────────── */
+  // tileKey ("z/x/y") → { markers: [...] }
+  const tiles = new Map();
+
+  function tileKey(z, x, y) {
+    const n = Math.pow(2, z);
+    return `${z}/${((x % n) + n) % n}/${y}`;
+  }
+
+  function loadVisibleTiles() {
+    const bounds = map.getBounds();
+    if (!bounds) return;
+    const z = Math.round(map.getZoom());
+    const n = Math.pow(2, z);
+
+    const ne = bounds.getNorthEast();
+    const sw = bounds.getSouthWest();
+    const yMin = latToTileY(ne.lat(), z);
+    const yMax = latToTileY(sw.lat(), z);
+    let xMin = lngToTileX(sw.lng(), z);
+    let xMax = lngToTileX(ne.lng(), z);
+    if (xMax < xMin) xMax += n; // viewport crosses the antimeridian
 
-  function clearMarkers() {
-    markers.forEach((m) => m.setMap(null));
-    markers = [];
+    evictTiles(z, xMin, xMax, yMin, yMax);
+
+    let requested = 0;
+    for (let x = xMin; x <= xMax; x++) {
+      for (let y = yMin; y <= yMax; y++) {
+        if (requested >= MAX_TILES_PER_VIEW) return;
+        const key = tileKey(z, x, y);
+        if (tiles.has(key)) continue;
+        requested++;
+        loadTile(key, z, ((x % n) + n) % n, y);
+      }
+    }
   }
 
-  function plotStations(stations) {
-    clearMarkers();
-    stations.forEach((s) => {
-      const marker = new google.maps.Marker({
-        position: { lat: s.lat, lng: s.lng },
-        map,
-        title: s.name,
-        icon: {
-          path: google.maps.SymbolPath.CIRCLE,
-          scale: 9,
-          fillColor: "#22c55e",
-          fillOpacity: 0.9,
-          strokeColor: "#15803d",
-          strokeWeight: 2,
-        },
+  // Drop tiles outside the viewport plus margin, and every other zoom level
+  function evictTiles(z, xMin, xMax, yMin, yMax) {
+    const m = KEEP_MARGIN_TILES;
+    // Zoomed out far enough that the kept ring spans the world: keep the whole zoom
+    const wholeZoom = xMax - xMin + 2 * m >= Math.pow(2, z);
+    const keep = new Set();
+    if (!wholeZoom) {
+      for (let x = xMin - m; x <= xMax + m; x++) {
+        for (let y = yMin - m; y <= yMax + m; y++) keep.add(tileKey(z, x, y));
+      }
+    }
+    tiles.forEach((tile, key) => {
+      if (wholeZoom ? key.startsWith(z + "/") : keep.has(key)) return;
+      tile.markers.forEach((marker) => {
+        google.maps.event.clearInstanceListeners(marker);
+        marker.setMap(null);
       });
+      tiles.delete(key);
+    });
+  }
+
+  function loadTile(key, z, x, y) {
+    const tile = { markers: [] };
+    tiles.set(key, tile);
 
-      marker.addListener("click", () => {
-        infoWindow.setContent(
-          `<div style="color:#111;font-family:Inter,sans-serif;max-width:200px;">
-            <strong>${s.name}</strong><br/>
-            ${s.address ? s.address + "<br/>" : ""}
-            ${s.city ? s.city + (s.state ? ", " + s.state : "") : ""}
-            <br/><span style="color:#15803d;font-size:12px;">⚡ DC Fast Charge (Level 3)</span>
-          </div>`
-        );
-        infoWindow.open(map, marker);
+    const bbox = [tileToLat(y + 1, z), tileToLng(x, z), tileToLat(y, z), tileToLng(x + 1, z)]
+      .map((v) => v.toFixed(6))
+      .join(",");
+    fetch(`${API_STATIONS}?bbox=${bbox}&zoom=${z}`)
+      .then((r) => r.json())
+      .then((data) => {
+        if (tiles.get(key) !== tile) return; // evicted while in flight
+        if (data.error) {
+          tiles.delete(key); // retry on the next pan
+          return;
+        }
+        data.stations.forEach((s) => tile.markers.push(stationMarker(s, map)));
+        data.clusters.forEach((c) => tile.markers.push(clusterMarker(c, map)));
+      })
+      .catch(() => {
+        if (tiles.get(key) === tile) tiles.delete(key);
       });
+  }
+
+  /* ── Markers ─────────────────────────────────────────────────────────── */
+  function stationMarker(s, onMap) {
+    const marker = new google.maps.Marker({
+      position: { lat: s.lat, lng: s.lng },
+      map: onMap,
+      title: s.name,
+      icon: {
+        path: google.maps.SymbolPath.CIRCLE,
+        scale: 9,
+        fillColor: "#22c55e",
+        fillOpacity: 0.9,
+        strokeColor: "#15803d",
+        strokeWeight: 2,
+      },
+    });
+
+    marker.addListener("click", () => {
+      infoWindow.setContent(
+        `<div style="color:#111;font-family:Inter,sans-serif;max-width:200px;">
+          <strong>${s.name}</strong><br/>
+          ${s.address ? s.address + "<br/>" : ""}
+          ${s.city ? s.city + (s.state ? ", " + s.state : "") : ""}
+          <br/><span style="color:#15803d;font-size:12px;">⚡ DC Fast Charge (Level 3)</span>
+        </div>`
+      );
+      infoWindow.open(map, marker);
+    });
+    return marker;
+  }
+
+  function clusterMarker(c, onMap) {
+    const marker = new google.maps.Marker({
+      position: { lat: c.lat, lng: c.lng },
+      map: onMap,
+      title: `${c.count} stations`,
+      label: { text: String(c.count), color: "#ffffff", fontSize: "11px", fontWeight: "700" },
+      icon: {
+        path: google.maps.SymbolPath.CIRCLE,
+        scale: Math.min(12 + Math.log10(c.count) * 6, 26),
+        fillColor: "#15803d",
+        fillOpacity: 0.85,
+        strokeColor: "#22c55e",
+        strokeWeight: 2,
+      },
+    });
 
-      markers.push(marker);
+    marker.addListener("click", () => {
+      map.setCenter(marker.getPosition());
+      map.setZoom(map.getZoom() + 2);
     });
+    return marker;
   }
 
   /* ── Dark map style ──────────────────────────────────────────────────── */
@@ -0,0 +1,27 @@
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import config
+
+
+@pytest.fixture(autouse=True)
+def isolated_storage(tmp_path, monkeypatch):
+    """Point the database and every instance/ store at tmp_path.
+
+    The engine is built from the config inside create_app, so this has to
+    happen before it runs; setting SQLALCHEMY_DATABASE_URI on the app
+    afterwards leaves the tests on instance/leads.db.
+    """
+    db_url = f"sqlite:///{tmp_path / 'leads.db'}"
+    monkeypatch.setenv("DATABASE_URL", db_url)      # for subprocesses
+    monkeypatch.setattr(config.Config, "SQLALCHEMY_DATABASE_URI", db_url)
+    for key, name in (("LEAD_SPOOL_PATH", "lead_spool.db"),
+                      ("MAIL_OUTBOX_PATH", "mail_outbox.db"),
+                      ("CHAT_CACHE_PATH", "chat_cache.db"),
+                      ("GEO_CACHE_PATH", "geo_cache.db"),
+                      ("STATION_INDEX_PATH", "stations.db")):
+        monkeypatch.setattr(config.Config, key, str(tmp_path / name), raising=False)
+    return tmp_path
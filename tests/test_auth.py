@@ -0,0 +1,247 @@
+import pytest
+import smtplib
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app import create_app
+from extensions import db as _db, mail_outbox
+from services import mail_outbox as outbox_module
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app("development")
+    app.config["TESTING"] = True
+    app.config["MAIL_OUTBOX_ENABLED"] = True
+    app.config["MAIL_OUTBOX_AUTOSTART"] = False
+    app.config["MAIL_OUTBOX_PATH"] = str(tmp_path / "mail_outbox.db")
+    app.config["VERIFICATION_PURGE_INTERVAL"] = 0
+    with app.app_context():
+        _db.create_all()
+        yield app
+        _db.drop_all()
+    mail_outbox._close_session()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+class FakeSMTP:
+    opened = 0
+
+    def __init__(self, refuse=None):
+        FakeSMTP.opened += 1
+        self.sent = []
+        self.refuse = refuse or {}
+
+    def noop(self):
+        return 250, b"OK"
+
+    def sendmail(self, sender, recipients, message):
+        if "bad@x.com" in recipients:
+            message.encode("ascii")
+        for rcpt in recipients:
+            if rcpt in self.refuse:
+                code = self.refuse[rcpt]
+                raise smtplib.SMTPRecipientsRefused({rcpt: (code, b"no")})
+        self.sent.append((sender, recipients, message))
+
+    def quit(self):
+        pass
+
+
+@pytest.fixture
+def fake_smtp(monkeypatch):
+    FakeSMTP.opened = 0
+    sessions = []
+
+    def open_fake(config, timeout=10, **kwargs):
+        sessions.append(FakeSMTP(refuse={"bounce@x.com": 550, "busy@x.com": 451}))
+        return sessions[-1]
+
+    monkeypatch.setattr(outbox_module, "open_smtp", open_fake)
+    return sessions
+
+
+def test_register_only_enqueues_verification_email(client, fake_smtp):
+    res = client.post("/auth/register", data={
+        "full_name": "Ada", "email": "ada@x.com",
+        "password": "pw", "confirm_password": "pw",
+    })
+    assert res.status_code == 302
+    assert res.headers["Location"].endswith("/auth/verify")
+    assert fake_smtp == []
+    assert client.get("/auth/outbox").get_json()["pending"] == 1
+
+    assert mail_outbox.dispatch_once() == 1
+    (sender, recipients, message), = fake_smtp[0].sent
+    assert recipients == ["ada@x.com"]
+    assert "verification code" in message
+
+    stats = client.get("/auth/outbox").get_json()
+    assert stats["pending"] == 0
+    assert stats["latency_seconds"]["count"] == 1
+
+
+def test_dispatcher_reuses_connection_and_retries(app, fake_smtp):
+    for rcpt in ("a@x.com", "bounce@x.com", "busy@x.com"):
+        mail_outbox.enqueue("info@prezent.energy", [rcpt], "Subject: hi\n\nhello")
+
+    assert mail_outbox.dispatch_once() == 1
+    stats = mail_outbox.stats()
+    assert stats["failed"] == 1          # 550: permanent
+    assert stats["pending"] == 1         # 451: retried later, not yet due
+
+    mail_outbox.enqueue("info@prezent.energy", ["b@x.com"], "Subject: hi\n\nagain")
+    assert mail_outbox.dispatch_once() == 1
+    assert FakeSMTP.opened == 1
+    assert [r for s in fake_smtp for _, r, _ in s.sent] == [["a@x.com"], ["b@x.com"]]
+
+
+def test_unexpected_send_error_keeps_batch_deliveries(app, fake_smtp):
+    for rcpt in ("a@x.com", "bad@x.com", "b@x.com"):
+        mail_outbox.enqueue("info@prezent.energy", [rcpt], "Subject: hi\n\nh\u00e9llo")
+
+    assert mail_outbox.dispatch_once() == 2
+    stats = mail_outbox.stats()
+    assert stats == {**stats, "pending": 0, "failed": 1}
+    assert "last_error" not in stats
+    assert mail_outbox.dispatch_once() == 0
+
+
+def test_claim_skips_rows_out_of_attempts(app, fake_smtp):
+    mail_outbox.enqueue("info@prezent.energy", ["a@x.com"], "Subject: hi\n\nhello")
+    conn = mail_outbox._connect()
+    # Claimed for the last time by a worker that died before recording the result
+    conn.execute("UPDATE outbox SET attempts = ?, claimed_by = 'gone', claimed_at = 0",
+                 (outbox_module.MAX_ATTEMPTS,))
+    conn.close()
+
+    assert mail_outbox.dispatch_once() == 0
+    assert fake_smtp == []
+    assert mail_outbox.stats()["failed"] == 1
+
+
+def _register(client, email="ada@x.com"):
+    return client.post("/auth/register", data={
+        "full_name": "Ada", "email": email, "password": "pw", "confirm_password": "pw",
+    })
+
+
+def test_purge_expired_codes(app):
+    from datetime import datetime, timedelta
+    from models import User, VerificationCode
+    from services.verification_codes import purge_expired_codes
+
+    user = User(full_name="Ada", email="ada@x.com", password_hash="x")
+    _db.session.add(user)
+    _db.session.commit()
+    now = datetime.utcnow()
+    for minutes, used in ((-30, False), (-20, True), (5, True), (8, False)):
+        _db.session.add(VerificationCode(user_id=user.id, code="123456", purpose="login",
+                                         expires_at=now + timedelta(minutes=minutes), used=used))
+    _db.session.commit()
+
+    assert purge_expired_codes(now, batch_size=1) == 2
+    assert sorted(vc.expires_at > now for vc in VerificationCode.query.all()) == [True, True]
+
+
+def test_signed_codes_skip_the_table(app, client, fake_smtp):
+    from models import User, VerificationCode
+    from services.verification_codes import signed_code
+
+    app.config["VERIFICATION_CODES_SIGNED"] = True
+    _register(client)
+    user = User.query.filter_by(email="ada@x.com").one()
+    assert VerificationCode.query.count() == 0
+
+    code = signed_code(app.config["SECRET_KEY"], user.id, "register")
+    wrong = f"{(int(code) + 1) % 1_000_000:06d}"
+    res = client.post("/auth/verify", data={"code": wrong})
+    assert res.headers["Location"].endswith("/auth/verify")
+
+    res = client.post("/auth/verify", data={"code": code})
+    assert res.headers["Location"].endswith("/")
+    assert _db.session.get(User, user.id).is_verified
+
+
+def test_signed_in_requests_skip_user_query(app, client, fake_smtp):
+    from sqlalchemy import event
+    from models import User, VerificationCode
+
+    user = User(full_name="Ada", email="ada@x.com", password_hash="x", is_verified=True)
+    _db.session.add(user)
+    _db.session.commit()
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(user.id)
+        sess["_fresh"] = True
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(_db.engine, "before_cursor_execute", listener)
+    try:
+        client.get("/auth/account")
+        statements.clear()
+        assert b'value="Ada"' in client.get("/auth/account").data
+        assert not [s for s in statements if "FROM users" in s]
+    finally:
+        event.remove(_db.engine, "before_cursor_execute", listener)
+
+    # A verified profile change is visible straight away
+    client.post("/auth/account", data={"full_name": "Ada L"})
+    code = VerificationCode.query.filter_by(user_id=user.id, purpose="settings").one().code
+    client.post("/auth/verify", data={"code": code})
+    assert b'value="Ada L"' in client.get("/auth/account").data
+
+
+def _die_once(marker: str) -> tuple[str, float]:
+    # Runs in a pool process: the first call kills it, as the OOM killer would
+    if not os.path.exists(marker):
+        open(marker, "w").close()
+        os._exit(1)
+    return "hashed", 0.001
+
+
+def test_password_pool_recovers_when_broken(app, tmp_path):
+    from extensions import password_hasher
+
+    app.config.update(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_METHOD="pbkdf2:sha256:1000",
+                      PASSWORD_HASH_DEADLINE=30)
+    before = password_hasher.stats()["pool_restarts"]
+
+    # A process dies mid-hash: the call is retried on a fresh pool
+    assert password_hasher._run(_die_once, str(tmp_path / "died")) == "hashed"
+    # The pool is already broken when the next hash is submitted
+    password_hasher._pool().submit(os._exit, 1).exception()
+    assert password_hasher.check(password_hasher.generate("pw"), "pw")
+
+    stats = password_hasher.stats()
+    assert stats["pool_restarts"] - before == 2 and stats["in_flight"] == 0
+
+
+def test_password_hashing_in_pool(app, client, fake_smtp):
+    from extensions import password_hasher
+    from services.password_hasher import HasherBusy
+
+    app.config.update(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_METHOD="pbkdf2:sha256:1000")
+    before = password_hasher.stats()
+    _register(client)
+    res = client.post("/auth/login", data={"email": "ada@x.com", "password": "pw"})
+    assert res.headers["Location"].endswith("/auth/verify")
+    res = client.post("/auth/login", data={"email": "ada@x.com", "password": "nope"})
+    assert res.headers["Location"].endswith("/auth/login")
+
+    stats = client.get("/auth/hasher").get_json()
+    assert stats["hashed"] - before["hashed"] == 3 and stats["in_flight"] == 0
+    assert stats["hash_ms"]["avg"] > 0
+
+    app.config["PASSWORD_HASH_QUEUE"] = 0
+    with pytest.raises(HasherBusy):
+        password_hasher.generate("pw")
+    res = client.post("/auth/login", data={"email": "ada@x.com", "password": "pw"})
+    assert res.headers["Location"].endswith("/auth/login")
+    assert client.get("/auth/hasher").get_json()["rejected"] - before["rejected"] == 2
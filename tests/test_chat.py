@@ -0,0 +1,185 @@
+import pytest
+import json
+import sys
+import os
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app import create_app
+from extensions import db as _db
+from agents import chatbot, news_agent
+from agents.response_cache import ResponseCache, cache_key
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app("development")
+    app.config["TESTING"] = True
+    app.config["CHAT_CACHE_PATH"] = str(tmp_path / "chat_cache.db")
+    with app.app_context():
+        _db.create_all()
+        yield app
+        _db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+class FakeAnthropic:
+    def __init__(self, reply="Pricing starts at $X/month."):
+        self.calls = []
+        self.reply = reply
+        self.messages = SimpleNamespace(create=self._create, stream=self._stream)
+
+    usage = SimpleNamespace(input_tokens=12, cache_read_input_tokens=3000,
+                            cache_creation_input_tokens=0, output_tokens=40)
+
+    def _create(self, **kwargs):
+        self.calls.append(kwargs)
+        return SimpleNamespace(content=[SimpleNamespace(text=self.reply)], usage=self.usage)
+
+    @contextmanager
+    def _stream(self, **kwargs):
+        self.calls.append(kwargs)
+        words = self.reply.split(" ")
+        final = SimpleNamespace(usage=self.usage)
+        yield SimpleNamespace(
+            text_stream=iter([w + " " for w in words[:-1]] + words[-1:]),
+            get_final_message=lambda: final,
+        )
+
+
+@pytest.fixture
+def fake_client(monkeypatch):
+    fake = FakeAnthropic()
+    monkeypatch.setattr(chatbot, "get_client", lambda api_key: fake)
+    monkeypatch.setattr(news_agent, "get_client", lambda api_key: fake)
+    return fake
+
+
+def test_cache_key_normalises_conversation():
+    a = cache_key("m", "sys", [{"role": "user", "content": "What does it cost?"}])
+    b = cache_key("m", "sys", [{"role": "user", "content": "  what DOES it   cost "}])
+    c = cache_key("m", "other system", [{"role": "user", "content": "What does it cost?"}])
+    assert a == b
+    assert a != c
+
+
+def test_response_cache_ttl_and_lru(tmp_path):
+    cache = ResponseCache(str(tmp_path / "c.db"), ttl=60, max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"      # touch "a" so "b" is least recently used
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+
+    expired = ResponseCache(cache.path, ttl=0, max_entries=2)
+    assert expired.get("a") is None
+
+
+def test_chat_repeated_opening_served_from_cache(client, fake_client):
+    body = json.dumps({"messages": [{"role": "user", "content": "What does it cost?"}]})
+    first = client.post("/api/chat", data=body, content_type="application/json")
+    second = client.post(
+        "/api/chat",
+        data=json.dumps({"messages": [{"role": "user", "content": "what does it cost"}]}),
+        content_type="application/json",
+    )
+    assert first.get_json()["reply"] == second.get_json()["reply"]
+    assert len(fake_client.calls) == 1
+
+
+def test_chat_long_conversation_not_cached(client, fake_client):
+    messages = [
+        {"role": "user", "content": "hi"},
+        {"role": "assistant", "content": "hello"},
+        {"role": "user", "content": "pricing?"},
+        {"role": "assistant", "content": "..."},
+        {"role": "user", "content": "and V2G?"},
+    ]
+    body = json.dumps({"messages": messages})
+    client.post("/api/chat", data=body, content_type="application/json")
+    client.post("/api/chat", data=body, content_type="application/json")
+    assert len(fake_client.calls) == 2
+
+
+def _sse_deltas(res):
+    deltas, events = [], []
+    for frame in res.data.decode().split("\n\n"):
+        lines = dict(
+            line.split(": ", 1) for line in frame.splitlines() if not line.startswith(":")
+        )
+        if "event" in lines:
+            events.append(lines["event"])
+        elif "data" in lines:
+            deltas.append(json.loads(lines["data"])["delta"])
+    return deltas, events
+
+
+def test_chat_streams_sse(client, fake_client):
+    body = json.dumps({"messages": [{"role": "user", "content": "hi"}], "stream": True})
+    res = client.post("/api/chat", data=body, content_type="application/json")
+    assert res.mimetype == "text/event-stream"
+    deltas, events = _sse_deltas(res)
+    assert "".join(deltas) == fake_client.reply
+    assert len(deltas) > 1
+    assert events == ["done"]
+
+
+def test_news_query_streams_on_accept_header(client, fake_client):
+    res = client.post(
+        "/api/news-query",
+        data=json.dumps({"query": "LCFS update?"}),
+        content_type="application/json",
+        headers={"Accept": "text/event-stream"},
+    )
+    deltas, events = _sse_deltas(res)
+    assert "".join(deltas) == fake_client.reply
+    assert events == ["done"]
+
+
+def test_stream_error_event(client, monkeypatch):
+    def boom(api_key):
+        raise RuntimeError("down")
+    monkeypatch.setattr(chatbot, "get_client", boom)
+    body = json.dumps({"messages": [{"role": "user", "content": "hi"}], "stream": True})
+    res = client.post("/api/chat", data=body, content_type="application/json")
+    _, events = _sse_deltas(res)
+    assert events == ["error"]
+
+
+def test_fit_to_budget_drops_oldest_turns(app):
+    from agents.history import OMITTED_NOTE, fit_to_budget
+
+    messages = [
+        {"role": "user", "content": "a" * 400},
+        {"role": "assistant", "content": "b" * 400},
+        {"role": "user", "content": "c" * 400},
+        {"role": "assistant", "content": "d" * 400},
+        {"role": "user", "content": "latest"},
+    ]
+    assert fit_to_budget(messages, budget=10_000) == messages
+
+    trimmed = fit_to_budget(messages, budget=250)
+    assert trimmed[0]["role"] == "user"
+    assert trimmed[0]["content"] == OMITTED_NOTE + "c" * 400
+    assert trimmed[-1]["content"] == "latest"
+    assert len(trimmed) == 3
+
+
+def test_chat_uses_prompt_caching_and_records_usage(client, fake_client):
+    from models import LlmUsage
+
+    body = json.dumps({"messages": [{"role": "user", "content": "hello there"}]})
+    client.post("/api/chat", data=body, content_type="application/json")
+
+    system = fake_client.calls[0]["system"]
+    assert system[0]["cache_control"] == {"type": "ephemeral"}
+    usage = LlmUsage.query.one()
+    assert (usage.agent, usage.cache_read_tokens, usage.output_tokens) == ("chatbot", 3000, 40)
@@ -0,0 +1,215 @@
+import pytest
+import re
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app import create_app
+from extensions import db as _db
+from routes import ev_users as ev_users_module
+
+
+@pytest.fixture
+def app():
+    app = create_app("development")
+    app.config["TESTING"] = True
+    with app.app_context():
+        _db.create_all()
+        yield app
+        _db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    from models import User
+
+    user = User(full_name="Owner", email="owner@x.com", password_hash="x", is_verified=True)
+    other = User(full_name="Other", email="other@x.com", password_hash="x", is_verified=True)
+    _db.session.add_all([user, other])
+    _db.session.commit()
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(user.id)
+        sess["_fresh"] = True
+    client.user_id, client.other_id = user.id, other.id
+    return client
+
+
+def _fleet(client, names, owner=None):
+    from models import EVUser
+
+    for i, name in enumerate(names):
+        _db.session.add(EVUser(
+            user_id=owner or client.user_id, full_name=name, email=f"{i}@x.com",
+            phone="555", car_make="Tesla" if i % 2 else "Rivian", car_model="X",
+            license_plate=f"PLT{i:03d}",
+        ))
+    _db.session.commit()
+
+
+def _names(res):
+    return re.findall(r'font-medium text-white">([^<]+)<', res.get_data(as_text=True))
+
+
+def _link(res, label):
+    match = re.search(r'href="([^"]+)"[^>]*>' + label, res.get_data(as_text=True))
+    return match.group(1).replace("&amp;", "&") if match else None
+
+
+def test_dashboard_pages_forward_and_back(client, monkeypatch):
+    monkeypatch.setattr(ev_users_module, "PAGE_SIZE", 2)
+    # Duplicate names: the id tie-breaker keeps pages from skipping or repeating rows
+    _fleet(client, ["Cy", "Ann", "Bo", "Bo", "Di"])
+    _fleet(client, ["Zed"], owner=client.other_id)
+
+    res = client.get("/settings/ev-users")
+    assert _names(res) == ["Ann", "Bo"]
+    assert "5 vehicles registered" in res.get_data(as_text=True)
+    assert _link(res, "&larr; Previous") is None
+
+    page2 = client.get(_link(res, "Next"))
+    assert _names(page2) == ["Bo", "Cy"]
+    page3 = client.get(_link(page2, "Next"))
+    assert _names(page3) == ["Di"]
+    assert _link(page3, "Next") is None
+
+    assert _names(client.get(_link(page3, "&larr; Previous"))) == ["Bo", "Cy"]
+    back = client.get(_link(page2, "&larr; Previous"))
+    assert _names(back) == ["Ann", "Bo"]
+    assert _link(back, "&larr; Previous") is None
+
+    res = client.get("/settings/ev-users?sort=full_name&dir=desc")
+    assert _names(res) == ["Di", "Cy"]
+    assert _names(client.get(_link(res, "Next"))) == ["Bo", "Bo"]
+
+
+def test_dashboard_prefix_search(client):
+    _fleet(client, ["Ann", "Annette", "Bo", "50%_off"])
+
+    res = client.get("/settings/ev-users?q=ann")
+    assert _names(res) == ["Ann", "Annette"]
+    assert "2 vehicles matching" in res.get_data(as_text=True)
+    assert _names(client.get("/settings/ev-users?q=Tes")) == ["50%_off", "Annette"]
+    assert _names(client.get("/settings/ev-users?q=PLT002")) == ["Bo"]
+    # LIKE wildcards in the query are matched literally
+    assert _names(client.get("/settings/ev-users?q=50%25_")) == ["50%_off"]
+    assert _names(client.get("/settings/ev-users?q=_")) == []
+
+
+def test_dashboard_ignores_bad_cursor(client):
+    _fleet(client, ["Ann"])
+    assert _names(client.get("/settings/ev-users?after=!!not-a-cursor")) == ["Ann"]
+
+
+def _upload(client, text):
+    import io
+
+    return client.post("/settings/ev-users/import", data={
+        "roster": (io.BytesIO(text.encode()), "fleet.csv"),
+    }, content_type="multipart/form-data", follow_redirects=True)
+
+
+def test_import_roster_batches_and_dedupes(client, monkeypatch):
+    from models import EVUser
+
+    monkeypatch.setattr(ev_users_module, "IMPORT_BATCH_SIZE", 2)
+    _fleet(client, ["Ann"])                                  # owns PLT000
+    _fleet(client, ["Zed"], owner=client.other_id)           # another owner's PLT000
+    rows = [
+        "full_name,email,phone,car_make,car_model,license_plate",
+        "Bo,b@x.com,555,Tesla,Y,PLT000",                     # already in the fleet
+        "Cy,c@x.com,555,Tesla,Y,NEW1",
+        "Di,d@x.com,,Tesla,Y,NEW2",                          # missing phone
+        "Ed,e@x.com,555,Rivian,R1T,NEW1",                    # repeated in the file
+        "Flo,f@x.com,555,Rivian,R1S, NEW3 ",
+    ]
+    res = _upload(client, "\n".join(rows) + "\n")
+    body = res.get_data(as_text=True)
+    assert "Imported 2 vehicles; skipped 2 duplicate plates and 1 invalid row." in body
+    assert "line 4: all fields are required" in body
+
+    plates = sorted(e.license_plate for e in EVUser.query.filter_by(user_id=client.user_id))
+    assert plates == ["NEW1", "NEW3", "PLT000"]
+
+
+def test_import_roster_requires_columns(client):
+    res = _upload(client, "full_name,email\nBo,b@x.com\n")
+    assert "CSV is missing column(s): phone, car_make, car_model, license_plate." in \
+        res.get_data(as_text=True)
+
+
+def test_export_roster_streams_own_fleet(client, monkeypatch):
+    import csv
+
+    monkeypatch.setattr(ev_users_module, "EXPORT_CHUNK_SIZE", 2)
+    _fleet(client, ["Cy", "Ann", "Bo"])
+    _fleet(client, ["Zed"], owner=client.other_id)
+
+    res = client.get("/settings/ev-users/export")
+    assert res.mimetype == "text/csv"
+    rows = list(csv.DictReader(res.get_data(as_text=True).splitlines()))
+    assert [r["full_name"] for r in rows] == ["Ann", "Bo", "Cy"]
+    assert rows[0]["license_plate"] == "PLT001"
+
+    # The export imports back cleanly: every plate is a duplicate
+    res = _upload(client, res.get_data(as_text=True))
+    assert "Imported 0 vehicles; skipped 3 duplicate plates" in res.get_data(as_text=True)
+
+
+def _batch(client, *operations):
+    return client.post("/settings/ev-users/batch", json={"operations": list(operations)})
+
+
+def test_batch_api_applies_in_one_transaction(client):
+    from models import EVUser
+
+    _fleet(client, ["Ann", "Bo", "Cy"])
+    _fleet(client, ["Zed"], owner=client.other_id)
+    items = {i["full_name"]: i for i in client.get("/settings/ev-users/api").get_json()["items"]}
+    assert set(items) == {"Ann", "Bo", "Cy"}
+    zed = EVUser.query.filter_by(user_id=client.other_id).one()
+
+    fields = {"full_name": "Di", "email": "d@x.com", "phone": "555",
+              "car_make": "Lucid", "car_model": "Air", "license_plate": "DI1"}
+    res = _batch(
+        client,
+        {"op": "create", "fields": fields},
+        {"op": "update", "id": items["Ann"]["id"], "etag": items["Ann"]["etag"],
+         "fields": {"car_model": " R1S "}},
+        {"op": "update", "id": items["Bo"]["id"], "fields": {"car_model": "Y"}},
+        {"op": "delete", "id": items["Cy"]["id"], "etag": items["Cy"]["etag"]},
+    )
+    assert res.status_code == 200
+    results = res.get_json()["results"]
+    assert [r["status"] for r in results] == [201, 200, 200, 204]
+
+    after = {i["full_name"]: i for i in client.get("/settings/ev-users/api").get_json()["items"]}
+    assert set(after) == {"Ann", "Bo", "Di"}
+    assert after["Ann"]["car_model"] == "R1S"
+    assert after["Ann"]["etag"] == results[1]["etag"] != items["Ann"]["etag"]
+    assert after["Di"]["etag"] == results[0]["etag"]
+
+    # A stale etag, another owner's record or a bad field rejects the whole batch
+    res = _batch(
+        client,
+        {"op": "delete", "id": after["Bo"]["id"]},
+        {"op": "update", "id": items["Ann"]["id"], "etag": items["Ann"]["etag"],
+         "fields": {"car_model": "X"}},
+        {"op": "delete", "id": zed.id},
+        {"op": "update", "id": after["Di"]["id"], "fields": {"phone": " "}},
+    )
+    assert res.status_code == 409
+    assert [r["status"] for r in res.get_json()["results"]] == [424, 412, 404, 400]
+    assert EVUser.query.filter_by(user_id=client.user_id).count() == 3
+    assert _db.session.get(EVUser, zed.id) is not None
+
+    res = _batch(client, {"op": "delete", "id": items["Ann"]["id"], "etag": items["Ann"]["etag"]})
+    assert res.status_code == 412
+
+
+def test_batch_api_rejects_bad_body(client):
+    assert _batch(client).status_code == 400
+    assert client.post("/settings/ev-users/batch", json=[1]).status_code == 400
+    res = _batch(client, {"op": "rename", "id": 1})
+    assert res.get_json()["results"][0]["error"] == "op must be create, update or delete"
@@ -13,7 +13,6 @@ from extensions import db as _db
 def app():
     app = create_app("development")
     app.config["TESTING"] = True
-    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
     with app.app_context():
         _db.create_all()
         yield app
@@ -89,3 +88,223 @@ def test_index_page(client):
     assert res.status_code == 200
     assert b"Prezent" in res.data
     assert b"VoltBot" in res.data
+
+
+def _post_leads(client, n):
+    for i in range(n):
+        client.post(
+            "/api/leads",
+            data=json.dumps({"full_name": f"Lead {i}", "email": f"lead{i}@x.com"}),
+            content_type="application/json",
+        )
+
+
+def test_list_leads_keyset_pagination(client):
+    _post_leads(client, 5)
+
+    seen = []
+    res = client.get("/api/leads?limit=2")
+    while True:
+        assert res.status_code == 200
+        page = res.get_json()
+        assert len(page) <= 2
+        seen.extend(l["id"] for l in page)
+        cursor = res.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+        res = client.get(f"/api/leads?limit=2&after={cursor}")
+
+    assert sorted(seen, reverse=True) == seen
+    assert len(set(seen)) == 5
+
+
+def test_list_leads_pages_through_null_created_at(client):
+    from models import Lead
+
+    _post_leads(client, 5)
+    ids = sorted(l.id for l in Lead.query.all())
+    # e.g. rows loaded by hand, without the ORM default
+    _db.session.execute(_db.update(Lead).where(Lead.id.in_(ids[:3])).values(created_at=None))
+    _db.session.commit()
+
+    seen, cursors = [], []
+    res = client.get("/api/leads?limit=2")
+    while True:
+        assert res.status_code == 200
+        seen.extend(l["id"] for l in res.get_json())
+        cursor = res.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+        cursors.append(cursor)
+        res = client.get(f"/api/leads?limit=2&after={cursor}")
+    assert seen == [ids[4], ids[3], ids[2], ids[1], ids[0]]
+
+    # The second cursor ends on a NULL row; the export resumes from it too
+    lines = client.get(f"/api/leads?format=ndjson&after={cursors[1]}").data.splitlines()
+    assert [json.loads(l)["id"] for l in lines] == [ids[0]]
+
+
+def test_list_leads_invalid_cursor(client):
+    res = client.get("/api/leads?after=not-a-cursor")
+    assert res.status_code == 400
+
+
+def test_export_leads_ndjson(client):
+    _post_leads(client, 3)
+    res = client.get("/api/leads?format=ndjson")
+    assert res.status_code == 200
+    assert res.mimetype == "application/x-ndjson"
+    rows = [json.loads(line) for line in res.data.decode().splitlines()]
+    assert [r["email"] for r in rows] == ["lead2@x.com", "lead1@x.com", "lead0@x.com"]
+
+
+def test_export_leads_csv(client):
+    _post_leads(client, 2)
+    res = client.get("/api/leads?format=csv")
+    assert res.status_code == 200
+    lines = res.data.decode().splitlines()
+    assert lines[0].startswith("id,full_name,email")
+    assert len(lines) == 3
+
+
+def test_bulk_leads_json(client):
+    payload = [
+        {"full_name": "A One", "email": "A@X.com", "primary_interests": ["VPP", "CaaS"]},
+        {"full_name": "No Email"},
+        {"full_name": "B Two", "email": "b@x.com", "phone": ""},
+    ]
+    res = client.post("/api/leads/bulk", data=json.dumps(payload), content_type="application/json")
+    assert res.status_code == 200
+    report = res.get_json()
+    assert report["accepted"] == 2
+    assert report["rejected"] == 1
+    assert [r["status"] for r in report["results"]] == ["accepted", "rejected", "accepted"]
+
+    leads = {l["email"]: l for l in client.get("/api/leads").get_json()}
+    assert leads["a@x.com"]["primary_interests"] == "VPP, CaaS"
+    assert leads["b@x.com"]["phone"] is None
+
+
+def test_bulk_leads_ndjson(client):
+    body = '{"full_name": "A", "email": "a@x.com"}\n{not json}\n{"full_name": "B", "email": "b@x.com"}\n'
+    res = client.post("/api/leads/bulk", data=body, content_type="application/x-ndjson")
+    report = res.get_json()
+    assert report["accepted"] == 2
+    assert report["results"][1] == {"row": 2, "status": "rejected", "error": "invalid JSON"}
+
+
+def test_bulk_leads_csv(client):
+    body = "full_name,email,company_name\nCsv Lead,csv@x.com,Acme\n,missing@x.com,\n"
+    res = client.post("/api/leads/bulk", data=body, content_type="text/csv")
+    report = res.get_json()
+    assert report["accepted"] == 1
+    assert report["rejected"] == 1
+    assert client.get("/api/leads").get_json()[0]["company_name"] == "Acme"
+
+
+def test_bulk_leads_rejects_non_array(client):
+    res = client.post("/api/leads/bulk", data=json.dumps({"full_name": "x"}), content_type="application/json")
+    assert res.status_code == 400
+
+
+def test_submit_lead_spooled(app, client, tmp_path):
+    from extensions import lead_spool
+
+    app.config["LEAD_SPOOL_ENABLED"] = True
+    app.config["LEAD_SPOOL_AUTOSTART"] = False
+    app.config["LEAD_SPOOL_PATH"] = str(tmp_path / "lead_spool.db")
+
+    res = client.post(
+        "/api/leads",
+        data=json.dumps({"full_name": "Spooled", "email": "Spool@X.com"}),
+        content_type="application/json",
+    )
+    assert res.status_code == 202
+    assert res.get_json()["queued"] is True
+    assert client.get("/api/leads/spool").get_json()["pending"] == 1
+    assert client.get("/api/leads").get_json() == []
+
+    assert lead_spool.drain_once() == 1
+    assert client.get("/api/leads/spool").get_json()["pending"] == 0
+    leads = client.get("/api/leads").get_json()
+    assert [l["email"] for l in leads] == ["spool@x.com"]
+
+
+def test_spool_replay_skips_committed_rows(app, tmp_path):
+    import sqlite3
+    from extensions import lead_spool
+
+    app.config["LEAD_SPOOL_ENABLED"] = True
+    app.config["LEAD_SPOOL_AUTOSTART"] = False
+    app.config["LEAD_SPOOL_PATH"] = str(tmp_path / "lead_spool.db")
+
+    lead_spool.enqueue({"full_name": "Crash", "email": "crash@x.com"})
+    conn = sqlite3.connect(app.config["LEAD_SPOOL_PATH"])
+    payload = conn.execute("SELECT payload FROM spool").fetchone()[0]
+    assert lead_spool.drain_once() == 1
+
+    # Simulate a worker that committed to `leads` but died before deleting
+    conn.execute("INSERT INTO spool (payload, queued_at) VALUES (?, 0)", (payload,))
+    conn.commit()
+    conn.close()
+
+    assert lead_spool.drain_once() == 1
+    assert _db.session.execute(_db.text("SELECT COUNT(*) FROM leads")).scalar() == 1
+
+
+def test_spool_keeps_repeat_submissions(app, tmp_path):
+    from datetime import datetime
+    from extensions import lead_spool
+
+    app.config["LEAD_SPOOL_ENABLED"] = True
+    app.config["LEAD_SPOOL_AUTOSTART"] = False
+    app.config["LEAD_SPOOL_PATH"] = str(tmp_path / "lead_spool.db")
+
+    # Same email, same second: two real submissions, not a replay
+    when = datetime(2026, 1, 1, 12, 0, 0)
+    for name in ("First", "Second"):
+        lead_spool.enqueue({"full_name": name, "email": "twice@x.com", "created_at": when})
+    assert lead_spool.drain_once() == 2
+    assert _db.session.execute(_db.text("SELECT COUNT(*) FROM leads")).scalar() == 2
+
+
+def test_spool_rejects_too_long_before_queueing(app, client, tmp_path):
+    app.config["LEAD_SPOOL_ENABLED"] = True
+    app.config["LEAD_SPOOL_AUTOSTART"] = False
+    app.config["LEAD_SPOOL_PATH"] = str(tmp_path / "lead_spool.db")
+
+    res = client.post("/api/leads", data=json.dumps({"full_name": "x" * 121, "email": "a@x.com"}),
+                      content_type="application/json")
+    assert res.status_code == 400
+    assert res.get_json()["error"] == "full_name exceeds 120 characters"
+    assert client.get("/api/leads/spool").get_json()["pending"] == 0
+
+
+def test_spool_bad_row_does_not_block_later_rows(app, tmp_path):
+    from extensions import lead_spool
+    from services import lead_spool as spool_module
+
+    app.config["LEAD_SPOOL_ENABLED"] = True
+    app.config["LEAD_SPOOL_AUTOSTART"] = False
+    app.config["LEAD_SPOOL_PATH"] = str(tmp_path / "lead_spool.db")
+
+    lead_spool.enqueue({"full_name": "Before", "email": "before@x.com"})
+    lead_spool.enqueue({"full_name": None, "email": "bad@x.com"})        # NOT NULL violation
+    lead_spool.enqueue({"full_name": "After", "email": "after@x.com"})
+
+    assert lead_spool.drain_once() == 2
+    emails = _db.session.scalars(_db.text("SELECT email FROM leads ORDER BY id")).all()
+    assert emails == ["before@x.com", "after@x.com"]
+    backlog = lead_spool.backlog()
+    assert (backlog["pending"], backlog["failed"], backlog["max_attempts"]) == (1, 0, 1)
+    assert "NOT NULL" in backlog["last_error"] and "bad@x.com" not in backlog["last_error"]
+
+    # Retried until out of attempts, then parked as failed
+    for _ in range(spool_module.MAX_ATTEMPTS - 1):
+        assert lead_spool.drain_once() == 0
+    assert lead_spool.drain_once() == 0
+    backlog = lead_spool.backlog()
+    assert (backlog["pending"], backlog["failed"]) == (0, 1)
+
+    lead_spool.enqueue({"full_name": "Later", "email": "later@x.com"})
+    assert lead_spool.drain_once() == 1
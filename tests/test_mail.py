@@ -0,0 +1,80 @@
+import importlib.util
+import smtplib
+import sys
+import os
+
+import pytest
+from flask import Flask
+
+_ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, _ROOT)
+
+# Load the vendored copy (what Passenger runs), not any site-packages install
+_spec = importlib.util.spec_from_file_location(
+    "vendored_flask_mail", os.path.join(_ROOT, "vendor", "flask_mail", "__init__.py"),
+)
+flask_mail = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(flask_mail)
+
+
+class FakeHost:
+    def __init__(self, log):
+        self.log = log
+        self.alive = True
+        log.append(("open", self))
+
+    def noop(self):
+        if not self.alive:
+            raise smtplib.SMTPServerDisconnected("gone")
+        return 250, b"ok"
+
+    def sendmail(self, sender, recipients, msg, *args):
+        if not self.alive:
+            raise smtplib.SMTPServerDisconnected("gone")
+        if recipients == ["bounce@x.com"]:
+            raise smtplib.SMTPRecipientsRefused({"bounce@x.com": (550, b"no such user")})
+        self.log.append(("send", recipients[0]))
+
+    def quit(self):
+        self.log.append(("quit", self))
+
+    def close(self):
+        self.log.append(("close", self))
+
+
+@pytest.fixture
+def mail_app(monkeypatch):
+    log = []
+    monkeypatch.setattr(flask_mail.Connection, "configure_host", lambda self: FakeHost(log))
+    app = Flask(__name__)
+    app.config.update(MAIL_SUPPRESS_SEND=False, MAIL_DEFAULT_SENDER="info@prezent.energy",
+                      MAIL_POOL_SIZE=1, MAIL_POOL_NOOP_AFTER=0)
+    mail = flask_mail.Mail(app)
+    with app.app_context():
+        yield mail, log
+
+
+def _msg(to):
+    return flask_mail.Message("hi", recipients=[to], body="hello")
+
+
+def test_pooled_session_reused_and_reconnected(mail_app):
+    mail, log = mail_app
+    mail.send(_msg("a@x.com"))
+    mail.send(_msg("b@x.com"))
+    assert len([e for e in log if e[0] == "open"]) == 1
+
+    # Server drops the idle session: NOOP fails, a new one is opened
+    log[0][1].alive = False
+    mail.send(_msg("c@x.com"))
+    assert len([e for e in log if e[0] == "open"]) == 2
+    assert [e[1] for e in log if e[0] == "send"] == ["a@x.com", "b@x.com", "c@x.com"]
+
+
+def test_send_many_reports_per_message_results(mail_app):
+    mail, log = mail_app
+    results = mail.send_many([_msg("a@x.com"), _msg("bounce@x.com"), _msg("b@x.com")])
+    assert results[0] is None and results[2] is None
+    assert isinstance(results[1], smtplib.SMTPRecipientsRefused)
+    assert len([e for e in log if e[0] == "open"]) == 1
+    assert mail.pool.checkout() is log[0][1]      # session went back to the pool
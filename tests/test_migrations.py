@@ -0,0 +1,72 @@
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import event, inspect
+
+from app import create_app
+from extensions import db as _db, schema_migrations
+from services.schema_migrations import LATEST
+
+
+@pytest.fixture
+def app():
+    app = create_app("development")
+    app.config["TESTING"] = True
+    with app.app_context():
+        _db.create_all()
+        yield app
+        _db.drop_all()
+
+
+def _indexes(table):
+    return {ix["name"] for ix in inspect(_db.engine).get_indexes(table)}
+
+
+def test_runs_against_a_scratch_database(app, tmp_path):
+    assert _db.engine.url.database == str(tmp_path / "leads.db")
+
+
+def test_boot_check_is_one_query_when_current(app):
+    schema_migrations.upgrade()
+    assert schema_migrations.current_version() == LATEST
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(_db.engine, "before_cursor_execute", listener)
+    try:
+        assert schema_migrations.check() == LATEST
+    finally:
+        event.remove(_db.engine, "before_cursor_execute", listener)
+    assert len(statements) == 1 and "schema_version" in statements[0]
+
+
+def test_upgrade_adds_missing_indexes_to_existing_tables(app):
+    from models import SchemaVersion
+
+    # A database from before the stamp table, missing later indexes
+    SchemaVersion.__table__.drop(_db.engine)
+    for name in ("ix_leads_email", "ix_ev_users_user_full_name", "ix_verification_codes_lookup",
+                 "ux_leads_spool_key"):
+        _db.session.execute(_db.text(f"DROP INDEX {name}"))
+    _db.session.execute(_db.text("ALTER TABLE leads DROP COLUMN spool_key"))
+    _db.session.commit()
+    assert schema_migrations.current_version() == 0
+
+    app.config["SCHEMA_AUTO_UPGRADE"] = False
+    assert schema_migrations.check() == 0
+    assert "ix_leads_email" not in _indexes("leads")
+
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=["db", "upgrade"])
+    assert f"from version 0 to {LATEST}" in result.output
+    assert "ix_leads_email" in _indexes("leads")
+    assert "ix_ev_users_user_full_name" in _indexes("ev_users")
+    assert "ix_verification_codes_lookup" in _indexes("verification_codes")
+    assert "ux_leads_spool_key" in _indexes("leads")
+    assert "spool_key" in {c["name"] for c in inspect(_db.engine).get_columns("leads")}
+
+    assert "up to date" in runner.invoke(args=["db", "upgrade"]).output
+    assert "pending" not in runner.invoke(args=["db", "status"]).output
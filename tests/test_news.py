@@ -0,0 +1,539 @@
+import pytest
+import io
+import json
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app import create_app
+from agents import industry_news_agent as ina
+from routes import news as news_routes
+
+RSS = b"""<?xml version="1.0"?>
+<rss><channel>
+  <item><title>Item A</title><link>https://x/a</link><pubDate>Mon</pubDate></item>
+  <item><title>Item B</title><link>https://x/b</link><pubDate>Tue</pubDate></item>
+</channel></rss>"""
+
+
+class FakeResponse:
+    def __init__(self, status=200, content=b"", headers=None, payload=None):
+        self.status_code = status
+        self.content = content
+        self.headers = headers or {}
+        self._payload = payload
+        self.raw = io.BytesIO(content)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.raw.close()
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(self.status_code)
+
+    def json(self):
+        return self._payload
+
+
+@pytest.fixture
+def news_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(ina, "_CACHE_FILE", str(tmp_path / "news_cache.json"))
+    monkeypatch.setattr(ina, "_FEED_STATE_FILE", str(tmp_path / "feed_state.json"))
+    monkeypatch.delenv("ANTHROPIC_API_KEY", raising=False)
+    monkeypatch.setattr(ina, "_cache", {"news": None, "regulations": None, "updated": None})
+    return tmp_path
+
+
+def fake_get_factory(calls, delay=0.0):
+    def fake_get(url, timeout=None, headers=None, params=None, **kwargs):
+        calls.append((url, dict(headers or {})))
+        time.sleep(delay)
+        if headers and headers.get("If-None-Match") == '"v1"':
+            return FakeResponse(304)
+        if url == ina.FEDERAL_REGISTER_URL:
+            return FakeResponse(headers={"ETag": '"v1"'}, payload={"results": [
+                {"title": "Rule", "html_url": "https://fr/1", "publication_date": "2026-01-01"},
+            ]})
+        return FakeResponse(content=RSS, headers={"ETag": '"v1"'})
+    return fake_get
+
+
+def test_fetch_sources_concurrent(news_files, monkeypatch):
+    calls = []
+    monkeypatch.setattr("requests.get", fake_get_factory(calls, delay=0.2))
+
+    start = time.monotonic()
+    raw_news, raw_regs, changed = ina._fetch_sources()
+    elapsed = time.monotonic() - start
+
+    assert changed is True
+    assert len(raw_news) == 2 * len(ina.NEWS_FEEDS)
+    assert raw_regs[0]["title"] == "Rule"
+    # Four sources at 0.2 s each would take 0.8 s sequentially
+    assert elapsed < 0.6
+
+
+def test_fetch_sources_conditional_get(news_files, monkeypatch):
+    calls = []
+    monkeypatch.setattr("requests.get", fake_get_factory(calls))
+    ina._fetch_sources()
+
+    calls.clear()
+    raw_news, raw_regs, changed = ina._fetch_sources()
+    assert changed is False
+    assert all(h.get("If-None-Match") == '"v1"' for _, h in calls)
+    # 304s reuse the items parsed last time
+    assert len(raw_news) == 2 * len(ina.NEWS_FEEDS)
+    assert raw_regs[0]["title"] == "Rule"
+
+
+def test_fetch_sources_keeps_validators_of_bad_bodies(news_files, monkeypatch):
+    calls = []
+    good_get = fake_get_factory(calls)
+
+    def truncated_get(url, **kwargs):
+        calls.append((url, dict(kwargs.get("headers") or {})))
+        if url == ina.FEDERAL_REGISTER_URL:
+            return good_get(url, **kwargs)
+        return FakeResponse(content=RSS[:120], headers={"ETag": '"v1"'})
+
+    monkeypatch.setattr("requests.get", truncated_get)
+    ina._fetch_sources()
+    state = ina._read_feed_state()
+    assert "etag" not in state[ina.NEWS_FEEDS[0]]
+    assert state[ina.FEDERAL_REGISTER_URL]["etag"] == '"v1"'
+
+    # The feeds that failed to parse are fetched in full next time
+    calls.clear()
+    monkeypatch.setattr("requests.get", good_get)
+    raw_news, _, changed = ina._fetch_sources()
+    assert changed is True
+    assert len(raw_news) == 2 * len(ina.NEWS_FEEDS)
+    assert [h.get("If-None-Match") for u, h in calls if u in ina.NEWS_FEEDS] == \
+        [None] * len(ina.NEWS_FEEDS)
+
+
+def test_do_fetch_skips_curation_when_unchanged(news_files, monkeypatch):
+    calls = []
+    monkeypatch.setattr("requests.get", fake_get_factory(calls))
+    ina._do_fetch()
+    first, _, _ = ina._read_file_cache()
+
+    curated = []
+    monkeypatch.setattr(ina, "_curate_with_claude", lambda *a: curated.append(a) or [])
+    ina._do_fetch()
+    second, _, _ = ina._read_file_cache()
+    assert curated == []
+    assert second == first
+
+
+def test_iter_rss_items_stops_at_limit():
+    body = b"<rss><channel>" + b"".join(
+        b"<item><title>T%d</title><link>https://x/%d</link></item>" % (i, i) for i in range(50)
+    ) + b"<broken"   # never reached: parsing stops after `limit` items
+    items = ina._iter_rss_items(io.BytesIO(body), limit=5)
+    assert [i["title"] for i in items] == ["T0", "T1", "T2", "T3", "T4"]
+
+
+def _write_stale_cache():
+    ina._write_file_state({
+        "news": [{"title": "old"}], "regulations": [],
+        "updated": "2000-01-01T00:00:00", "refreshing_since": None, "last_error": None,
+    })
+
+
+def test_stale_served_while_other_worker_refreshes(news_files, monkeypatch):
+    started = []
+    monkeypatch.setattr(ina.threading, "Thread",
+                        lambda **kw: started.append(kw) or SimpleThread())
+    _write_stale_cache()
+
+    held = ina._acquire_refresh_lock()       # another worker holds the lease
+    try:
+        ina._update_file_state(refreshing_since=ina.datetime.utcnow().isoformat())
+        news, _ = ina.get_industry_news()
+        assert news == [{"title": "old"}]
+        assert started == []
+        assert ina.is_loading() is True
+    finally:
+        ina._release_refresh_lock(held)
+
+    ina.get_industry_news()
+    assert len(started) == 1
+    ina._release_refresh_lock(started[0]["args"][0])
+
+
+def test_failed_refresh_recorded_and_backed_off(news_files, monkeypatch):
+    def failing_get(*args, **kwargs):
+        raise RuntimeError("offline")
+    monkeypatch.setattr("requests.get", failing_get)
+    _write_stale_cache()
+
+    ina._do_fetch(ina._acquire_refresh_lock())
+    error = ina.last_refresh_error()
+    assert error["message"] == "every news source failed"
+    assert ina.is_loading() is False
+
+    started = []
+    monkeypatch.setattr(ina.threading, "Thread",
+                        lambda **kw: started.append(kw) or SimpleThread())
+    ina.get_industry_news()
+    assert started == []
+
+
+def test_outage_keeps_cache_stamp(news_files, monkeypatch):
+    monkeypatch.setattr("requests.get", fake_get_factory([]))
+    ina._do_fetch()
+    news, _, updated = ina._read_file_cache()
+
+    # Every source fails, but each still has its saved items
+    def failing_get(*args, **kwargs):
+        raise RuntimeError("offline")
+    monkeypatch.setattr("requests.get", failing_get)
+    ina._do_fetch(force=True)
+
+    assert ina._read_file_cache()[::2] == (news, updated)
+    assert ina.last_updated() == updated
+    assert ina.last_refresh_error()["message"] == "every news source failed"
+
+
+class SimpleThread:
+    def start(self):
+        pass
+
+
+@pytest.fixture
+def client(tmp_path):
+    app = create_app("development")
+    app.config["TESTING"] = True
+    app.config["GEO_CACHE_PATH"] = str(tmp_path / "geo_cache.db")
+    app.config["STATION_INDEX_PATH"] = str(tmp_path / "stations.db")
+    return app.test_client()
+
+
+class FakeSession:
+    def __init__(self):
+        self.calls = []
+
+    def get(self, url, params=None, timeout=None):
+        self.calls.append(url)
+        if "nominatim" in url:
+            if params["q"] == "00000":
+                return FakeResponse(payload=[])
+            return FakeResponse(payload=[{"lat": "37.3382", "lon": "-121.8863"}])
+        return FakeResponse(payload=[
+            {"AddressInfo": {"Title": "Station 1", "Latitude": 37.33, "Longitude": -121.88}},
+            {"AddressInfo": {"Title": "No coords"}},
+        ])
+
+
+def test_charging_stations_cached(client, monkeypatch):
+    fake = FakeSession()
+    monkeypatch.setattr(news_routes, "_http", fake)
+
+    first = client.get("/api/charging-stations?zip=95113").get_json()
+    assert [s["name"] for s in first["stations"]] == ["Station 1"]
+    assert first["center"] == {"lat": 37.3382, "lng": -121.8863}
+    assert len(fake.calls) == 2
+
+    # Same zip, and a nearby point in the same tile: no upstream calls
+    client.get("/api/charging-stations?zip=95113")
+    client.get("/api/charging-stations?lat=37.3390&lng=-121.8870")
+    assert len(fake.calls) == 2
+
+    # A different radius is a different cache entry
+    client.get("/api/charging-stations?zip=95113&radius=50")
+    assert len(fake.calls) == 3
+
+
+def test_charging_stations_unknown_zip_cached(client, monkeypatch):
+    fake = FakeSession()
+    monkeypatch.setattr(news_routes, "_http", fake)
+    assert client.get("/api/charging-stations?zip=00000").status_code == 404
+    assert client.get("/api/charging-stations?zip=00000").status_code == 404
+    assert len(fake.calls) == 1
+
+    # Once the negative entry expires, the zip is looked up again
+    client.application.config["UNKNOWN_ZIP_CACHE_TTL"] = 0
+    assert client.get("/api/charging-stations?zip=00000").status_code == 404
+    assert len(fake.calls) == 2
+
+
+def test_zip_index_build_and_lookup(tmp_path):
+    from services.zip_index import ZipIndex, build
+
+    src = tmp_path / "zcta.txt"
+    src.write_text(
+        "GEOID\tALAND\tINTPTLAT\tINTPTLONG \n"
+        "95113\t1\t37.333\t-121.891\n"
+        "00601\t1\t18.180555\t-66.749961\n"
+        "10001\t1\t40.750\t-73.997\n"
+        "bad\t1\t0\t0\n"
+    )
+    out = tmp_path / "zips.bin"
+    assert build(str(src), str(out)) == 3
+
+    index = ZipIndex(str(out))
+    assert index.lookup("00601") == (18.180555, -66.749961)
+    assert index.lookup("95113") == (37.333, -121.891)
+    assert index.lookup("10001") == (40.75, -73.997)
+    assert index.lookup("99999") is None
+    assert index.lookup("9511") is None
+    index.close()
+
+
+def test_missing_zip_index_is_cached(tmp_path, monkeypatch):
+    from services import zip_index
+
+    path = str(tmp_path / "zips.bin")
+    opened = []
+    real_init = zip_index.ZipIndex.__init__
+    monkeypatch.setattr(zip_index.ZipIndex, "__init__",
+                        lambda self, p: (opened.append(p), real_init(self, p))[1])
+
+    assert zip_index.get_zip_index(path) is None
+    assert zip_index.get_zip_index(path) is None
+    assert opened == [path]
+
+    src = tmp_path / "zips.csv"
+    src.write_text("zip,lat,lng\n95113,37.333,-121.891\n")
+    zip_index.build(str(src), path)
+    monkeypatch.setitem(zip_index._missing, path, 0.0)     # recheck interval elapsed
+    assert zip_index.get_zip_index(path).lookup("95113") == (37.333, -121.891)
+
+
+def test_charging_stations_uses_zip_index(client, tmp_path, monkeypatch):
+    from services.zip_index import build
+
+    src = tmp_path / "zips.csv"
+    src.write_text("zip,lat,lng\n95113,37.333,-121.891\n")
+    build(str(src), str(tmp_path / "zips.bin"))
+    client.application.config["ZIP_INDEX_PATH"] = str(tmp_path / "zips.bin")
+
+    fake = FakeSession()
+    monkeypatch.setattr(news_routes, "_http", fake)
+    res = client.get("/api/charging-stations?zip=95113").get_json()
+    assert res["center"] == {"lat": 37.333, "lng": -121.891}
+    assert not any("nominatim" in url for url in fake.calls)
+
+
+def _poi(poi_id, lat, lng, modified="2026-01-01", level=3):
+    return {
+        "ID": poi_id,
+        "DateLastStatusUpdate": modified,
+        "AddressInfo": {"Title": f"S{poi_id}", "Latitude": lat, "Longitude": lng},
+        "Connections": [{"LevelID": level}],
+    }
+
+
+def test_station_index_queries(tmp_path):
+    from services.station_index import StationIndex
+
+    index = StationIndex(str(tmp_path / "stations.db"))
+    stats = index.upsert([
+        _poi(1, 37.3382, -121.8863),       # downtown San Jose
+        _poi(2, 37.4419, -122.1430),       # Palo Alto, ~14 mi
+        _poi(3, 37.7749, -122.4194),       # San Francisco, ~42 mi
+        _poi(4, 37.3400, -121.8900, level=2),
+    ])
+    assert stats["added"] == 3
+
+    near = index.query_radius(37.3382, -121.8863, 25)
+    assert [s["id"] for s in near] == [1, 2]
+    assert near[0]["distance"] == 0
+
+    boxed = index.query_bbox(37.3, -122.5, 37.8, -121.8)
+    assert {s["id"] for s in boxed} == {1, 2, 3}
+
+
+def test_station_index_incremental_load(tmp_path):
+    from services.station_index import StationIndex
+
+    export = tmp_path / "ocm.ndjson"
+    export.write_text("\n".join(json.dumps(p) for p in [_poi(1, 37.0, -122.0), _poi(2, 38.0, -122.0)]))
+    index = StationIndex(str(tmp_path / "stations.db"))
+    assert index.load_export(str(export))["added"] == 2
+
+    export.write_text(json.dumps([_poi(1, 37.0, -122.0), _poi(2, 38.5, -122.0, modified="2026-02-01")]))
+    stats = index.load_export(str(export))
+    assert (stats["unchanged"], stats["updated"]) == (1, 1)
+    assert index.query_radius(38.5, -122.0, 1)[0]["id"] == 2
+
+    export.write_text(json.dumps([_poi(1, 37.0, -122.0)]))
+    assert index.load_export(str(export), prune=True)["removed"] == 1
+    assert index.count() == 1
+
+
+def test_station_index_shared_per_worker(tmp_path, monkeypatch):
+    from services import station_index
+    from services.station_index import StationIndex, get_station_index
+
+    path = str(tmp_path / "stations.db")
+    assert get_station_index(path) is None
+    StationIndex(path).upsert([_poi(1, 37.3382, -121.8863)])
+    assert get_station_index(path) is None                 # empty result still cached
+
+    monkeypatch.setitem(station_index._empty, path, 0.0)   # recheck interval elapsed
+    index = get_station_index(path)
+    assert index is not None and get_station_index(path) is index
+    assert index.query_radius(37.3382, -121.8863, 1)[0]["id"] == 1
+
+
+def test_charging_stations_bbox_centred_on_zero(client, monkeypatch):
+    fake = FakeSession()
+    monkeypatch.setattr(news_routes, "_http", fake)
+
+    # No local index: the box becomes a radius query around (0.0, 0.0)
+    res = client.get("/api/charging-stations?bbox=-1,-1,1,1")
+    assert res.status_code == 200
+    assert res.get_json()["center"] == {"lat": 0.0, "lng": 0.0}
+    assert client.get("/api/charging-stations?lat=0&lng=0").status_code == 200
+    assert client.get("/api/charging-stations?lat=&lng=").status_code == 400
+
+
+def test_charging_stations_served_from_local_index(client, tmp_path, monkeypatch):
+    from services.station_index import StationIndex
+
+    StationIndex(client.application.config["STATION_INDEX_PATH"]).upsert(
+        [_poi(1, 37.3382, -121.8863), _poi(2, 37.4419, -122.1430)]
+    )
+    fake = FakeSession()
+    monkeypatch.setattr(news_routes, "_http", fake)
+
+    res = client.get("/api/charging-stations?lat=37.34&lng=-121.89&radius=5").get_json()
+    assert [s["name"] for s in res["stations"]] == ["S1"]
+    res = client.get("/api/charging-stations?bbox=37.3,-122.2,37.5,-121.8").get_json()
+    assert len(res["stations"]) == 2
+    assert fake.calls == []
+
+    # Out-of-range limits are clamped to 1..MAX_STATIONS (a negative SQLite LIMIT is unlimited)
+    for limit, expected in (("-5", 1), ("0", 1), ("-1", 1), ("9999", 2)):
+        res = client.get(f"/api/charging-stations?bbox=37.3,-122.2,37.5,-121.8&limit={limit}")
+        assert len(res.get_json()["stations"]) == expected, limit
+        res = client.get(f"/api/charging-stations?lat=37.34&lng=-121.89&radius=50&limit={limit}")
+        assert len(res.get_json()["stations"]) == expected, limit
+
+
+def test_cluster_stations_grid():
+    from services.station_index import cluster_stations
+
+    dense = [{"id": i, "lat": 37.33 + i * 1e-4, "lng": -121.88} for i in range(50)]
+    lone = {"id": 99, "lat": 40.0, "lng": -100.0}
+    out = cluster_stations(dense + [lone], zoom=8)
+    assert out["stations"] == [lone]
+    assert [c["count"] for c in out["clusters"]] == [50]
+
+    # Zoomed in far enough, nothing is clustered
+    assert len(cluster_stations(dense, zoom=15)["stations"]) == 50
+
+
+def test_station_index_clusters_in_sql(tmp_path):
+    from services.station_index import StationIndex, cluster_stations
+
+    index = StationIndex(str(tmp_path / "stations.db"))
+    index.upsert([_poi(i, 37.33 + i * 1e-4, -121.88) for i in range(1, 51)]
+                 + [_poi(100, 37.9, -122.3), _poi(101, 37.6, -121.6)])
+    bbox = (37.0, -122.5, 38.0, -121.5)
+
+    for zoom in (6, 9, 12):
+        grouped = index.cluster_bbox(*bbox, zoom=zoom)
+        expected = cluster_stations(index.query_bbox(*bbox), zoom)
+        assert sorted(s["id"] for s in grouped["stations"]) == \
+            sorted(s["id"] for s in expected["stations"])
+        assert sorted((c["lat"], c["lng"], c["count"]) for c in grouped["clusters"]) == \
+            sorted((c["lat"], c["lng"], c["count"]) for c in expected["clusters"])
+
+    assert index.cluster_bbox(*bbox, zoom=9)["clusters"][0]["count"] == 50
+    # Zoomed in, the nearest stations come back unclustered, capped
+    close = index.cluster_bbox(37.0, -122.5, 38.0, -121.5, zoom=16, limit=3)
+    assert close == {"stations": index.query_bbox(*bbox, limit=3), "clusters": []}
+    assert [s["id"] for s in index.query_bbox(37.3, -121.9, 37.7, -121.6, limit=2)] == [101, 50]
+
+
+def test_charging_stations_clustered_tile(client, monkeypatch):
+    from services.station_index import StationIndex
+
+    StationIndex(client.application.config["STATION_INDEX_PATH"]).upsert(
+        [_poi(i, 37.33 + i * 1e-4, -121.88) for i in range(1, 21)] + [_poi(100, 37.9, -122.3)]
+    )
+    res = client.get("/api/charging-stations?bbox=37.0,-122.5,38.0,-121.5&zoom=9")
+    data = res.get_json()
+    assert res.headers["Cache-Control"] == "public, max-age=600"
+    assert data["zoom"] == 9
+    assert sum(c["count"] for c in data["clusters"]) + len(data["stations"]) == 21
+
+
+def test_industry_news_etag_and_gzip(client, news_files):
+    import gzip
+
+    ina._write_file_cache([{"title": "n"}], [{"title": "r"}])
+    res = client.get("/api/industry-news")
+    assert res.status_code == 200
+    assert res.get_json()["news"] == [{"title": "n"}]
+    etag = res.headers["ETag"]
+    assert res.headers["Cache-Control"].startswith("public")
+
+    again = client.get("/api/industry-news", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.data == b""
+
+    zipped = client.get("/api/industry-news", headers={"Accept-Encoding": "gzip"})
+    assert zipped.headers["Content-Encoding"] == "gzip"
+    assert zipped.headers["ETag"] != etag
+    assert b'"regulations"' in gzip.decompress(zipped.data)
+
+    # q=0 refuses the coding; "*" accepts it
+    for header, coded in (("gzip;q=0, identity", False), ("gzip;q=0.5", True),
+                          ("*", True), ("br", False)):
+        res = client.get("/api/industry-news", headers={"Accept-Encoding": header})
+        assert ("Content-Encoding" in res.headers) is coded, header
+
+    # A new cache generation changes the ETag
+    ina._write_file_cache([{"title": "newer"}], [])
+    ina._cache["updated"] = None
+    fresh = client.get("/api/industry-news", headers={"If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert fresh.get_json()["news"] == [{"title": "newer"}]
+
+
+def test_wait_for_refresh_sees_other_worker_finish(news_files, monkeypatch):
+    import threading
+
+    monkeypatch.setattr(ina, "WAIT_POLL_INTERVAL", 0.05)
+    _write_stale_cache()
+    held = ina._acquire_refresh_lock()       # another worker is refreshing
+    ina._update_file_state(refreshing_since=ina.datetime.utcnow().isoformat())
+    assert ina.get_industry_news()[0] == [{"title": "old"}]
+
+    def other_worker_finishes():
+        time.sleep(0.2)
+        ina._write_file_cache([{"title": "fresh"}], [])
+        ina._release_refresh_lock(held)
+
+    threading.Thread(target=other_worker_finishes).start()
+    assert ina.wait_for_refresh(5) is True
+    assert ina.get_industry_news()[0] == [{"title": "fresh"}]
+
+
+def test_industry_news_wait_endpoint(client, news_files, monkeypatch):
+    monkeypatch.setattr(ina, "WAIT_POLL_INTERVAL", 0.05)
+    ina._write_file_cache([{"title": "n"}], [])
+    ina._update_file_state(refreshing_since=ina.datetime.utcnow().isoformat())
+
+    start = time.monotonic()
+    res = client.get("/api/industry-news/wait?timeout=0.2")
+    assert time.monotonic() - start >= 0.2
+    assert res.get_json()["loading"] is True
+    assert res.headers["Cache-Control"] == "no-store"
+
+    ina._update_file_state(refreshing_since=None)
+    res = client.get("/api/industry-news/wait?timeout=5")
+    assert res.get_json()["loading"] is False
+    assert res.get_json()["news"] == [{"title": "n"}]
+
+    assert client.get("/api/industry-news/wait?timeout=x").status_code == 400
@@ -0,0 +1,64 @@
+import json
+import subprocess
+import sys
+import os
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+CHILD = """
+import json, sys
+sys.path.insert(0, "vendor")
+from services import import_timer
+import_timer.install()
+from app import create_app
+create_app("production")
+import_timer.uninstall()
+print(json.dumps({
+    "lazy_loaded": [m for m in ("anthropic", "requests", "xml.etree.ElementTree") if m in sys.modules],
+    "timed": sorted(import_timer.timings()),
+    "report": import_timer.report(limit=5),
+}))
+"""
+
+
+def test_worker_boot_skips_heavy_imports(tmp_path):
+    # Keep the child off the checkout's instance/ journals
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp_path / 'boot.db'}",
+               LEAD_SPOOL_ENABLED="0", MAIL_OUTBOX_ENABLED="0")
+    out = subprocess.run([sys.executable, "-c", CHILD], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True)
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+
+    assert result["lazy_loaded"] == []
+    assert {"app", "routes.chat", "agents.chatbot"} <= set(result["timed"])
+    assert result["report"].splitlines()[2].endswith("  app")
+
+
+def test_worker_boot_leaves_journals_alone(tmp_path):
+    import time
+
+    sys.path.insert(0, ROOT)
+    from app import create_app
+
+    app = create_app("production")        # spool and outbox enabled
+    assert not (tmp_path / "lead_spool.db").exists()
+    assert not (tmp_path / "mail_outbox.db").exists()
+
+    # The first request checks both backlogs, off the request thread
+    app.test_client().get("/")
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline and not (
+        (tmp_path / "lead_spool.db").exists() and (tmp_path / "mail_outbox.db").exists()
+    ):
+        time.sleep(0.05)
+    assert (tmp_path / "lead_spool.db").exists() and (tmp_path / "mail_outbox.db").exists()
+
+
+def test_chatbot_prompt_reads_fact_base_on_first_use():
+    sys.path.insert(0, ROOT)
+    from agents import chatbot
+
+    chatbot.system_prompt.cache_clear()
+    prompt = chatbot.system_prompt()
+    assert "--- FACT BASE ---" in prompt and "{fact_base}" not in prompt
+    assert chatbot.system_prompt() is prompt